@@ -1,5 +1,6 @@
 from .librarian import Librarian
 from .navigator import Navigator
 from .quiz_master import QuizMaster
+from .reference_resolver import ReferenceResolver
 
-__all__ = ["Librarian", "Navigator", "QuizMaster"]
+__all__ = ["Librarian", "Navigator", "QuizMaster", "ReferenceResolver"]
@@ -0,0 +1,156 @@
+"""
+Approximate matching for spoken citation queries.
+
+Speech-to-text produces queries like "Vaswani et al twenty seventeen"
+that never match a bibliography entry verbatim.  Queries are normalized
+(spelled-out years become digits, "et all" becomes "et al") and scored
+against a precomputed character trigram index of the entries.
+"""
+
+import re
+from collections import Counter, defaultdict
+
+_UNITS = {
+    "zero": 0, "oh": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_SCALES = {"hundred": 100, "thousand": 1000}
+_NUMBER_WORDS = set(_UNITS) | set(_TENS) | set(_SCALES)
+# Words that announce a reference number ("reference six", "paper 3")
+NUMBER_CUES = frozenset({"ref", "reference", "citation", "number", "paper"})
+
+_ET_AL = re.compile(r"\b(?:et|at|and|ed)\s+(?:al|all|el|ale)\b\.?")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _chunks(words):
+    """Split number words into two-digit groups: "nineteen ninety eight" -> [19, 98]."""
+    chunks = []
+    i = 0
+    while i < len(words):
+        w = words[i]
+        if w in _TENS:
+            value = _TENS[w]
+            if i + 1 < len(words) and words[i + 1] in _UNITS and 0 < _UNITS[words[i + 1]] < 10:
+                value += _UNITS[words[i + 1]]
+                i += 1
+            chunks.append(value)
+        elif w == "oh" and i + 1 < len(words) and words[i + 1] in _UNITS:
+            # "twenty oh five" -> [20, 5]
+            i += 1
+            chunks.append(_UNITS[words[i]])
+        else:
+            chunks.append(_UNITS[w])
+        i += 1
+    return chunks
+
+
+def _parse_number(words):
+    """Parse a run of number words; returns an int or None."""
+    words = [w for w in words if w != "and"]
+    if not words:
+        return None
+    if any(w in _SCALES for w in words):
+        total, current = 0, 0
+        for w in words:
+            if w in _SCALES:
+                current = max(current, 1) * _SCALES[w]
+                if _SCALES[w] == 1000:
+                    total += current
+                    current = 0
+            else:
+                current += sum(_chunks([w]))
+        return total + current
+    chunks = _chunks(words)
+    if len(chunks) == 1:
+        return chunks[0]
+    if len(chunks) == 2 and chunks[0] >= 10 and chunks[1] < 100:
+        # Spoken years: "twenty seventeen", "nineteen ninety eight"
+        return chunks[0] * 100 + chunks[1]
+    return None
+
+
+def normalize_spoken(query):
+    """Normalize a transcribed query for matching.
+
+    Lowercases, canonicalizes "et al" variants, and replaces spelled-out
+    years and reference numbers ("reference six") with digits.
+    """
+    text = _ET_AL.sub("et al", query.lower())
+    words = _WORD.findall(text)
+
+    out = []
+    i = 0
+    while i < len(words):
+        if words[i] not in _NUMBER_WORDS or words[i] == "oh":
+            out.append(words[i])
+            i += 1
+            continue
+        j = i
+        while j < len(words) and (words[j] in _NUMBER_WORDS or
+                                  (words[j] == "and" and j + 1 < len(words) and words[j + 1] in _NUMBER_WORDS)):
+            j += 1
+        run = words[i:j]
+        value = _parse_number(run)
+        # Small numbers stay words ("one shot learning") unless they are the
+        # whole query or follow a word like "reference"
+        as_number = (i == 0 and j == len(words)) or (out and out[-1] in NUMBER_CUES)
+        if value is not None and (1900 <= value <= 2099 or as_number):
+            out.append(str(value))
+        else:
+            out.extend(run)
+        i = j
+    return " ".join(out)
+
+
+def trigrams(text):
+    """Return the set of character trigrams of each word in *text*, padded."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    """Inverted index from character trigram to the documents containing it."""
+
+    def __init__(self, texts):
+        self.size = len(texts)
+        self.postings = defaultdict(list)  # trigram -> doc positions
+        self.common = set()
+        for pos, text in enumerate(texts):
+            for gram in trigrams(text):
+                self.postings[gram].append(pos)
+
+        # Trigrams present in most documents ("the", " an") carry no signal
+        # and dominate query cost, so they are dropped from scoring.
+        if self.size >= 10:
+            limit = self.size // 2
+            self.common = {g for g, docs in self.postings.items() if len(docs) > limit}
+            for gram in self.common:
+                del self.postings[gram]
+
+    def search(self, query, k=5):
+        """Return up to *k* ``(position, confidence)`` pairs, best first.
+
+        Confidence is the fraction of the query's informative trigrams that
+        appear in the document.
+        """
+        grams = trigrams(query) - self.common
+        if not grams:
+            return []
+        counts = Counter()
+        for gram in grams:
+            docs = self.postings.get(gram)
+            if docs:
+                counts.update(docs)
+        total = len(grams)
+        return [(pos, round(hits / total, 3)) for pos, hits in counts.most_common(k)]
@@ -1,18 +1,17 @@
-import asyncio
+import hashlib
+import io
 import json
 import os
+import re
 import time
 import uuid
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+from cache import TTLCache, normalize_arxiv_id, normalize_query
+from resilience import Upstream
 
-try:
-    from mcp.client.sse import sse_client
-    from mcp import ClientSession
-    _MCP_AVAILABLE = True
-except ImportError:
-    _MCP_AVAILABLE = False
+from .mcp_client import MCP_AVAILABLE, MCPClient
 
 
 class Librarian:
@@ -20,133 +19,181 @@ class Librarian:
     MCP is optional and only used as a fallback if available."""
 
     ARXIV_API_URL = "http://export.arxiv.org/api/query"
-
-    def __init__(self, upload_dir, pdf_processor, mcp_url="http://localhost:8050/sse"):
+    ARXIV_PDF_URL = "https://arxiv.org/pdf"
+    SEARCH_CACHE_TTL = 6 * 3600
+    DETAILS_CACHE_TTL = 24 * 3600
+    _VERSIONED_ID = re.compile(r"v\d+$")
+    _ATOM_ENTRY = "{http://www.w3.org/2005/Atom}entry"
+    # IDs per id_list query; keeps the URL well under proxy limits
+    MAX_ID_BATCH = 25
+    MAX_BATCH_CONCURRENCY = 3
+    # ArXiv asks API clients for no more than one request every three seconds
+    BACKGROUND_INTERVAL = 3.0
+
+    def __init__(self, upload_dir, pdf_processor, mcp_url="http://localhost:8050/sse", cache_dir=None,
+                 api_url=None, pdf_url=None):
         self.upload_dir = upload_dir
+        self.api_url = api_url or self.ARXIV_API_URL
+        self.pdf_url = (pdf_url or self.ARXIV_PDF_URL).rstrip("/")
         self.pdf_processor = pdf_processor
         self.mcp_url = mcp_url
+        self.mcp = MCPClient(mcp_url) if MCP_AVAILABLE else None
+        self.search_cache = TTLCache(
+            "arxiv_search", max_entries=512, ttl=self.SEARCH_CACHE_TTL, disk_dir=cache_dir,
+        )
+        self.details_cache = TTLCache(
+            "arxiv_details", max_entries=2048, ttl=self.DETAILS_CACHE_TTL, disk_dir=cache_dir,
+        )
+        self.library_dir = os.path.join(upload_dir, "library")
+        os.makedirs(self.library_dir, exist_ok=True)
+        self.paper_library = TTLCache("arxiv_papers", max_entries=32, ttl=0, disk_dir=self.library_dir)
+        # Metadata queries are small, so slow ones are hedged; PDF downloads aren't.
+        self.arxiv_api = Upstream("arxiv_api", slow_call_threshold=8.0, hedge=True)
+        self.arxiv_pdf = Upstream("arxiv_pdf", slow_call_threshold=20.0)
+        # Background jobs get their own paced, unhedged breaker so a burst of
+        # them can neither trip nor queue behind interactive lookups.
+        self.arxiv_background = Upstream(
+            "arxiv_background", slow_call_threshold=15.0, max_retries=0, min_interval=self.BACKGROUND_INTERVAL,
+        )
 
     # ------------------------------------------------------------------
     # MCP helpers
     # ------------------------------------------------------------------
 
-    async def _call_tool(self, tool_name, arguments):
-        """Connect to the ArXiv MCP server and call a tool."""
-        async with sse_client(self.mcp_url) as streams:
-            async with ClientSession(*streams) as session:
-                await session.initialize()
-                result = await session.call_tool(tool_name, arguments)
-                return result
-
-    def _run_async(self, coro):
-        """Run an async coroutine from sync code."""
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
-
-        if loop and loop.is_running():
-            # We're inside an existing event loop (e.g. Flask with async);
-            # run in a new thread to avoid blocking
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                return pool.submit(asyncio.run, coro).result()
-        else:
-            return asyncio.run(coro)
+    def _call_tool(self, tool_name, arguments, timeout=None):
+        """Call a tool on the ArXiv MCP server over the persistent session."""
+        if self.mcp is None:
+            raise RuntimeError("MCP client library is not installed")
+        return self.mcp.call_tool(tool_name, arguments, timeout)
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
-    def search(self, query, max_results=5):
+    def search(self, query, max_results=5, background=False):
         """Search ArXiv using the public API (no MCP dependency).
 
+        Results are cached by normalized query, and concurrent identical
+        searches share a single upstream request.  Background callers go
+        through the paced ``arxiv_background`` upstream.
+
         Returns a tuple of (papers_list, api_info_dict).
         """
         start = time.time()
-        params = {
-            "search_query": f"all:{query}",
-            "start": 0,
-            "max_results": max_results,
-            "sortBy": "relevance",
-            "sortOrder": "descending",
-        }
-        resp = requests.get(self.ARXIV_API_URL, params=params, timeout=15)
-        resp.raise_for_status()
+        key = f"{normalize_query(query)}|{max_results}"
+        papers, cache_status = self.search_cache.get_or_load(
+            key, lambda: self._fetch_search(query, max_results, self._upstream(background))
+        )
         duration_ms = round((time.time() - start) * 1000)
 
-        papers = self._parse_arxiv_response(resp.text)
-
         api_info = {
             "server": "arxiv-api",
             "tool": "search_arxiv",
             "arguments": {"query": query, "limit": max_results},
             "duration_ms": duration_ms,
+            "cache": {"status": cache_status, **self.search_cache.stats()},
         }
 
         return papers, api_info
 
+    def _upstream(self, background):
+        return self.arxiv_background if background else self.arxiv_api
+
+    def _fetch_search(self, query, max_results, upstream):
+        """Run an uncached search against the ArXiv API."""
+        params = {
+            "search_query": f"all:{query}",
+            "start": 0,
+            "max_results": max_results,
+            "sortBy": "relevance",
+            "sortOrder": "descending",
+        }
+        resp = upstream.get(self.api_url, params=params, timeout=15)
+        return self._parse_arxiv_response(resp.text)
+
+    def cache_stats(self):
+        """Return hit/miss counters for the search and metadata caches."""
+        return {
+            "search": self.search_cache.stats(),
+            "details": self.details_cache.stats(),
+        }
+
+    def upstream_status(self):
+        """Return circuit breaker state for the ArXiv API and PDF host."""
+        return [self.arxiv_api.status(), self.arxiv_pdf.status(), self.arxiv_background.status()]
+
     def _parse_arxiv_response(self, xml_text):
-        """Parse ArXiv Atom XML response into a list of paper dicts."""
-        ns = {"atom": "http://www.w3.org/2005/Atom"}
-        root = ET.fromstring(xml_text)
+        """Parse ArXiv Atom XML response into a list of paper dicts.
+
+        Entries are parsed incrementally with ``iterparse`` and cleared as
+        soon as they're converted, so large multi-ID responses never build
+        the full tree.
+        """
+        if isinstance(xml_text, str):
+            xml_text = xml_text.encode("utf-8")
         papers = []
 
-        for entry in root.findall("atom:entry", ns):
-            title_el = entry.find("atom:title", ns)
-            summary_el = entry.find("atom:summary", ns)
-            published_el = entry.find("atom:published", ns)
-
-            title = (title_el.text or "").strip().replace("\n", " ") if title_el is not None else ""
-            summary_raw = (summary_el.text or "").strip().replace("\n", " ") if summary_el is not None else ""
-            summary = summary_raw[:300] + ("..." if len(summary_raw) > 300 else "")
-            published = (published_el.text or "")[:10] if published_el is not None else ""
-
-            authors = []
-            for author in entry.findall("atom:author", ns)[:3]:
-                name_el = author.find("atom:name", ns)
-                if name_el is not None and name_el.text:
-                    authors.append(name_el.text.strip())
-
-            # Extract arxiv_id from the entry id URL
-            id_el = entry.find("atom:id", ns)
-            arxiv_url = (id_el.text or "") if id_el is not None else ""
-            arxiv_id = arxiv_url.split("/abs/")[-1] if "/abs/" in arxiv_url else arxiv_url
-
-            # Find PDF link
-            pdf_url = ""
-            for link in entry.findall("atom:link", ns):
-                if link.get("title") == "pdf":
-                    pdf_url = link.get("href", "")
-                    break
-
-            papers.append({
-                "arxiv_id": arxiv_id,
-                "title": title,
-                "summary": summary,
-                "authors": authors,
-                "published": published,
-                "pdf_url": pdf_url or f"https://arxiv.org/pdf/{arxiv_id}.pdf",
-            })
+        for _, elem in ET.iterparse(io.BytesIO(xml_text), events=("end",)):
+            if elem.tag != self._ATOM_ENTRY:
+                continue
+            paper = self._parse_entry(elem)
+            if paper:
+                papers.append(paper)
+            elem.clear()
 
         return papers
 
+    def _parse_entry(self, entry):
+        """Convert one Atom ``<entry>`` element into a paper dict."""
+        ns = {"atom": "http://www.w3.org/2005/Atom"}
+        title_el = entry.find("atom:title", ns)
+        summary_el = entry.find("atom:summary", ns)
+        published_el = entry.find("atom:published", ns)
+
+        # Extract arxiv_id from the entry id URL
+        id_el = entry.find("atom:id", ns)
+        arxiv_url = (id_el.text or "") if id_el is not None else ""
+        if "/api/errors" in arxiv_url:
+            # ArXiv reports malformed IDs as a pseudo-entry
+            return None
+        arxiv_id = arxiv_url.split("/abs/")[-1] if "/abs/" in arxiv_url else arxiv_url
+
+        title = (title_el.text or "").strip().replace("\n", " ") if title_el is not None else ""
+        summary_raw = (summary_el.text or "").strip().replace("\n", " ") if summary_el is not None else ""
+        summary = summary_raw[:300] + ("..." if len(summary_raw) > 300 else "")
+        published = (published_el.text or "")[:10] if published_el is not None else ""
+
+        authors = []
+        for author in entry.findall("atom:author", ns)[:3]:
+            name_el = author.find("atom:name", ns)
+            if name_el is not None and name_el.text:
+                authors.append(name_el.text.strip())
+
+        # Find PDF link
+        pdf_url = ""
+        for link in entry.findall("atom:link", ns):
+            if link.get("title") == "pdf":
+                pdf_url = link.get("href", "")
+                break
+
+        return {
+            "arxiv_id": arxiv_id,
+            "title": title,
+            "summary": summary,
+            "authors": authors,
+            "published": published,
+            "pdf_url": pdf_url or f"https://arxiv.org/pdf/{arxiv_id}.pdf",
+        }
+
     def list_tools(self):
         """Return available tools. Uses MCP if available, otherwise returns built-in list."""
-        if not _MCP_AVAILABLE:
+        if self.mcp is None:
             return [
                 {"name": "search_arxiv", "description": "Search ArXiv papers (direct API)"},
                 {"name": "download_paper", "description": "Download paper PDF from ArXiv"},
             ]
         try:
-            async def _list():
-                async with sse_client(self.mcp_url) as streams:
-                    async with ClientSession(*streams) as session:
-                        await session.initialize()
-                        result = await session.list_tools()
-                        return result.tools
-
-            tools_raw = self._run_async(_list())
+            tools_raw = self.mcp.list_tools()
             tools = []
             for t in tools_raw:
                 tools.append({
@@ -161,19 +208,12 @@ class Librarian:
             ]
 
     def get_paper_details(self, arxiv_id, include_content=False):
-        """Get detailed info about a paper. Uses direct ArXiv API."""
-        params = {
-            "id_list": arxiv_id,
-            "max_results": 1,
-        }
-        resp = requests.get(self.ARXIV_API_URL, params=params, timeout=15)
-        resp.raise_for_status()
-
-        papers = self._parse_arxiv_response(resp.text)
-        if not papers:
+        """Get detailed info about a paper. Uses direct ArXiv API, cached by ID."""
+        key = normalize_arxiv_id(arxiv_id)
+        p, _ = self.details_cache.get_or_load(key, lambda: self._fetch_papers([key]).get(key))
+        if not p:
             return f"Paper {arxiv_id} not found on ArXiv."
 
-        p = papers[0]
         lines = [
             f"# {p['title']}",
             f"**Authors:** {', '.join(p['authors'])}",
@@ -184,29 +224,135 @@ class Librarian:
         ]
         return "\n".join(lines)
 
+    def get_papers_details(self, arxiv_ids, background=False):
+        """Get metadata for many papers at once.
+
+        Cached IDs are answered locally; the rest are split into as few
+        ``id_list`` batches as possible, which are fetched concurrently.
+
+        Returns a tuple of (papers_by_id, api_info_dict).  IDs ArXiv
+        doesn't know are listed in ``api_info["missing"]``.
+        """
+        start = time.time()
+        ids = list(dict.fromkeys(normalize_arxiv_id(i) for i in arxiv_ids if i))
+        not_cached = object()
+
+        papers = {}
+        pending = []
+        for arxiv_id in ids:
+            paper = self.details_cache.get(arxiv_id, not_cached, count=True)
+            if paper is not_cached:
+                pending.append(arxiv_id)
+            elif paper:
+                papers[arxiv_id] = paper
+
+        batches = [
+            pending[i:i + self.MAX_ID_BATCH] for i in range(0, len(pending), self.MAX_ID_BATCH)
+        ]
+        if batches:
+            workers = min(self.MAX_BATCH_CONCURRENCY, len(batches))
+            upstream = self._upstream(background)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for found in pool.map(lambda batch: self._fetch_papers(batch, upstream), batches):
+                    papers.update(found)
+            for arxiv_id in pending:
+                if arxiv_id not in papers:
+                    # Remember unknown IDs too, so they aren't re-requested
+                    self.details_cache.set(arxiv_id, None)
+
+        api_info = {
+            "server": "arxiv-api",
+            "tool": "get_papers_details",
+            "arguments": {"ids": ids},
+            "requests": len(batches),
+            "missing": [i for i in ids if i not in papers],
+            "duration_ms": round((time.time() - start) * 1000),
+            "cache": self.details_cache.stats(),
+        }
+        return papers, api_info
+
+    def _fetch_papers(self, arxiv_ids, upstream=None):
+        """Fetch metadata for several papers in one ``id_list`` query.
+
+        Returns a dict mapping each requested (normalized) ID to its paper;
+        IDs ArXiv doesn't know are omitted.  Results also populate the
+        metadata cache.
+        """
+        ids = [normalize_arxiv_id(i) for i in arxiv_ids]
+        params = {
+            "id_list": ",".join(ids),
+            "max_results": len(ids),
+        }
+        resp = (upstream or self.arxiv_api).get(self.api_url, params=params, timeout=15)
+
+        by_id = {}
+        for paper in self._parse_arxiv_response(resp.text):
+            full = normalize_arxiv_id(paper["arxiv_id"])
+            by_id[full] = paper
+            by_id.setdefault(self._VERSIONED_ID.sub("", full), paper)
+
+        found = {}
+        for arxiv_id in ids:
+            paper = by_id.get(arxiv_id) or by_id.get(self._VERSIONED_ID.sub("", arxiv_id))
+            if paper:
+                found[arxiv_id] = paper
+                self.details_cache.set(arxiv_id, paper)
+        return found
+
     def download_paper(self, arxiv_id):
         """Download a paper PDF from ArXiv and process it.
 
+        Papers are kept in a local library keyed by arXiv ID and version, so
+        repeat requests reuse the stored PDF and its extracted structure, and
+        concurrent requests for the same ID share one download.
+
         Returns a dict with session_id, filename, total_pages, filepath,
-        and pdf_data suitable for registering in the sessions store.
+        pdf_data and outline suitable for registering in the sessions store.
         """
-        pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-        resp = requests.get(pdf_url, timeout=30)
-        resp.raise_for_status()
+        key = normalize_arxiv_id(arxiv_id)
+        entry = self.paper_library.get(key)
+        if entry and not os.path.exists(entry["filepath"]):
+            self.paper_library.invalidate(key)
+
+        # Unversioned IDs resolve to whatever ArXiv currently serves, so they
+        # are refreshed periodically; a specific version never changes.
+        ttl = 0 if self._VERSIONED_ID.search(key) else self.DETAILS_CACHE_TTL
+        entry, status = self.paper_library.get_or_load(
+            key, lambda: self._fetch_pdf(arxiv_id, key), ttl=ttl
+        )
 
-        session_id = str(uuid.uuid4())
-        filename = f"{session_id}.pdf"
-        filepath = os.path.join(self.upload_dir, filename)
+        return {
+            "session_id": str(uuid.uuid4()),
+            "filename": f"arxiv-{arxiv_id}.pdf",
+            "total_pages": entry["pdf_data"]["total_pages"],
+            "filepath": entry["filepath"],
+            "pdf_data": entry["pdf_data"],
+            "outline": entry["outline"],
+            "cached": status != "miss",
+        }
 
-        with open(filepath, "wb") as f:
-            f.write(resp.content)
+    def _fetch_pdf(self, arxiv_id, key):
+        """Download and extract a paper into the library directory."""
+        pdf_url = f"{self.pdf_url}/{arxiv_id}.pdf"
+        resp = self.arxiv_pdf.get(pdf_url, timeout=30)
+
+        # Named by content, so refreshing an unversioned ID that now resolves
+        # to a new version never replaces the file earlier sessions point at.
+        digest = hashlib.sha256(resp.content).hexdigest()[:16]
+        filepath = os.path.join(self.library_dir, f"{key.replace('/', '_')}-{digest}.pdf")
+        if not os.path.exists(filepath):
+            tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(resp.content)
+            os.replace(tmp_path, filepath)
 
         pdf_data = self.pdf_processor.extract_structure(filepath)
+        outline = self.pdf_processor.build_outline(pdf_data)
 
         return {
-            "session_id": session_id,
-            "filename": f"arxiv-{arxiv_id}.pdf",
-            "total_pages": pdf_data["total_pages"],
+            "arxiv_id": key,
             "filepath": filepath,
             "pdf_data": pdf_data,
+            "outline": outline,
+            "fetched_at": time.time(),
         }
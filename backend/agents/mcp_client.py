@@ -0,0 +1,226 @@
+"""
+Persistent MCP client.
+
+One background thread owns an asyncio event loop and a single long-lived
+MCP session.  Sync callers submit coroutines to that loop and wait on the
+result with a timeout, so a tool call costs one round trip instead of a
+full SSE connect + initialize handshake.
+"""
+
+import asyncio
+import importlib.util
+import threading
+import time
+from contextlib import asynccontextmanager
+
+# The mcp package is imported on first connect; it is slow to import and
+# most requests never touch it.
+MCP_AVAILABLE = importlib.util.find_spec("mcp") is not None
+
+
+def transport_errors():
+    """Exceptions that mean the MCP connection dropped, rather than a bad call.
+
+    A closed SSE transport surfaces as anyio's stream errors, or as an
+    McpError once the session notices, not only as OSError.
+    """
+    errors = [ConnectionError, OSError, EOFError]
+    try:
+        import anyio
+
+        errors += [anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream]
+    except ImportError:
+        pass
+    try:
+        from mcp.shared.exceptions import McpError
+
+        errors.append(McpError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+class MCPClient:
+    """Long-lived MCP client running on a dedicated event-loop thread."""
+
+    def __init__(self, url, connect_timeout=10, call_timeout=30,
+                 min_backoff=0.5, max_backoff=30):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # The fields below are only touched from the loop thread.
+        self._session = None
+        self._connecting = None  # asyncio.Future resolving to a session
+        self._closed = None  # asyncio.Event that ends the connection task
+        self._backoff = 0
+        self._next_attempt = 0.0
+        self._dropped = None  # transport_errors(), resolved on first use
+
+        self._tools = None
+        self.connects = 0
+        self.failures = 0
+
+    # ------------------------------------------------------------------
+    # Loop thread
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                ready.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="mcp-client", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def submit(self, coro_factory, timeout=None):
+        """Run ``coro_factory()`` on the client loop and wait for its result.
+
+        Thread-safe.  Raises ``TimeoutError`` if the result isn't ready
+        within *timeout* seconds (defaults to ``call_timeout``).
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro_factory(), loop)
+        try:
+            return future.result(timeout or self.call_timeout)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"MCP call timed out after {timeout or self.call_timeout}s")
+
+    # ------------------------------------------------------------------
+    # Connection management (runs on the loop thread)
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def _open_session(self):
+        """Open an SSE transport and an initialized MCP session."""
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        async with sse_client(self.url) as streams:
+            async with ClientSession(*streams) as session:
+                await session.initialize()
+                yield session
+
+    async def _connection_main(self, ready):
+        # The transport's context managers must be entered and exited by the
+        # same task, so one task holds the connection open until closed.
+        try:
+            async with self._open_session() as session:
+                self._session = session
+                ready.set_result(session)
+                await self._closed.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self._session = None
+
+    async def _get_session(self):
+        if self._session is not None:
+            return self._session
+        if self._connecting is not None:
+            return await asyncio.shield(self._connecting)
+
+        wait = self._next_attempt - time.monotonic()
+        if wait > 0:
+            raise ConnectionError(f"MCP server unavailable, retrying in {wait:.1f}s")
+
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        self._connecting = ready
+        self._closed = asyncio.Event()
+        loop.create_task(self._connection_main(ready))
+        try:
+            session = await asyncio.wait_for(asyncio.shield(ready), self.connect_timeout)
+        except Exception:
+            self.failures += 1
+            self._backoff = min(self.max_backoff, (self._backoff * 2) or self.min_backoff)
+            self._next_attempt = time.monotonic() + self._backoff
+            self._closed.set()
+            raise
+        finally:
+            self._connecting = None
+
+        self.connects += 1
+        self._backoff = 0
+        self._next_attempt = 0.0
+        return session
+
+    async def _disconnect(self):
+        if self._closed is not None:
+            self._closed.set()
+        self._session = None
+
+    async def _with_session(self, fn):
+        """Run ``fn(session)``, reconnecting once if the connection dropped."""
+        if self._dropped is None:
+            self._dropped = transport_errors()
+        session = await self._get_session()
+        try:
+            return await fn(session)
+        except self._dropped:
+            await self._disconnect()
+            # The new session may be a restarted server with different tools
+            self._tools = None
+            session = await self._get_session()
+            return await fn(session)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def call_tool(self, tool_name, arguments, timeout=None):
+        """Call an MCP tool over the shared session."""
+        return self.submit(
+            lambda: self._with_session(lambda s: s.call_tool(tool_name, arguments)),
+            timeout,
+        )
+
+    def list_tools(self, refresh=False, timeout=None):
+        """Return the server's tool list, cached after the first call."""
+        if self._tools is None or refresh:
+            result = self.submit(
+                lambda: self._with_session(lambda s: s.list_tools()),
+                timeout,
+            )
+            self._tools = result.tools
+        return self._tools
+
+    def status(self):
+        """Return connection counters for diagnostics."""
+        return {
+            "url": self.url,
+            "connected": self._session is not None,
+            "connects": self.connects,
+            "failures": self.failures,
+            "backoff_s": self._backoff,
+        }
+
+    def close(self):
+        """Close the session and stop the loop thread."""
+        if self._loop is None:
+            return
+        try:
+            self.submit(self._disconnect, timeout=5)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
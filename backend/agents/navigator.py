@@ -1,4 +1,88 @@
 import re
+from collections import defaultdict
+
+from cache import DocumentCache
+
+from .fuzzy_match import NUMBER_CUES, TrigramIndex, normalize_spoken
+
+
+class ReferenceIndex:
+    """Parsed bibliography for one document with constant-time lookups."""
+
+    _TOKEN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, references):
+        self.references = references
+        self.by_number = {}
+        self.tokens = defaultdict(set)  # token -> positions in references
+        self.lowered = []  # entry texts, lowercased for substring matches
+
+        for pos, ref in enumerate(references):
+            self.by_number.setdefault(ref["number"], ref)
+            self.lowered.append(ref["text"].lower())
+            for token in self._TOKEN.findall(self.lowered[-1]):
+                self.tokens[token].add(pos)
+
+        self.trigrams = TrigramIndex([re.sub(r"^\[\d+\]\s*", "", r["text"]) for r in references])
+
+    def get(self, number):
+        """Return the entry numbered *number*, or None."""
+        return self.by_number.get(number)
+
+    def containing(self, query):
+        """Return entries containing *query* verbatim (case-insensitive), in document order."""
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        return [self.references[pos] for pos, text in enumerate(self.lowered) if needle in text]
+
+    def search(self, query):
+        """Return entries containing every word of *query*, in document order."""
+        words = self._TOKEN.findall(query.lower())
+        if not words:
+            return []
+        postings = sorted((self.tokens.get(w, set()) for w in set(words)), key=len)
+        matches = set(postings[0]).intersection(*postings[1:])
+        return [self.references[pos] for pos in sorted(matches)]
+
+    def fuzzy_search(self, query, k=5):
+        """Return up to *k* ``(entry, confidence)`` pairs for an approximate query."""
+        return [(self.references[pos], conf) for pos, conf in self.trigrams.search(query, k)]
+
+
+class CitationGraph:
+    """In-text citation markers linked to bibliography entries.
+
+    ``occurrences`` is a list of marker dicts (their ``id`` is the list
+    position); ``by_reference`` maps reference number -> occurrence ids.
+    """
+
+    def __init__(self):
+        self.occurrences = []
+        self.by_reference = defaultdict(list)
+
+    def add(self, page, bbox, marker, kind, numbers):
+        occ_id = len(self.occurrences)
+        self.occurrences.append({
+            "id": occ_id,
+            "page": page,
+            "bbox": bbox,
+            "marker": marker,
+            "kind": kind,
+            "references": numbers,
+        })
+        for number in numbers:
+            self.by_reference[number].append(occ_id)
+
+    def occurrences_of(self, number):
+        """Return every place in the body where reference *number* is cited."""
+        return [self.occurrences[i] for i in self.by_reference.get(number, [])]
+
+    def occurrence(self, occ_id):
+        """Return the occurrence with id *occ_id*, or None."""
+        if 0 <= occ_id < len(self.occurrences):
+            return self.occurrences[occ_id]
+        return None
 
 
 class Navigator:
@@ -10,32 +94,145 @@ class Navigator:
     )
     # Pattern for numbered references like [1], [2], etc.
     _REF_NUMBER = re.compile(r"^\[(\d+)\]")
+    # In-text numeric markers: [3], [3, 7-9], [2; 5]
+    _NUMERIC_MARKER = re.compile(
+        r"\[(\d+(?:\s*[-–]\s*\d+)?(?:\s*[,;]\s*\d+(?:\s*[-–]\s*\d+)?)*)\]"
+    )
+    # In-text author-year markers: "Vaswani et al. (2017)", "He and Sun, 2016",
+    # "(Devlin, 2019)", "Devlin (2019)".  Group 1 is the surname, group 2 the year.
+    _NAME = r"([A-Z][A-Za-z'\-]+)"
+    _YEAR = r"((?:19|20)\d{2})[a-z]?"
+    _AUTHOR_YEAR_MARKERS = (
+        re.compile(_NAME + r"\s+(?:et\s+al\.?|(?:and|&)\s+[A-Z][A-Za-z'\-]+),?\s+\(?" + _YEAR + r"\)?"),
+        re.compile(r"\(" + _NAME + r",\s*" + _YEAR),
+        re.compile(_NAME + r"\s+\(" + _YEAR + r"\)"),
+    )
+    _MAX_RANGE = 50
+    # "6", "reference 6", "paper 6": shares its cue words with normalize_spoken
+    _SPOKEN_NUMBER = re.compile(r"^(?:(?:" + "|".join(sorted(NUMBER_CUES)) + r")\s+)?(\d+)$")
+    MIN_FUZZY_CONFIDENCE = 0.5
+
+    def __init__(self):
+        self._indexes = DocumentCache(name="reference_index")
+        self._graphs = DocumentCache(name="citation_graph")
+
+    def reference_index(self, pdf_data):
+        """Return the document's ReferenceIndex, parsing it on first use."""
+        return self._indexes.get_or_build(
+            pdf_data, lambda d: ReferenceIndex(self._parse_references(d))
+        )
+
+    def invalidate(self, pdf_data):
+        """Forget the cached bibliography and citation graph for a document."""
+        self._indexes.invalidate(pdf_data)
+        self._graphs.invalidate(pdf_data)
+
+    def cached_structures(self, pdf_data):
+        """Return the structures currently cached for a document, without building any."""
+        cached = {
+            "reference_index": self._indexes.get(pdf_data),
+            "citation_graph": self._graphs.get(pdf_data),
+        }
+        return {name: value for name, value in cached.items() if value is not None}
+
+    def citation_graph(self, pdf_data):
+        """Return the document's CitationGraph, building it on first use.
+
+        Markers are only linked when they match a parsed bibliography entry,
+        and entries are parsed from ``[N]``-numbered bibliographies, so
+        author-year papers with unnumbered reference lists get no links.
+        """
+        return self._graphs.get_or_build(pdf_data, self._build_citation_graph)
+
+    def _expand_numbers(self, marker):
+        numbers = []
+        for part in re.split(r"[,;]", marker):
+            bounds = [int(n) for n in re.findall(r"\d+", part)]
+            if len(bounds) == 2 and 0 <= bounds[1] - bounds[0] <= self._MAX_RANGE:
+                numbers.extend(range(bounds[0], bounds[1] + 1))
+            else:
+                numbers.extend(bounds)
+        return numbers
+
+    def _marker_bbox(self, block, start, end):
+        """Approximate a marker's bbox from its character offsets in the span."""
+        x0, y0, x1, y1 = block["bbox"]
+        length = max(len(block["text"]), 1)
+        width = x1 - x0
+        return [round(x0 + width * start / length, 1), y0, round(x0 + width * end / length, 1), y1]
+
+    def _build_citation_graph(self, pdf_data):
+        """Scan body spans for citation markers and link them to references."""
+        graph = CitationGraph()
+        if not pdf_data or "pages" not in pdf_data:
+            return graph
+
+        index = self.reference_index(pdf_data)
+        ref_start_page, ref_start_block = self._find_references_start(pdf_data["pages"])
+
+        for page in pdf_data["pages"]:
+            page_num = page["page_num"]
+            if ref_start_page is not None and page_num > ref_start_page:
+                break
+            blocks = page["blocks"]
+            if page_num == ref_start_page:
+                blocks = blocks[:ref_start_block - 1]
+
+            for block in blocks:
+                text = block["text"]
+                if ref_start_page is None and self._REF_NUMBER.match(text):
+                    # Without a header, skip what looks like bibliography entries
+                    continue
+                for m in self._NUMERIC_MARKER.finditer(text):
+                    numbers = [n for n in self._expand_numbers(m.group(1)) if index.get(n)]
+                    if numbers:
+                        graph.add(page_num, self._marker_bbox(block, m.start(), m.end()),
+                                  m.group(0), "numeric", numbers)
+                seen = set()
+                for pattern in self._AUTHOR_YEAR_MARKERS:
+                    for m in pattern.finditer(text):
+                        if any(start <= m.start() < end for start, end in seen):
+                            continue
+                        seen.add((m.start(), m.end()))
+                        matches = index.search(f"{m.group(1)} {m.group(2)}")
+                        if matches:
+                            graph.add(page_num, self._marker_bbox(block, m.start(), m.end()),
+                                      m.group(0), "author_year", [matches[0]["number"]])
+
+        return graph
 
     def list_references(self, pdf_data):
         """Extract bibliography entries from the PDF.
 
-        Looks for a References/Bibliography section header, then parses
-        numbered entries of the form ``[N] text``.  Falls back to scanning
-        the last 2 pages if no header is found.
+        The parsed bibliography is cached per document, so repeated calls
+        are free until the document changes.
 
         Returns a list of dicts with number, text, and page.
         """
         if not pdf_data or "pages" not in pdf_data:
             return []
+        return list(self.reference_index(pdf_data).references)
 
-        pages = pdf_data["pages"]
-        ref_start_page = None
-        ref_start_block = None
-
-        # Pass 1: find the references section header
+    def _find_references_start(self, pages):
+        """Return ``(page_num, block_index)`` of the first block after the
+        references header, or ``(None, None)`` if there is no header."""
         for page in pages:
             for i, block in enumerate(page["blocks"]):
                 if self._SECTION_HEADERS.match(block["text"].strip()):
-                    ref_start_page = page["page_num"]
-                    ref_start_block = i + 1
-                    break
-            if ref_start_page is not None:
-                break
+                    return page["page_num"], i + 1
+        return None, None
+
+    def _parse_references(self, pdf_data):
+        """Parse bibliography entries from the PDF.
+
+        Looks for a References/Bibliography section header, then parses
+        numbered entries of the form ``[N] text``.  Falls back to scanning
+        the last 2 pages if no header is found.
+        """
+        pages = pdf_data["pages"]
+
+        # Pass 1: find the references section header
+        ref_start_page, ref_start_block = self._find_references_start(pages)
 
         # Collect candidate text blocks
         candidates = []
@@ -84,30 +281,53 @@ class Navigator:
 
         return references
 
-    def find_citation(self, pdf_data, reference):
+    def find_citation(self, pdf_data, reference, top_k=3):
         """Find a specific citation by number (e.g. ``"3"`` or ``"[3]"``)
         or by text match (e.g. ``"Smith 2020"``).
 
+        Text queries first look for the query verbatim, then for an entry
+        containing every word of it; if none does, the query is normalized
+        for speech ("Vaswani et al twenty seventeen") and matched
+        approximately.
+
         Returns a dict with ``found``, and if found: ``number``, ``text``,
-        ``page``, ``bbox``.
+        ``page``, ``bbox``, ``match`` (``"number"``, ``"exact"`` or
+        ``"fuzzy"``) and ``confidence``.  Fuzzy lookups also return the
+        top-k ``candidates``.
         """
-        refs = self.list_references(pdf_data)
-        if not refs:
+        if not pdf_data or "pages" not in pdf_data:
+            return {"found": False, "reference": reference}
+        index = self.reference_index(pdf_data)
+        if not index.references:
             return {"found": False, "reference": reference}
 
-        # Try numeric lookup first
+        # Try numeric lookup first ("6", "[6]", "reference six")
         clean = reference.strip().strip("[]")
-        if clean.isdigit():
-            num = int(clean)
-            for ref in refs:
-                if ref["number"] == num:
-                    return {"found": True, **ref}
+        spoken = normalize_spoken(clean)
+        number = self._SPOKEN_NUMBER.match(spoken)
+        if clean.isdigit() or number:
+            ref = index.get(int(clean) if clean.isdigit() else int(number.group(1)))
+            if ref:
+                return {"found": True, **ref, "match": "number", "confidence": 1.0}
             return {"found": False, "reference": reference}
 
-        # Text-based search (case-insensitive substring)
-        query = reference.lower()
-        for ref in refs:
-            if query in ref["text"].lower():
-                return {"found": True, **ref}
+        # Text-based search: the query as a substring of the entry first,
+        # which also matches partial words ("Vasw"), then every word of it
+        # anywhere in the entry (case-insensitive)
+        matches = index.containing(reference) or index.search(reference) or index.search(spoken)
+        if matches:
+            return {"found": True, **matches[0], "match": "exact", "confidence": 1.0}
 
-        return {"found": False, "reference": reference}
+        candidates = index.fuzzy_search(spoken, top_k)
+        result = {
+            "found": False,
+            "reference": reference,
+            "candidates": [
+                {"number": ref["number"], "text": ref["text"], "page": ref["page"], "confidence": conf}
+                for ref, conf in candidates
+            ],
+        }
+        if candidates and candidates[0][1] >= self.MIN_FUZZY_CONFIDENCE:
+            best, conf = candidates[0]
+            result.update({"found": True, **best, "match": "fuzzy", "confidence": conf})
+        return result
@@ -3,138 +3,281 @@ Quiz Master Agent
 Generates conceptual questions from PDF content and evaluates student responses.
 """
 
+import math
 import random
-from typing import Dict, List, Any
+import re
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+from cache import DocumentCache
+from metrics import STAGE_DURATION
+from prompt_registry import PromptRegistry
+from singleflight import SingleFlight
+
+
+_TOKEN = re.compile(r"[a-z][a-z0-9\-]+")
+_STOPWORDS = frozenset("""
+a about above after all also an and any are as at be because been but by can could did do
+does each every for from had has have how if in into is it its just more most no not of on or other
+our over same so some such than that the their them then there these they this those through
+to too under up very was we were what when where which while who why will with would you your
+paper section figure table show shows shown use used using based et al
+""".split())
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercased content words with a light plural strip ("models" -> "model")."""
+    words = []
+    for w in _TOKEN.findall(text.lower()):
+        if w in _STOPWORDS:
+            continue
+        if len(w) > 4 and w.endswith("ies"):
+            w = w[:-3] + "y"
+        elif len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        words.append(w)
+    return words
 
 
 class QuizMaster:
     """Agent responsible for quiz generation and evaluation."""
+
+    KEY_TERMS_PER_QUESTION = 10
+    MIN_SECTION_CHARS = 120
+    PASS_SCORE = 0.35
     
-    def __init__(self):
+    def __init__(self, prompts: Optional[PromptRegistry] = None):
+        self.prompts = prompts or PromptRegistry()  # renders the "quiz_context" prompt
         self.quiz_sessions = {}  # session_id -> quiz state
+        self._materials = DocumentCache(name="quiz_material")  # pdf_data -> precomputed quiz material
+        self._contexts = SingleFlight("quiz_context")
     
-    def generate_quiz_context(self, pdf_data: Dict[str, Any], outline: Dict[str, Any], filename: str) -> str:
+    def prepare_material(self, pdf_data: Dict[str, Any], outline: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Generate a context string for the quiz mode that instructs the voice agent
-        to ask conceptual questions and evaluate responses.
+        Precompute the document-level quiz material (section list, content
+        snippets, key terms). Cached per document, so this runs once, in the
+        background after upload, rather than on quiz start.
         """
+        return self._materials.get_or_build(pdf_data, lambda d: self._build_material(d, outline))
+
+    def material_status(self, pdf_data: Dict[str, Any]) -> str:
+        """Return "ready", "building" or "missing" for a document's quiz material."""
+        if self._materials.get(pdf_data) is not None:
+            return "ready"
+        return "building" if self._materials.building(pdf_data) else "missing"
+
+    def cached_structures(self, session_id: str, pdf_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the quiz material and state currently held for a session."""
+        cached = {
+            "quiz_material": self._materials.get(pdf_data),
+            "quiz_state": self.quiz_sessions.get(session_id),
+        }
+        return {name: value for name, value in cached.items() if value is not None}
+
+    def _build_material(self, pdf_data: Dict[str, Any], outline: Dict[str, Any]) -> Dict[str, Any]:
         # Extract key concepts and sections
         key_terms = outline.get("key_terms", [])
         sections = outline.get("sections", [])
         abstract = outline.get("abstract", "")
-        total_pages = pdf_data.get("total_pages", 0)
-        
+
         # Build section summary
         section_list = []
         for s in sections[:5]:  # Focus on first 5 main sections
             section_list.append(f"- {s['heading']} (page {s['page']})")
-        
+
         # Extract some content snippets for question generation
         content_snippets = []
         for page in pdf_data.get("pages", [])[:10]:  # First 10 pages
             text = " ".join(b["text"] for b in page["blocks"])
             if len(text) > 100:
                 content_snippets.append(text[:500])  # First 500 chars
-        
-        quiz_context = f"""
-=== QUIZ MODE ACTIVATED ===
-
-You are now in Quiz Mode for "{filename}" ({total_pages} pages).
-
-PAPER OVERVIEW:
-Abstract: {abstract[:300] if abstract else "Not available"}
-
-Key Sections:
-{chr(10).join(section_list)}
-
-Key Terms: {', '.join(key_terms[:15]) if key_terms else "Various technical terms"}
-
-YOUR ROLE AS QUIZ MASTER:
-You are a friendly, encouraging tutor conducting a conceptual quiz on this paper. Your goal is to:
-1. Assess the student's understanding through verbal questions
-2. Provide playful, supportive feedback
-3. Help them learn by explaining concepts better when they struggle
-
-QUIZ BEHAVIOR:
-
-ASKING QUESTIONS:
-- Start by asking: "Great! Let's test your understanding. I'll ask you some conceptual questions about the paper. Ready?"
-- Ask ONE question at a time - clear, conceptual questions about the paper's main ideas
-- Focus on: key concepts, methodology, results, implications, and connections between ideas
-- Use questions like:
-  * "Can you explain what [concept] means in this paper?"
-  * "Why do the authors use [method/approach]?"
-  * "What's the main finding about [topic]?"
-  * "How does [concept A] relate to [concept B]?"
-- Vary difficulty - mix easier recall questions with deeper understanding questions
-- Reference specific parts: "On page X, the authors discuss Y. Can you explain why that's important?"
-
-EVALUATING CORRECT ANSWERS:
-When the student answers correctly:
-- Be enthusiastic and specific with praise: "Excellent! That's exactly right!"
-- Acknowledge what they did well: "You really understood the connection between X and Y"
-- Briefly reinforce the concept: "Yes, and this is important because..."
-- Optional: Add an interesting related insight or connection
-- Then move to next question: "Let's go deeper. Here's another question..."
-
-HANDLING INCORRECT/INCOMPLETE ANSWERS:
-When the student is wrong or partially correct:
-- Stay playful and supportive: "Hmm, not quite! Let me help you with this."
-- Never make them feel bad: "That's a common confusion - let me clarify!"
-- Gently correct: "Actually, the paper suggests that..." 
-- Explain the concept more clearly with an example or analogy
-- Break it down: "Think of it this way..."
-- Reference the paper: "On page X, the authors explain that..."
-- Optionally highlight the relevant text (use highlight_text action)
-- End encouragingly: "Does that make sense now? This is a tricky concept!"
-- Optionally ask a simpler follow-up to build confidence
-
-VOICE TONE:
-- Friendly, warm, and encouraging throughout
-- Never condescending or overly formal
-- Use natural conversational language
-- Show genuine enthusiasm for correct answers
-- Be patient and supportive with mistakes
-- Make learning feel like a fun dialogue, not an interrogation
-
-QUIZ PROGRESSION:
-- Ask 3-5 questions total (track mentally)
-- Start easier, gradually increase difficulty
-- Cover different aspects of the paper
-- After 3-5 questions, wrap up: "You did great! We covered [summary]. You have a solid understanding of [concepts]. Well done!"
-
-ACTIONS AVAILABLE (use these to enhance the quiz):
-- highlight_text: Highlight key terms or passages being discussed
-- navigate_to_page: Go to relevant pages when discussing specific content
-- Do NOT use MCP tools during quiz mode
-
-IMPORTANT RULES:
-- ONE question at a time - wait for student response before next question
-- Keep responses focused and concise (3-5 sentences max per turn)
-- Be genuinely encouraging - this is about learning, not just testing
-- Make corrections feel helpful, not critical
-- Celebrate understanding, support confusion
-
-Content to draw questions from:
-{chr(10).join(content_snippets[:3])}
-
-Now begin the quiz! Start with your opening and first question.
-"""
-        return quiz_context
-    
+                if len(content_snippets) == 3:
+                    break
+
+        return {
+            "total_pages": pdf_data.get("total_pages", 0),
+            "abstract": abstract[:300] if abstract else "Not available",
+            "sections": "\n".join(section_list),
+            "key_terms": ", ".join(key_terms[:15]) if key_terms else "Various technical terms",
+            "snippets": "\n".join(content_snippets),
+            "answer_keys": self._build_answer_keys(pdf_data, outline),
+        }
+
+    def _section_texts(self, pdf_data: Dict[str, Any], outline: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Split the body text at the outline's headings."""
+        blocks = [
+            (page["page_num"], b["text"])
+            for page in pdf_data.get("pages", [])
+            for b in page["blocks"]
+        ]
+        sections = outline.get("sections", [])
+
+        starts = []
+        pos = 0
+        for s in sections:
+            for i in range(pos, len(blocks)):
+                if blocks[i][0] == s["page"] and blocks[i][1].strip() == s["heading"]:
+                    starts.append((i, s))
+                    pos = i + 1
+                    break
+
+        if not starts:
+            text = " ".join(t for _, t in blocks)
+            return [{"heading": "the paper", "page": 1, "text": text}] if text else []
+
+        result = []
+        for n, (i, s) in enumerate(starts):
+            end = starts[n + 1][0] if n + 1 < len(starts) else len(blocks)
+            text = " ".join(t for _, t in blocks[i + 1:end])
+            if len(text) >= self.MIN_SECTION_CHARS:
+                result.append({"heading": s["heading"], "page": s["page"], "text": text})
+        return result
+
+    def _build_answer_keys(self, pdf_data: Dict[str, Any], outline: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Precompute an answer key per candidate question (one per section):
+        a weighted key-term set and an L2-normalized TF-IDF vector of the
+        section text, so answers can be scored with sparse overlaps.
+        """
+        sections = self._section_texts(pdf_data, outline)
+        counts = [Counter(_tokens(s["text"])) for s in sections]
+        doc_freq = Counter(t for c in counts for t in c)
+        n = len(sections)
+        outline_terms = {t for term in outline.get("key_terms", []) for t in _tokens(term)}
+
+        keys = []
+        for qid, (section, tf) in enumerate(zip(sections, counts)):
+            vector = {t: (1 + math.log(c)) * math.log(1 + n / doc_freq[t]) for t, c in tf.items()}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            vector = {t: w / norm for t, w in vector.items()}
+
+            # Key terms: the section's most distinctive words, boosted when
+            # they are also paper-level key terms or appear in the heading.
+            heading_terms = set(_tokens(section["heading"]))
+            boosted = {
+                t: w * (2.0 if t in outline_terms else 1.0) * (1.5 if t in heading_terms else 1.0)
+                for t, w in vector.items()
+            }
+            top = sorted(boosted.items(), key=lambda kv: kv[1], reverse=True)[:self.KEY_TERMS_PER_QUESTION]
+            total = sum(w for _, w in top) or 1.0
+
+            keys.append({
+                "id": qid,
+                "section": section["heading"],
+                "page": section["page"],
+                "question": f"Can you explain what the paper says about {section['heading']}?",
+                "terms": {t: round(w / total, 4) for t, w in top},
+                "vector": vector,
+            })
+        return keys
+
+    def answer_keys(self, pdf_data: Dict[str, Any], outline: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return the precomputed answer keys for a document."""
+        return self.prepare_material(pdf_data, outline)["answer_keys"]
+
+    def _score_against(self, key: Dict[str, Any], answer_tf: Counter, answer_norm: float) -> Dict[str, Any]:
+        terms = key["terms"]
+        matched = [t for t in terms if t in answer_tf]
+        coverage = sum(terms[t] for t in matched)
+
+        vector = key["vector"]
+        dot = sum(c * vector[t] for t, c in answer_tf.items() if t in vector)
+        cosine = dot / answer_norm if answer_norm else 0.0
+
+        score = round(0.6 * coverage + 0.4 * cosine, 3)
+        return {
+            "question_id": key["id"],
+            "section": key["section"],
+            "page": key["page"],
+            "score": score,
+            "correct": score >= self.PASS_SCORE,
+            "matched_terms": matched,
+            "missing_terms": [t for t in terms if t not in answer_tf],
+        }
+
+    def score_to_quality(self, score: float) -> int:
+        """Map an answer score (0-1) to an SM-2 recall quality (0-5)."""
+        if score >= 0.7:
+            return 5
+        if score >= 0.5:
+            return 4
+        if score >= self.PASS_SCORE:
+            return 3
+        if score >= 0.2:
+            return 2
+        return 1
+
+    def score_answer(self, session_id: str, pdf_data: Dict[str, Any], outline: Dict[str, Any],
+                     answer: str, question_id: Optional[int] = None,
+                     section: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Score a transcribed answer against a precomputed answer key and update
+        the session's quiz counts. The key is chosen by question id, by section
+        heading, or else the best-matching section for the answer.
+        """
+        keys = self.answer_keys(pdf_data, outline)
+        if not keys:
+            raise ValueError("No answer keys available for this document")
+
+        candidates = keys
+        if question_id is not None:
+            candidates = [k for k in keys if k["id"] == question_id]
+        elif section:
+            wanted = section.strip().lower()
+            candidates = [k for k in keys if k["section"].lower() == wanted] or keys
+        if not candidates:
+            raise ValueError(f"Unknown question_id: {question_id}")
+
+        answer_tf = Counter(_tokens(answer))
+        answer_norm = math.sqrt(sum(c * c for c in answer_tf.values()))
+        result = max(
+            (self._score_against(k, answer_tf, answer_norm) for k in candidates),
+            key=lambda r: r["score"],
+        )
+
+        state = self.quiz_sessions.get(session_id)
+        if state is not None:
+            state["questions_asked"] += 1
+            state["correct_count"] += int(result["correct"])
+            result["questions_asked"] = state["questions_asked"]
+            result["correct_count"] = state["correct_count"]
+        return result
+
+    def generate_quiz_context(self, pdf_data: Dict[str, Any], outline: Dict[str, Any], filename: str) -> str:
+        """
+        Generate a context string for the quiz mode that instructs the voice agent
+        to ask conceptual questions and evaluate responses.
+        """
+        return self.quiz_context(pdf_data, outline, filename)[0]
+
+    def quiz_context(self, pdf_data: Dict[str, Any], outline: Dict[str, Any], filename: str) -> Tuple[str, str]:
+        """
+        Return ``(context, prompt version)`` for quiz mode. Concurrent calls for
+        the same document share one build.
+        """
+        return self._contexts.do((id(pdf_data), filename), self._quiz_context, pdf_data, outline, filename)
+
+    @STAGE_DURATION.time(stage="quiz_context")
+    def _quiz_context(self, pdf_data: Dict[str, Any], outline: Dict[str, Any], filename: str) -> Tuple[str, str]:
+        material = self.prepare_material(pdf_data, outline)
+        return self.prompts.render("quiz_context", filename=filename, **material)
+
     def start_quiz(self, session_id: str, pdf_data: Dict[str, Any], outline: Dict[str, Any], filename: str) -> Dict[str, Any]:
         """Initialize a quiz session."""
         self.quiz_sessions[session_id] = {
             "active": True,
             "questions_asked": 0,
             "correct_count": 0,
-            "current_question": None
         }
         
         return {
             "status": "quiz_started",
             "session_id": session_id,
-            "message": "Quiz mode activated. The tutor will now ask conceptual questions."
+            "message": "Quiz mode activated. The tutor will now ask conceptual questions.",
+            "questions": [
+                {"id": k["id"], "section": k["section"], "page": k["page"], "question": k["question"]}
+                for k in self.answer_keys(pdf_data, outline)
+            ],
         }
     
     def end_quiz(self, session_id: str) -> Dict[str, Any]:
@@ -0,0 +1,115 @@
+"""
+Reference Resolver Agent
+Resolves a paper's bibliography against ArXiv ahead of time so citation
+lookups can return the referenced paper without a live search.  Lookups
+go through the Librarian's paced background upstream, one at a time.
+"""
+
+import re
+
+from cache import normalize_arxiv_id
+
+
+class ReferenceResolver:
+    """Background resolver that maps bibliography entries to ArXiv papers."""
+
+    # New-style (1706.03762v5) and old-style (hep-th/9901001) identifiers
+    _ARXIV_ID = re.compile(
+        r"(?:arxiv[:\s]*|arxiv\.org/(?:abs|pdf)/)"
+        r"(\d{4}\.\d{4,5}(?:v\d+)?|[a-z\-]+(?:\.[a-z]{2})?/\d{7}(?:v\d+)?)",
+        re.IGNORECASE,
+    )
+    _QUOTED_TITLE = re.compile(r"[\"“”](.{10,300}?)[\"“”]")
+    _WORD = re.compile(r"[a-z0-9]+")
+
+    MAX_TITLE_SEARCHES = 40
+    MIN_TITLE_OVERLAP = 0.6
+
+    def __init__(self, librarian, navigator):
+        self.librarian = librarian
+        self.navigator = navigator
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    def _extract_title(self, text):
+        """Best-effort title extraction from a formatted reference entry."""
+        body = re.sub(r"^\[\d+\]\s*", "", text).strip()
+        quoted = self._QUOTED_TITLE.search(body)
+        if quoted:
+            return quoted.group(1).strip(" ,.")
+
+        # "Authors. Title. Venue, year." — the title is usually the first
+        # sentence after the author list with a few real words in it.
+        parts = [p.strip() for p in re.split(r"\.\s+", body) if p.strip()]
+        for part in parts[1:]:
+            words = part.split()
+            if len(words) >= 3 and not re.match(r"(?i)^(in|proc|arxiv|vol)\b", part):
+                return part.strip(" ,.")
+        return None
+
+    def extract_candidates(self, references):
+        """Pull arXiv IDs and titles out of parsed bibliography entries."""
+        candidates = []
+        for ref in references:
+            m = self._ARXIV_ID.search(ref["text"])
+            candidates.append({
+                "number": ref["number"],
+                "arxiv_id": normalize_arxiv_id(m.group(1)) if m else None,
+                "title": self._extract_title(ref["text"]),
+            })
+        return candidates
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def _title_overlap(self, a, b):
+        wa = set(self._WORD.findall(a.lower()))
+        wb = set(self._WORD.findall(b.lower()))
+        if not wa or not wb:
+            return 0.0
+        return len(wa & wb) / len(wa | wb)
+
+    def _resolve_ids(self, ids):
+        """Resolve arXiv IDs via the Librarian's batched id_list lookup."""
+        try:
+            papers, _ = self.librarian.get_papers_details(ids, background=True)
+        except Exception:
+            return {}
+        return papers
+
+    def _resolve_title(self, title):
+        papers, _ = self.librarian.search(title, max_results=1, background=True)
+        if papers and self._title_overlap(title, papers[0]["title"]) >= self.MIN_TITLE_OVERLAP:
+            return papers[0]
+        return None
+
+    def resolve(self, pdf_data):
+        """Resolve every bibliography entry that can be matched on ArXiv.
+
+        Returns a dict mapping reference number -> paper dict.
+        """
+        candidates = self.extract_candidates(self.navigator.list_references(pdf_data))
+        resolved = {}
+
+        with_ids = [c for c in candidates if c["arxiv_id"]]
+        if with_ids:
+            papers = self._resolve_ids(sorted({c["arxiv_id"] for c in with_ids}))
+            for c in with_ids:
+                paper = papers.get(c["arxiv_id"])
+                if paper:
+                    resolved[c["number"]] = paper
+
+        titled = [c for c in candidates if c["number"] not in resolved and c["title"]]
+        # Sequential on purpose: the upstream spaces searches out anyway
+        for c in titled[:self.MAX_TITLE_SEARCHES]:
+            try:
+                paper = self._resolve_title(c["title"])
+            except Exception:
+                paper = None
+            if paper:
+                resolved[c["number"]] = paper
+
+        return resolved
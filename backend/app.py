@@ -6,244 +6,322 @@ import uuid
 import time
 import threading
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
 from dotenv import load_dotenv
-
-from pdf_processor import PDFProcessor
-from vocal_bridge import VocalBridgeClient
-from agents import Librarian, Navigator, QuizMaster
+from werkzeug.local import LocalProxy
+
+import metrics
+from cache import DocumentCache
+from debate import DebateError
+from memory import session_report
+from pdf_pool import PoolBusy
+from profiling import ProfilingMiddleware
+from services import Services, config_from_env
+from singleflight import SingleFlight
+from socketio_queue import socketio_options
+from spaced_repetition import mastery_to_quality
 
 load_dotenv()
 
-app = Flask(__name__)
-app.config["SECRET_KEY"] = "learnaloud-secret"
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")
-
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+routes = Blueprint("learnaloud", __name__)
+socketio = SocketIO()
 
-pdf_processor = PDFProcessor()
-vocal_bridge = VocalBridgeClient(os.getenv("VOCAL_BRIDGE_API_KEY", ""))
-vocal_bridge_author = VocalBridgeClient(os.getenv("VOCAL_BRIDGE_AUTHOR_API_KEY", ""))
-vocal_bridge_reviewer = VocalBridgeClient(os.getenv("VOCAL_BRIDGE_REVIEWER_API_KEY", ""))
-librarian = Librarian(UPLOAD_DIR, pdf_processor)
-navigator = Navigator()
-quiz_master = QuizMaster()
+# The current app's agents and clients, built on first use (see create_app)
+services = LocalProxy(lambda: current_app.extensions["learnaloud"])
 
 # In-memory session store: session_id -> {filepath, pdf_data, filename, outline}
 sessions = {}
 
 
+def create_app(config=None):
+    """Build the Flask app.
+
+    *config* overrides the defaults from ``config_from_env()``.  Agents and
+    upstream clients are not constructed here; each is built the first
+    time a request needs it.  Each app keeps its own Services in
+    ``app.extensions["learnaloud"]``.  The session store and the Socket.IO
+    server are per process, so one serving app per process is expected.
+    """
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+    os.makedirs(app.config["UPLOAD_DIR"], exist_ok=True)
+    os.makedirs(app.config["DATA_DIR"], exist_ok=True)
+
+    services = app.extensions["learnaloud"] = Services(app.config)
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    app.register_blueprint(routes)
+    # With a message queue, emits reach clients connected to any worker
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        async_mode="eventlet",
+        **socketio_options(app.config["SOCKETIO_MESSAGE_QUEUE"]),
+    )
+
+    # Admins profile a request with "X-Profile: 1" (or ?profile=1) plus X-Admin-Token;
+    # LEARNALOUD_PROFILE_SAMPLE_EVERY=N also profiles every Nth request.
+    services.profiler = ProfilingMiddleware(
+        app,
+        os.path.join(app.config["DATA_DIR"], "profiles"),
+        admin_token=app.config["ADMIN_TOKEN"],
+        sample_every=app.config["PROFILE_SAMPLE_EVERY"],
+    )
+    app.wsgi_app = services.profiler
+
+    metrics.SESSIONS.set_function(lambda: len(sessions))
+    metrics.CACHED_BYTES.set_function(lambda: _dir_bytes(app.config["CACHE_DIR"]), cache="http")
+    metrics.CACHED_BYTES.set_function(lambda: _dir_bytes(services.library_dir), cache="library")
+    metrics.CACHED_BYTES.set_function(lambda: _dir_bytes(services.page_cache_dir), cache="pdf_pages")
+
+    if app.config["WARM_TOKEN_POOLS"]:
+        services.warm_token_pools()
+    return app
+
+
+def __getattr__(name):
+    # Keeps "gunicorn app:app", "from app import app" and app.<agent> working:
+    # the default app is created on first access, agents resolve via its services.
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    if not name.startswith("_") and hasattr(Services, name):
+        default = globals().get("app") or __getattr__("app")
+        return getattr(default.extensions["learnaloud"], name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _dir_bytes(path):
+    """Total size of the files directly under *path*."""
+    try:
+        return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+    except OSError:
+        return 0
 
-def _build_pdf_context(pdf_data, filename, outline):
-    """Build the full PDF context string for the voice tutor."""
-    outline_lines = []
+
+@routes.before_app_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+
+
+@routes.after_app_request
+def _count_request(response):
+    route = g.get("metrics_route", "unmatched")
+    metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    return response
+
+
+@routes.teardown_app_request
+def _observe_request(exc):
+    if "request_start" not in g:
+        return
+    metrics.HTTP_IN_FLIGHT.dec(route=g.metrics_route)
+    metrics.HTTP_REQUEST_DURATION.observe(
+        time.perf_counter() - g.request_start, method=request.method, route=g.metrics_route,
+    )
+
+
+# Tabs joining the same session at once share one build of each context
+_context_flight = SingleFlight("context")
+
+
+def _session_context(session_id, session, builder):
+    """Build a session's agent context, sharing the work among concurrent requests."""
+    return _context_flight.do(
+        (builder.__name__, session_id), builder,
+        session["pdf_data"], session.get("filename", ""), session.get("outline", {}),
+    )
+
+
+def _outline_text(outline, full):
+    """The outline slot of an agent context; *full* adds figures and key terms."""
+    lines = []
     if outline.get("abstract"):
-        outline_lines.append(f"ABSTRACT: {outline['abstract']}")
-        outline_lines.append("")
+        lines.append(f"ABSTRACT: {outline['abstract']}")
+        lines.append("")
     if outline.get("sections"):
-        outline_lines.append("PAPER STRUCTURE:")
+        lines.append("PAPER STRUCTURE:")
         for s in outline["sections"]:
             indent = "  " if s["level"] == 2 else ""
-            outline_lines.append(f"{indent}- {s['heading']} (page {s['page']})")
-        outline_lines.append("")
-    if outline.get("figures"):
-        outline_lines.append("FIGURES:")
+            lines.append(f"{indent}- {s['heading']} (page {s['page']})")
+        lines.append("")
+    if full and outline.get("figures"):
+        lines.append("FIGURES:")
         for f in outline["figures"]:
-            outline_lines.append(f"- {f['label']} (page {f['page']}, bbox=({f['bbox'][0]:.0f},{f['bbox'][1]:.0f},{f['bbox'][2]:.0f},{f['bbox'][3]:.0f}))")
-        outline_lines.append("")
-    if outline.get("key_terms"):
-        outline_lines.append(f"KEY TERMS: {', '.join(outline['key_terms'])}")
-        outline_lines.append("")
-
-    total_pages = pdf_data.get("total_pages", len(pdf_data.get("pages", [])))
-    lines = [
-        f'PDF: "{filename}" — {total_pages} pages.',
-        "",
-        "=== PAPER OUTLINE (preprocessed) ===",
-        *outline_lines,
-        "=== END OUTLINE ===",
-        "",
-        "=== FULL PDF TEXT (every page, every word) ===",
-    ]
+            lines.append(f"- {f['label']} (page {f['page']}, bbox=({f['bbox'][0]:.0f},{f['bbox'][1]:.0f},{f['bbox'][2]:.0f},{f['bbox'][3]:.0f}))")
+        lines.append("")
+    if full and outline.get("key_terms"):
+        lines.append(f"KEY TERMS: {', '.join(outline['key_terms'])}")
+        lines.append("")
+    return "".join(line + "\n" for line in lines)
+
+
+def _build_paper_texts(pdf_data):
+    plain, with_figures = [], []
     for page in pdf_data.get("pages", []):
-        lines.append(f"--- Page {page['page_num']} ---")
-        lines.append(" ".join(b["text"] for b in page["blocks"]))
+        header = f"--- Page {page['page_num']} ---\n" + " ".join(b["text"] for b in page["blocks"]) + "\n"
+        plain.append(header + "\n")
+        with_figures.append(header)
         for fig in page.get("figures", []):
             bbox = fig["bbox"]
-            lines.append(
+            with_figures.append(
                 f'[FIGURE on page {page["page_num"]}: "{fig["label"]}" '
                 f"bbox=({bbox[0]:.0f},{bbox[1]:.0f},{bbox[2]:.0f},{bbox[3]:.0f}) "
-                f"pageSize=({page['width']:.0f},{page['height']:.0f})]"
+                f"pageSize=({page['width']:.0f},{page['height']:.0f})]\n"
             )
-        lines.append("")
-    lines.append("=== END FULL PDF TEXT ===")
-    lines.append("")
-
-    lines += [
-        f'You are a voice tutor teaching "{filename}" ({total_pages} pages). The full text is above. Answer everything from it immediately — never say "let me look that up" or go silent.',
-        "",
-        "BEHAVIOR:",
-        "- Respond instantly with substance. No filler phrases, no stalling, no silence.",
-        "- Answer paper questions from the text above. Answer general knowledge from your own knowledge.",
-        "- ONLY use MCP tools when the student asks about a specific reference paper (e.g. 'tell me about reference 6') and wants a summary of that external paper. Never use MCP for anything else.",
-        f"- Only use page numbers 1-{total_pages} from the '--- Page N ---' markers above. Never guess pages.",
-        "",
-        "FIRST MESSAGE: Start teaching immediately. Do NOT use any tools or MCP calls. Highlight the title, summarize the paper (2-3 sentences) from the abstract above, cover key points, then ask where to dive in.",
-        "",
-        "TEACHING: Navigate to the page first (navigate_to_page), then highlight the heading, give a 1-2 sentence overview, then explain in 3-4 sentences with details. Highlight key terms as you go. Give 4-6 sentences per response, then let the student absorb.",
-        "",
-        "ACTIONS (send via client_action):",
-        '- highlight_text: {"text": "...", "color": "yellow", "page": N} — highlight text (auto-navigates to page). Do this frequently and silently.',
-        '- highlight_region: {"page": N, "x": X, "y": Y, "w": W, "h": H, "color": "blue"} — highlight a figure using bbox from [FIGURE] markers above.',
-        '- navigate_to_page: {"page": N} — ALWAYS send this before discussing content on a different page. If the student says "go to page 2" or you start explaining something on page 2, send this FIRST.',
-        '- find_citation: {"reference": "6"} — highlight a reference on screen. Read the reference text yourself from the PDF above first; never ask the student what it says.',
-        '- download_paper: {"arxiv_id": "2004.13438v2"} — download a paper for the student to preview.',
-        '- searching_arxiv: {"query": "..."} — send before MCP tool calls. Send search_complete with {} after.',
-        '- session_summary: {"concepts": [...], "overallPerformance": "good", "keyTakeaways": [...]} — emit when session ends.',
-        "",
-        "MCP TOOLS — only when the student asks about a reference paper from the bibliography:",
-        "- mcp-tools_search_arxiv(query, limit) — search ArXiv to find the referenced paper.",
-        "- mcp-tools_get_paper_details(paper_id, include_content=true) — get full details to summarize the reference paper.",
-        "Workflow: read the reference text from the PDF above → search ArXiv with the title → get_paper_details → summarize for the student → offer download_paper.",
-        "",
-        "MULTI-PAPER: You may receive paper_switched messages. Acknowledge briefly and give a 2-3 sentence overview. Use session_id in highlights for non-main papers.",
-        "",
-    ]
-    return "\n".join(lines)
+        with_figures.append("\n")
+    return {"plain": "".join(plain), "figures": "".join(with_figures)}
+
+
+# The full-text slot is the expensive part of every context; it only
+# changes with the document
+_paper_texts = DocumentCache(name="paper_text")
+
+
+def _render_context(agent, pdf_data, filename, outline, full):
+    """Render *agent*'s current context prompt; returns ``(context, version)``."""
+    texts = _paper_texts.get_or_build(pdf_data, _build_paper_texts)
+    return services.prompts.render(
+        agent,
+        filename=filename,
+        total_pages=pdf_data.get("total_pages", len(pdf_data.get("pages", []))),
+        outline=_outline_text(outline, full),
+        paper_text=texts["figures" if full else "plain"],
+    )
+
 
+def _record_prompt_version(session, agent, version):
+    """Remember which prompt version produced the session's latest *agent* context."""
+    session.setdefault("prompt_versions", {})[agent] = version
 
+
+def _store_quiz_context(session):
+    context, version = services.quiz_master.quiz_context(
+        session["pdf_data"], session.get("outline", {}), session.get("filename", ""),
+    )
+    session["quiz_context"] = context
+    _record_prompt_version(session, "quiz_context", version)
+
+
+def _quiz_context_ready(session_id, session):
+    """Make sure the session has its quiz context without building material inline.
+
+    Ready material is only formatted, and a build already in flight is
+    waited on.  Material that was never built, or was evicted, is handed to
+    the background job and False is returned so the caller can answer
+    "pending".
+    """
+    if session.get("quiz_context"):
+        return True
+    if services.quiz_master.material_status(session["pdf_data"]) == "missing":
+        _start_background_task(_prepare_quiz_material, session_id)
+        return False
+    _store_quiz_context(session)
+    return True
+
+
+def _quiz_context_pending(payload):
+    """200 telling the client the quiz context is still being prepared."""
+    response = jsonify({**payload, "context": None, "context_status": "pending"})
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+@metrics.STAGE_DURATION.time(stage="pdf_context")
+def _build_pdf_context(pdf_data, filename, outline):
+    """Build the full PDF context for the voice tutor; returns ``(context, version)``."""
+    return _render_context("tutor_context", pdf_data, filename, outline, full=True)
+
+
+@metrics.STAGE_DURATION.time(stage="debate_author_context")
 def _build_debate_author_context(pdf_data, filename, outline):
-    """Build context for the author agent in debate mode."""
-    outline_lines = []
-    if outline.get("abstract"):
-        outline_lines.append(f"ABSTRACT: {outline['abstract']}")
-        outline_lines.append("")
-    if outline.get("sections"):
-        outline_lines.append("PAPER STRUCTURE:")
-        for s in outline["sections"]:
-            indent = "  " if s["level"] == 2 else ""
-            outline_lines.append(f"{indent}- {s['heading']} (page {s['page']})")
-        outline_lines.append("")
-
-    total_pages = pdf_data.get("total_pages", len(pdf_data.get("pages", [])))
-    lines = [
-        f'PDF: "{filename}" — {total_pages} pages.',
-        "",
-        "=== PAPER OUTLINE ===",
-        *outline_lines,
-        "=== END OUTLINE ===",
-        "",
-        "=== FULL PDF TEXT ===",
-    ]
-    for page in pdf_data.get("pages", []):
-        lines.append(f"--- Page {page['page_num']} ---")
-        lines.append(" ".join(b["text"] for b in page["blocks"]))
-        lines.append("")
-    lines.append("=== END FULL PDF TEXT ===")
-    lines.append("")
-
-    lines += [
-        f"ROLE: You are the AUTHOR of this paper: \"{filename}\".",
-        "",
-        "DEBATE BEHAVIOR:",
-        "- You are confident and passionate about your work.",
-        "- Your PRIMARY ROLE is to ANSWER QUESTIONS and DEFEND your work.",
-        "- When you speak, STRONGLY DEFEND the paper's contributions, methodology, and findings.",
-        "- Your responses must be SHORT and CONCISE - under 40 seconds of speech (roughly 80-100 words).",
-        "- DO NOT ramble or go off-topic. Be direct and impactful.",
-        "- When you receive [REVIEWER CRITIQUE] messages, ANSWER their questions with evidence from the paper.",
-        "- Directly address each question or concern raised by the reviewer.",
-        "- Reference specific sections, results, and data to support your answers.",
-        "- Stay professional but assertive in your responses.",
-        "- Keep answers focused and on-point.",
-        "",
-        "CRITICAL - THINKING INDICATORS:",
-        "- If you need a moment to formulate your answer, IMMEDIATELY say something like:",
-        "  * 'Let me think about that...'",
-        "  * 'Hmm, interesting question...'",
-        "  * 'Give me a moment...'",
-        "  * 'Let me consider that...'",
-        "  * 'Good question, let me address that...'",
-        "- This keeps the listener engaged and aware you're preparing your response.",
-        "- NEVER be silent for more than 2-3 seconds. Always use filler phrases.",
-        "",
-        "RESPONSE LENGTH: 40 seconds maximum. Be punchy and effective.",
-        "",
-    ]
-    return "\n".join(lines)
+    """Build context for the author agent in debate mode; returns ``(context, version)``."""
+    return _render_context("debate_author_context", pdf_data, filename, outline, full=False)
 
 
+@metrics.STAGE_DURATION.time(stage="debate_reviewer_context")
 def _build_debate_reviewer_context(pdf_data, filename, outline):
-    """Build context for the reviewer agent in debate mode."""
-    outline_lines = []
-    if outline.get("abstract"):
-        outline_lines.append(f"ABSTRACT: {outline['abstract']}")
-        outline_lines.append("")
-    if outline.get("sections"):
-        outline_lines.append("PAPER STRUCTURE:")
-        for s in outline["sections"]:
-            indent = "  " if s["level"] == 2 else ""
-            outline_lines.append(f"{indent}- {s['heading']} (page {s['page']})")
-        outline_lines.append("")
-
-    total_pages = pdf_data.get("total_pages", len(pdf_data.get("pages", [])))
-    lines = [
-        f'PDF: "{filename}" — {total_pages} pages.',
-        "",
-        "=== PAPER OUTLINE ===",
-        *outline_lines,
-        "=== END OUTLINE ===",
-        "",
-        "=== FULL PDF TEXT ===",
-    ]
-    for page in pdf_data.get("pages", []):
-        lines.append(f"--- Page {page['page_num']} ---")
-        lines.append(" ".join(b["text"] for b in page["blocks"]))
-        lines.append("")
-    lines.append("=== END FULL PDF TEXT ===")
-    lines.append("")
-
-    lines += [
-        f"ROLE: You are a CRITICAL PEER REVIEWER evaluating this paper: \"{filename}\".",
-        "",
-        "DEBATE BEHAVIOR:",
-        "- You are skeptical and thorough in your review.",
-        "- Your PRIMARY ROLE is to ASK PROBING QUESTIONS about the paper.",
-        "- Point out WEAKNESSES, LIMITATIONS, and QUESTIONABLE CLAIMS by asking questions.",
-        "- Your responses must be SHORT and CONCISE - under 40 seconds of speech (roughly 80-100 words).",
-        "- DO NOT ramble or go off-topic. Be sharp and focused.",
-        "- When you receive [AUTHOR'S CLAIMS] messages, ask critical questions that challenge their arguments.",
-        "- Ask about methodology, interpretation of results, missing comparisons, and overstated conclusions.",
-        "- Frame your critiques as QUESTIONS that require the author to defend their work.",
-        "- Examples: 'How did you control for...?', 'Why didn't you compare with...?', 'What evidence supports...?'",
-        "- Stay professional but critical and direct.",
-        "- Focus on asking the most significant questions.",
-        "",
-        "CRITICAL - THINKING INDICATORS:",
-        "- If you need a moment to formulate your questions, IMMEDIATELY say something like:",
-        "  * 'Let me analyze this...'",
-        "  * 'Interesting, let me think...'",
-        "  * 'I need a moment to examine this claim...'",
-        "  * 'Wait, let me consider...'",
-        "  * 'Hmm, I'm thinking about this...'",
-        "- This keeps the listener engaged and aware you're preparing your response.",
-        "- NEVER be silent for more than 2-3 seconds. Always use filler phrases.",
-        "",
-        "RESPONSE LENGTH: 40 seconds maximum. Be incisive and focused on asking questions.",
-        "",
-    ]
-    return "\n".join(lines)
+    """Build context for the reviewer agent in debate mode; returns ``(context, version)``."""
+    return _render_context("debate_reviewer_context", pdf_data, filename, outline, full=False)
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
+
+def _prefetch_references(session_id):
+    """Resolve a session's bibliography against ArXiv in the background."""
+    session = sessions.get(session_id)
+    if not session:
+        return
+    session["references_status"] = "pending"
+    try:
+        session["resolved_references"] = services.reference_resolver.resolve(session["pdf_data"])
+        session["references_status"] = "ready"
+    except Exception as e:
+        print(f"[Prefetch] Reference resolution failed for {session_id}: {e}")
+        session["references_status"] = "failed"
+    socketio.emit("references_status", {
+        "session_id": session_id,
+        "status": session["references_status"],
+        "resolved": len(session.get("resolved_references", {})),
+    }, to=session_id)
+
+
+def _prepare_quiz_material(session_id):
+    """Precompute the document's quiz material so quiz start only formats it."""
+    session = sessions.get(session_id)
+    if not session:
+        return
+    try:
+        services.quiz_master.prepare_material(session["pdf_data"], session.get("outline", {}))
+    except Exception as e:
+        print(f"[Prefetch] Quiz material failed for {session_id}: {e}")
+
+
+def _index_document(session_id):
+    """Add a session's document to the cross-paper library index."""
+    session = sessions.get(session_id)
+    if not session:
+        return
+    try:
+        doc_id, added = services.library_index.add_document(
+            session["filepath"], session["pdf_data"], session["filename"], session_id,
+            source="arxiv" if session.get("arxiv_id") else "upload", arxiv_id=session.get("arxiv_id"),
+        )
+        session["document_id"] = doc_id
+        if not added:
+            print(f"[Library] {session['filename']} already indexed as {doc_id[:12]}")
+    except Exception as e:
+        print(f"[Library] Indexing failed for {session_id}: {e}")
+
+
+def _start_background_task(fn, *args):
+    """Run ``fn(*args)`` as a background task inside the current app's context."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            fn(*args)
+
+    return socketio.start_background_task(run)
+
+
+def _start_background_jobs(session_id):
+    _start_background_task(_prepare_quiz_material, session_id)
+    _start_background_task(_prefetch_references, session_id)
+    _start_background_task(_index_document, session_id)
 
 
 # ---------------------------------------------------------------------------
 # REST endpoints
 # ---------------------------------------------------------------------------
 
-@app.route("/api/upload-pdf", methods=["POST"])
+@routes.route("/api/upload-pdf", methods=["POST"])
 def upload_pdf():
     if "file" not in request.files:
         return jsonify({"error": "No file provided"}), 400
@@ -254,12 +332,13 @@ def upload_pdf():
 
     session_id = str(uuid.uuid4())
     filename = f"{session_id}.pdf"
-    filepath = os.path.join(UPLOAD_DIR, filename)
+    filepath = os.path.join(services.config["UPLOAD_DIR"], filename)
 
     try:
         file.save(filepath)
-        pdf_data = pdf_processor.extract_structure(filepath)
-        outline = pdf_processor.build_outline(pdf_data)
+        pdf_data = services.pdf_processor.extract_structure(filepath)
+        outline = services.pdf_processor.build_outline(pdf_data)
+        services.navigator.citation_graph(pdf_data)
         sessions[session_id] = {
             "filepath": filepath,
             "pdf_data": pdf_data,
@@ -269,35 +348,116 @@ def upload_pdf():
             "transcript_summary": "",
             "concepts_discussed": [],
         }
+        _start_background_jobs(session_id)
         return jsonify({
             "session_id": session_id,
             "filename": file.filename,
             "total_pages": pdf_data["total_pages"],
             "outline": outline,
         })
+    except PoolBusy as e:
+        return _pool_busy(e)
     except Exception as e:
         return jsonify({"error": f"Failed to process PDF: {e}"}), 500
 
 
-@app.route("/api/pdf/<session_id>", methods=["GET"])
+def _pool_busy(error):
+    """503 response telling the client when to retry a rejected PDF job."""
+    response = jsonify({"error": str(error)})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
+
+
+@routes.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _is_admin():
+    return services.profiler.is_admin(request.headers.get("X-Admin-Token"))
+
+
+@routes.route("/api/admin/profiles", methods=["GET"])
+def list_profiles():
+    if not _is_admin():
+        return jsonify({"error": "Admin token required"}), 403
+    try:
+        min_ms = float(request.args.get("min_ms", 0))
+        limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+    except ValueError:
+        return jsonify({"error": "min_ms must be a number and limit an integer"}), 400
+    profiles = services.profiler.list_profiles(
+        route=request.args.get("route"),
+        session_id=request.args.get("session_id"),
+        min_ms=min_ms,
+        limit=limit,
+    )
+    return jsonify({"profiles": profiles})
+
+
+@routes.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    if not _is_admin():
+        return jsonify({"error": "Admin token required"}), 403
+    path = services.profiler.profile_path(profile_id)
+    if not path:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_from_directory(os.path.dirname(path), os.path.basename(path), mimetype="text/plain")
+
+
+def _session_structures(session_id, session):
+    """Agent caches derived from a session's document, charged to that session."""
+    pdf_data = session.get("pdf_data")
+    if pdf_data is None:
+        return {}
+    return {
+        **services.navigator.cached_structures(pdf_data),
+        **services.quiz_master.cached_structures(session_id, pdf_data),
+    }
+
+
+@routes.route("/api/admin/memory", methods=["GET"])
+def memory_report():
+    """Estimated retained bytes per session and structure type.
+
+    ?tracemalloc=1 also diffs a tracemalloc snapshot against the previous
+    call (the first call starts tracing); ?tracemalloc=stop ends tracing.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Admin token required"}), 403
+    try:
+        top = min(max(int(request.args.get("top", 10)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "top must be an integer"}), 400
+    report = session_report(sessions, _session_structures, top=top)
+    mode = request.args.get("tracemalloc")
+    if mode == "stop":
+        report["tracemalloc"] = services.memory_tracker.stop()
+    elif mode:
+        report["tracemalloc"] = services.memory_tracker.diff(top=top)
+    return jsonify(report)
+
+
+@routes.route("/api/pdf/<session_id>", methods=["GET"])
 def serve_pdf(session_id):
     session = sessions.get(session_id)
     if not session:
         return jsonify({"error": "Session not found"}), 404
-    return send_from_directory(UPLOAD_DIR, os.path.basename(session["filepath"]))
+    filepath = session["filepath"]
+    return send_from_directory(os.path.dirname(filepath), os.path.basename(filepath))
 
 
-@app.route("/api/paper-context/<session_id>", methods=["GET"])
+@routes.route("/api/paper-context/<session_id>", methods=["GET"])
 def paper_context(session_id):
     session = sessions.get(session_id)
     if not session:
         return jsonify({"error": "Session not found"}), 404
 
-    pdf_data = session["pdf_data"]
     filename = session.get("filename", "")
     outline = session.get("outline", {})
 
-    context = _build_pdf_context(pdf_data, filename, outline)
+    context, version = _session_context(session_id, session, _build_pdf_context)
+    _record_prompt_version(session, "tutor_context", version)
 
     # Append handover info if a previous discussion exists
     transcript_summary = session.get("transcript_summary", "")
@@ -321,27 +481,24 @@ def paper_context(session_id):
         handover_lines.append("")
         context += "\n".join(handover_lines)
 
-    # If quiz mode is active, replace context with quiz context
-    if session.get("quiz_active"):
-        if not session.get("quiz_context"):
-            quiz_context = quiz_master.generate_quiz_context(
-                pdf_data,
-                outline,
-                filename
-            )
-            session["quiz_context"] = quiz_context
-        context = session["quiz_context"]
-
-    return jsonify({
+    payload = {
         "session_id": session_id,
         "filename": filename,
         "outline": outline,
-        "context": context,
         "current_page": current_page,
-    })
+        "prompt_versions": session["prompt_versions"],
+    }
 
+    # If quiz mode is active, replace context with quiz context
+    if session.get("quiz_active"):
+        if not _quiz_context_ready(session_id, session):
+            return _quiz_context_pending(payload)
+        context = session["quiz_context"]
+
+    return jsonify({**payload, "context": context, "context_status": "ready"})
 
-@app.route("/api/session/<session_id>/state", methods=["GET"])
+
+@routes.route("/api/session/<session_id>/state", methods=["GET"])
 def get_session_state(session_id):
     session = sessions.get(session_id)
     if not session:
@@ -358,7 +515,7 @@ def get_session_state(session_id):
     })
 
 
-@app.route("/api/session/<session_id>/state", methods=["POST"])
+@routes.route("/api/session/<session_id>/state", methods=["POST"])
 def update_session_state(session_id):
     session = sessions.get(session_id)
     if not session:
@@ -375,10 +532,16 @@ def update_session_state(session_id):
     if "concepts_discussed" in data:
         session["concepts_discussed"] = data["concepts_discussed"]
 
+    # Keep the session's other tabs and devices in sync, whichever worker they're on
+    socketio.emit("session_state", {
+        "session_id": session_id,
+        "current_page": session.get("current_page"),
+        "concepts_discussed": session.get("concepts_discussed", []),
+    }, to=session_id)
     return jsonify({"status": "ok"})
 
 
-@app.route("/api/tunnel-url", methods=["GET"])
+@routes.route("/api/tunnel-url", methods=["GET"])
 def tunnel_url():
     """Return the ngrok public URL if a tunnel is running."""
     import requests as _requests
@@ -394,7 +557,7 @@ def tunnel_url():
     return jsonify({"url": ""})
 
 
-@app.route("/api/search-text", methods=["POST"])
+@routes.route("/api/search-text", methods=["POST"])
 def search_text():
     data = request.get_json()
     if not data:
@@ -408,13 +571,13 @@ def search_text():
     if not session:
         return jsonify({"error": "Session not found"}), 404
 
-    result = pdf_processor.find_text_position(session["pdf_data"], text, page)
+    result = services.pdf_processor.find_text_position(session["pdf_data"], text, page)
     return jsonify(result)
 
 
-@app.route("/api/voice-token", methods=["GET", "POST"])
+@routes.route("/api/voice-token", methods=["GET", "POST"])
 def voice_token():
-    if not os.getenv("VOCAL_BRIDGE_API_KEY"):
+    if not services.config["VOCAL_BRIDGE_API_KEY"]:
         return jsonify({"error": "Voice agent not configured (no API key)"}), 503
 
     if request.method == "POST":
@@ -424,7 +587,7 @@ def voice_token():
         participant = request.args.get("participant", "student")
 
     try:
-        result = vocal_bridge.get_token(participant)
+        result, _ = services.token_pools["tutor"].acquire(participant)
     except Exception as e:
         return jsonify({"error": f"Vocal Bridge API error: {e}"}), 502
 
@@ -434,18 +597,23 @@ def voice_token():
     return jsonify(result)
 
 
-@app.route("/api/debate-tokens", methods=["POST"])
+@routes.route("/api/debate-tokens", methods=["POST"])
 def debate_tokens():
-    if not os.getenv("VOCAL_BRIDGE_AUTHOR_API_KEY"):
+    if not services.config["VOCAL_BRIDGE_AUTHOR_API_KEY"]:
         return jsonify({"error": "Author agent not configured (no API key)"}), 503
-    if not os.getenv("VOCAL_BRIDGE_REVIEWER_API_KEY"):
+    if not services.config["VOCAL_BRIDGE_REVIEWER_API_KEY"]:
         return jsonify({"error": "Reviewer agent not configured (no API key)"}), 503
 
     data = request.get_json() or {}
     participant = data.get("participant", "student")
 
+    # Mint both tokens concurrently; each is usually a pool hit anyway.
+    pool = services.token_executor
+    author_future = pool.submit(services.token_pools["author"].acquire, participant + "-author")
+    reviewer_future = pool.submit(services.token_pools["reviewer"].acquire, participant + "-reviewer")
+
     try:
-        author_result = vocal_bridge_author.get_token(participant + "-author")
+        author_result, _ = author_future.result()
     except Exception as e:
         return jsonify({"error": f"Author token error: {e}"}), 502
 
@@ -453,7 +621,7 @@ def debate_tokens():
         return jsonify({"error": f"Author token error: {author_result['error']}"}), 502
 
     try:
-        reviewer_result = vocal_bridge_reviewer.get_token(participant + "-reviewer")
+        reviewer_result, _ = reviewer_future.result()
     except Exception as e:
         return jsonify({"error": f"Reviewer token error: {e}"}), 502
 
@@ -466,7 +634,19 @@ def debate_tokens():
     })
 
 
-@app.route("/api/debate-context/<session_id>/<role>", methods=["GET"])
+@routes.route("/api/voice-token/stats", methods=["GET"])
+def voice_token_stats():
+    return jsonify({name: pool.stats() for name, pool in services.token_pools.items()})
+
+
+@routes.route("/api/upstreams", methods=["GET"])
+def upstream_status():
+    """Circuit breaker state, error rate and latency for each upstream."""
+    upstreams = services.librarian.upstream_status() + [services.vocal_bridge_upstream.status()]
+    return jsonify({"upstreams": upstreams})
+
+
+@routes.route("/api/debate-context/<session_id>/<role>", methods=["GET"])
 def debate_context(session_id, role):
     """Get debate-specific context for author or reviewer agent."""
     session = sessions.get(session_id)
@@ -476,73 +656,146 @@ def debate_context(session_id, role):
     if role not in ["author", "reviewer"]:
         return jsonify({"error": "Role must be 'author' or 'reviewer'"}), 400
 
-    pdf_data = session["pdf_data"]
     filename = session.get("filename", "")
-    outline = session.get("outline", {})
-
-    if role == "author":
-        context = _build_debate_author_context(pdf_data, filename, outline)
-    else:
-        context = _build_debate_reviewer_context(pdf_data, filename, outline)
+    builder = _build_debate_author_context if role == "author" else _build_debate_reviewer_context
+    context, version = _session_context(session_id, session, builder)
+    _record_prompt_version(session, f"debate_{role}_context", version)
 
     return jsonify({
         "session_id": session_id,
         "role": role,
         "filename": filename,
         "context": context,
+        "prompt_version": version,
     })
 
 
+@routes.route("/api/debate/<debate_id>", methods=["GET"])
+def debate_status(debate_id):
+    """Turn history and timestamps for a brokered debate."""
+    try:
+        return jsonify(services.debate_broker.get(debate_id))
+    except DebateError as e:
+        return jsonify({"error": str(e)}), 404
+
+
 # ---------------------------------------------------------------------------
 # Agent endpoints
 # ---------------------------------------------------------------------------
 
-@app.route("/api/agents/librarian/search", methods=["POST"])
+@routes.route("/api/agents/librarian/search", methods=["POST"])
 def librarian_search():
     data = request.get_json()
     if not data or not data.get("query"):
         return jsonify({"error": "query is required"}), 400
     try:
-        papers, mcp_info = librarian.search(data["query"], data.get("max_results", 5))
+        papers, mcp_info = services.librarian.search(data["query"], data.get("max_results", 5))
         return jsonify({"papers": papers, "query": data["query"], "mcp_info": mcp_info})
     except Exception as e:
         return jsonify({"error": f"ArXiv search failed: {e}"}), 502
 
 
-@app.route("/api/agents/mcp/tools", methods=["GET"])
+@routes.route("/api/agents/librarian/details", methods=["POST"])
+def librarian_details():
+    data = request.get_json()
+    ids = data.get("ids") if data else None
+    if not ids or not isinstance(ids, list):
+        return jsonify({"error": "ids must be a non-empty list"}), 400
+    if not all(isinstance(i, str) and i.strip() for i in ids):
+        return jsonify({"error": "ids must be non-empty strings"}), 400
+    try:
+        papers, api_info = services.librarian.get_papers_details(ids)
+        return jsonify({"papers": papers, "missing": api_info["missing"], "mcp_info": api_info})
+    except Exception as e:
+        return jsonify({"error": f"ArXiv lookup failed: {e}"}), 502
+
+
+@routes.route("/api/agents/mcp/tools", methods=["GET"])
 def mcp_tools():
     try:
-        tools = librarian.list_tools()
-        return jsonify({"tools": tools, "server": "arxiv-mcp", "status": "connected"})
+        tools = services.librarian.list_tools()
+        return jsonify({
+            "tools": tools,
+            "server": "arxiv-mcp",
+            "status": "connected",
+            "cache": services.librarian.cache_stats(),
+        })
     except Exception as e:
         return jsonify({"error": f"MCP server unavailable: {e}", "status": "disconnected"}), 502
 
 
-@app.route("/api/agents/librarian/download", methods=["POST"])
+@routes.route("/api/library/search", methods=["GET"])
+def library_search():
+    """Ranked passages from every ingested document matching ?q=."""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    start = time.perf_counter()
+    results = services.library_index.search(query, limit)
+    return jsonify({
+        "query": query,
+        "results": results,
+        "count": len(results),
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+    })
+
+
+@routes.route("/api/library/documents", methods=["GET"])
+def library_documents():
+    """Every document in the library index, deduplicated by content hash."""
+    return jsonify({"documents": services.library_index.documents()})
+
+
+@routes.route("/api/library/diff", methods=["GET"])
+def library_diff():
+    """Which pages changed between two ingested versions (?from=&to= document IDs)."""
+    from_id, to_id = request.args.get("from"), request.args.get("to")
+    if not from_id or not to_id:
+        return jsonify({"error": "from and to document IDs are required"}), 400
+    try:
+        return jsonify(services.library_index.diff(from_id, to_id))
+    except KeyError as e:
+        return jsonify({"error": f"Document {e.args[0]} not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@routes.route("/api/agents/librarian/download", methods=["POST"])
 def librarian_download():
     data = request.get_json()
     if not data or not data.get("arxiv_id"):
         return jsonify({"error": "arxiv_id is required"}), 400
     try:
-        result = librarian.download_paper(data["arxiv_id"])
+        result = services.librarian.download_paper(data["arxiv_id"])
+        services.navigator.citation_graph(result["pdf_data"])
         sessions[result["session_id"]] = {
             "filepath": result["filepath"],
             "pdf_data": result["pdf_data"],
+            "outline": result["outline"],
             "filename": result["filename"],
+            "arxiv_id": data["arxiv_id"],
             "current_page": 1,
             "transcript_summary": "",
             "concepts_discussed": [],
         }
+        _start_background_jobs(result["session_id"])
         return jsonify({
             "session_id": result["session_id"],
             "filename": result["filename"],
             "total_pages": result["total_pages"],
+            "cached": result["cached"],
         })
+    except PoolBusy as e:
+        return _pool_busy(e)
     except Exception as e:
         return jsonify({"error": f"Download failed: {e}"}), 502
 
 
-@app.route("/api/agents/navigator/find-citation", methods=["POST"])
+@routes.route("/api/agents/navigator/find-citation", methods=["POST"])
 def navigator_find_citation():
     data = request.get_json()
     if not data or not data.get("session_id") or not data.get("reference"):
@@ -552,11 +805,16 @@ def navigator_find_citation():
     if not session:
         return jsonify({"error": "Session not found"}), 404
 
-    result = navigator.find_citation(session["pdf_data"], data["reference"])
+    result = services.navigator.find_citation(session["pdf_data"], data["reference"], data.get("top_k", 3))
+    if result.get("found"):
+        paper = session.get("resolved_references", {}).get(result["number"])
+        if paper:
+            result["paper"] = paper
+    result["resolution_status"] = session.get("references_status", "pending")
     return jsonify(result)
 
 
-@app.route("/api/agents/navigator/references", methods=["GET"])
+@routes.route("/api/agents/navigator/references", methods=["GET"])
 def navigator_references():
     session_id = request.args.get("session_id")
     if not session_id:
@@ -566,11 +824,56 @@ def navigator_references():
     if not session:
         return jsonify({"error": "Session not found"}), 404
 
-    refs = navigator.list_references(session["pdf_data"])
-    return jsonify({"references": refs, "count": len(refs)})
+    refs = services.navigator.list_references(session["pdf_data"])
+    resolved = session.get("resolved_references", {})
+    refs = [{**ref, "paper": resolved[ref["number"]]} if ref["number"] in resolved else ref for ref in refs]
+    return jsonify({
+        "references": refs,
+        "count": len(refs),
+        "resolution_status": session.get("references_status", "pending"),
+    })
+
+
+@routes.route("/api/agents/navigator/citations", methods=["GET"])
+def navigator_citations():
+    """Where is a reference cited, or which reference does a marker cite."""
+    session_id = request.args.get("session_id")
+    if not session_id:
+        return jsonify({"error": "session_id is required"}), 400
+
+    session = sessions.get(session_id)
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+
+    pdf_data = session["pdf_data"]
+    graph = services.navigator.citation_graph(pdf_data)
+    index = services.navigator.reference_index(pdf_data)
 
+    reference = request.args.get("reference", type=int)
+    occurrence = request.args.get("occurrence", type=int)
+    if reference is not None:
+        occurrences = graph.occurrences_of(reference)
+        return jsonify({
+            "reference": index.get(reference),
+            "occurrences": occurrences,
+            "count": len(occurrences),
+        })
+    if occurrence is not None:
+        occ = graph.occurrence(occurrence)
+        if occ is None:
+            return jsonify({"error": "Occurrence not found"}), 404
+        return jsonify({
+            "occurrence": occ,
+            "references": [index.get(n) for n in occ["references"]],
+        })
 
-@app.route("/api/quiz/start", methods=["POST"])
+    return jsonify({
+        "citation_counts": {str(n): len(ids) for n, ids in graph.by_reference.items()},
+        "count": len(graph.occurrences),
+    })
+
+
+@routes.route("/api/quiz/start", methods=["POST"])
 def start_quiz():
     data = request.get_json()
     if not data or not data.get("session_id"):
@@ -581,23 +884,23 @@ def start_quiz():
     if not session:
         return jsonify({"error": "Session not found"}), 404
     
+    # Answer keys come from the quiz material, so starting must not build it
+    # inline either: queue missing material and let the client retry
+    if services.quiz_master.material_status(session["pdf_data"]) == "missing":
+        _start_background_task(_prepare_quiz_material, session_id)
+        return _quiz_context_pending({"session_id": session_id, "status": "quiz_pending"})
+
     try:
-        result = quiz_master.start_quiz(
+        result = services.quiz_master.start_quiz(
             session_id,
             session["pdf_data"],
             session.get("outline", {}),
             session.get("filename", "")
         )
         
-        # Generate quiz context for the voice agent
-        quiz_context = quiz_master.generate_quiz_context(
-            session["pdf_data"],
-            session.get("outline", {}),
-            session.get("filename", "")
-        )
-        
-        # Store quiz context in session for voice agent to access
-        session["quiz_context"] = quiz_context
+        # Generate quiz context for the voice agent and store it in the
+        # session for the voice agent to access
+        _store_quiz_context(session)
         session["quiz_active"] = True
         
         return jsonify(result)
@@ -605,7 +908,39 @@ def start_quiz():
         return jsonify({"error": f"Failed to start quiz: {e}"}), 500
 
 
-@app.route("/api/quiz/end", methods=["POST"])
+@routes.route("/api/quiz/score", methods=["POST"])
+def score_quiz_answer():
+    """Score a transcribed answer against the precomputed answer keys."""
+    data = request.get_json()
+    if not data or not data.get("session_id") or not data.get("answer"):
+        return jsonify({"error": "session_id and answer are required"}), 400
+
+    session = sessions.get(data["session_id"])
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+
+    try:
+        result = services.quiz_master.score_answer(
+            data["session_id"],
+            session["pdf_data"],
+            session.get("outline", {}),
+            data["answer"],
+            question_id=data.get("question_id"),
+            section=data.get("section"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Feed the outcome into the spaced-repetition schedule
+    if data.get("user_id"):
+        services.review_scheduler.record(
+            data["user_id"], result["section"], services.quiz_master.score_to_quality(result["score"])
+        )
+
+    return jsonify(result)
+
+
+@routes.route("/api/quiz/end", methods=["POST"])
 def end_quiz():
     data = request.get_json()
     if not data or not data.get("session_id"):
@@ -618,13 +953,13 @@ def end_quiz():
         session["quiz_context"] = None
     
     try:
-        result = quiz_master.end_quiz(session_id)
+        result = services.quiz_master.end_quiz(session_id)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": f"Failed to end quiz: {e}"}), 500
 
 
-@app.route("/api/quiz-context/<session_id>", methods=["GET"])
+@routes.route("/api/quiz-context/<session_id>", methods=["GET"])
 def quiz_context_endpoint(session_id):
     """Get quiz context for voice agent when in quiz mode."""
     session = sessions.get(session_id)
@@ -634,32 +969,105 @@ def quiz_context_endpoint(session_id):
     if not session.get("quiz_active"):
         return jsonify({"error": "Quiz not active"}), 400
     
-    # If quiz context doesn't exist yet, generate it
-    if not session.get("quiz_context"):
-        quiz_context = quiz_master.generate_quiz_context(
-            session["pdf_data"],
-            session.get("outline", {}),
-            session.get("filename", "")
-        )
-        session["quiz_context"] = quiz_context
-    
+    if not _quiz_context_ready(session_id, session):
+        return _quiz_context_pending({"session_id": session_id, "quiz_active": True})
+
     return jsonify({
         "session_id": session_id,
         "context": session["quiz_context"],
-        "quiz_active": True
+        "context_status": "ready",
+        "quiz_active": True,
+        "prompt_version": session["prompt_versions"].get("quiz_context"),
     })
 
 
+# ---------------------------------------------------------------------------
+# Spaced repetition
+# ---------------------------------------------------------------------------
+
+def _number_in(value, low, high):
+    """Return *value* as a float if it is a number from *low* to *high*, else None."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if low <= number <= high else None
+
+
+@routes.route("/api/review/record", methods=["POST"])
+def review_record():
+    """Record a recall outcome; accepts an SM-2 quality (0-5) or a mastery score (0-100)."""
+    data = request.get_json()
+    if not data or not data.get("user_id") or not data.get("concept"):
+        return jsonify({"error": "user_id and concept are required"}), 400
+
+    if "quality" in data:
+        quality = _number_in(data["quality"], 0, 5)
+        if quality is None:
+            return jsonify({"error": "quality must be a number from 0 to 5"}), 400
+    elif "mastery" in data:
+        mastery = _number_in(data["mastery"], 0, 100)
+        if mastery is None:
+            return jsonify({"error": "mastery must be a number from 0 to 100"}), 400
+        quality = mastery_to_quality(mastery)
+    else:
+        return jsonify({"error": "quality or mastery is required"}), 400
+
+    try:
+        entry = services.review_scheduler.record(data["user_id"], data["concept"], quality)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid review: {e}"}), 400
+    return jsonify(entry)
+
+
+@routes.route("/api/review/next", methods=["GET"])
+def review_next():
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+    limit = request.args.get("limit", 1, type=int)
+    due = services.review_scheduler.next_due(user_id, max(1, min(limit, 100)))
+    return jsonify({"user_id": user_id, "due": due, "count": len(due)})
+
+
+@routes.route("/api/review/import", methods=["POST"])
+def review_import():
+    """Bulk-import the frontend's localStorage concepts and spaced-repetition data."""
+    data = request.get_json()
+    if not data or not data.get("user_id"):
+        return jsonify({"error": "user_id is required"}), 400
+    if not isinstance(data.get("concepts", []), list) or not isinstance(data.get("sr_data", []), list):
+        return jsonify({"error": "concepts and sr_data must be lists"}), 400
+    imported = services.review_scheduler.import_local_storage(
+        data["user_id"], data.get("concepts", []), data.get("sr_data", [])
+    )
+    return jsonify({"status": "ok", "imported": imported})
+
+
 # ---------------------------------------------------------------------------
 # WebSocket events
 # ---------------------------------------------------------------------------
 
 @socketio.on("connect")
 def handle_connect():
+    metrics.SOCKETIO_CONNECTIONS.inc()
     print("[WS] Client connected")
     emit("connected", {"message": "Connected to LearnAloud server"})
 
 
+@socketio.on("join_session")
+def handle_join_session(data):
+    session_id = data.get("session_id") if data else None
+    # Behind a message queue the session may live in another worker's store
+    known = session_id in sessions or (session_id and services.config["SOCKETIO_MESSAGE_QUEUE"])
+    if not known:
+        emit("error", {"error": "Session not found"})
+        return
+    join_room(session_id)
+    print(f"[WS] Client joined session {session_id}")
+    emit("joined", {"session_id": session_id})
+
+
 @socketio.on("start_demo")
 def handle_start_demo(data):
     session_id = data.get("session_id") if data else None
@@ -691,8 +1099,105 @@ def handle_start_demo(data):
     thread.start()
 
 
+# ---------------------------------------------------------------------------
+# Debate broker
+# ---------------------------------------------------------------------------
+
+def _emit_relay(relay, debate_id):
+    """Send the next debate turn to the debate's room, or announce that it finished."""
+    if relay is None:
+        socketio.emit("debate_finished", services.debate_broker.get(debate_id), to=f"debate:{debate_id}")
+    else:
+        socketio.emit("debate_relay", relay, to=relay["room"])
+
+
+def _expire_debate_turn(debate_id, turn, seconds):
+    """Hand the floor over if a speaker is still going when the turn budget runs out."""
+    socketio.sleep(seconds)
+    relay = services.debate_broker.expire_turn(debate_id, turn)
+    if relay is not False:
+        print(f"[Debate] Turn {turn} of {debate_id} hit its time budget")
+        _emit_relay(relay, debate_id)
+
+
+@socketio.on("debate_start")
+def handle_debate_start(data):
+    data = data or {}
+    session_id = data.get("session_id")
+    if session_id not in sessions and not services.config["SOCKETIO_MESSAGE_QUEUE"]:
+        emit("debate_error", {"error": "Session not found"})
+        return
+    try:
+        debate, relay = services.debate_broker.start(session_id, data.get("max_turns"))
+    except (DebateError, TypeError, ValueError) as e:
+        emit("debate_error", {"error": str(e)})
+        return
+    join_room(debate.room)
+    print(f"[Debate] Started {debate.id} for session {session_id}")
+    emit("debate_started", debate.summary())
+    _emit_relay(relay, debate.id)
+
+
+@socketio.on("debate_turn_started")
+def handle_debate_turn_started(data):
+    data = data or {}
+    try:
+        if not services.debate_broker.turn_started(data.get("debate_id"), data.get("turn")):
+            return
+    except DebateError as e:
+        emit("debate_error", {"error": str(e)})
+        return
+    _start_background_task(
+        _expire_debate_turn, data["debate_id"], data.get("turn"), services.debate_broker.max_turn_seconds,
+    )
+
+
+@socketio.on("debate_turn_end")
+def handle_debate_turn_end(data):
+    data = data or {}
+    try:
+        relay = services.debate_broker.end_turn(
+            data.get("debate_id"), data.get("role"), data.get("text", ""), data.get("turn"),
+        )
+    except DebateError as e:
+        emit("debate_error", {"error": str(e)})
+        return
+    _emit_relay(relay, data["debate_id"])
+
+
+@socketio.on("debate_turn_text")
+def handle_debate_turn_text(data):
+    """Partial transcript of the running turn, kept if the turn runs out of time."""
+    data = data or {}
+    try:
+        services.debate_broker.report_text(data.get("debate_id"), data.get("turn"), data.get("text", ""))
+    except DebateError as e:
+        emit("debate_error", {"error": str(e)})
+
+
+@socketio.on("debate_request_turn")
+def handle_debate_request_turn(data):
+    data = data or {}
+    try:
+        services.debate_broker.request_turn(data.get("debate_id"), data.get("role"))
+    except DebateError as e:
+        emit("debate_error", {"error": str(e)})
+
+
+@socketio.on("debate_end")
+def handle_debate_end(data):
+    debate_id = (data or {}).get("debate_id")
+    try:
+        summary = services.debate_broker.end(debate_id)
+    except DebateError as e:
+        emit("debate_error", {"error": str(e)})
+        return
+    socketio.emit("debate_finished", summary, to=f"debate:{debate_id}")
+
+
 @socketio.on("disconnect")
 def handle_disconnect():
+    metrics.SOCKETIO_CONNECTIONS.dec()
     print("[WS] Client disconnected")
 
 
@@ -700,4 +1205,4 @@ def handle_disconnect():
 
 if __name__ == "__main__":
     print("LearnAloud backend running on http://localhost:8000")
-    socketio.run(app, host="0.0.0.0", port=8000, debug=True)
+    socketio.run(create_app(), host="0.0.0.0", port=8000, debug=True)
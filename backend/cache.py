@@ -0,0 +1,355 @@
+"""
+Response cache for upstream lookups (ArXiv search, paper metadata).
+
+Entries live in a bounded in-memory LRU with a per-entry TTL, and can
+optionally be mirrored to an on-disk tier so they survive restarts.
+The disk tier can be held to a byte budget, evicting least recently used
+files first.
+Concurrent lookups for the same key are coalesced: only the first caller
+hits the upstream, the others wait for its result.
+
+DocumentCache memoizes structures derived from an extracted document
+(reference indexes and the like) for as long as the document is in use.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from singleflight import SingleFlight
+
+_MISSING = object()
+
+
+def normalize_query(query):
+    """Normalize a free-text search query for use as a cache key."""
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+def normalize_arxiv_id(arxiv_id):
+    """Normalize an arXiv identifier (``arXiv:1706.03762v5`` -> ``1706.03762v5``)."""
+    clean = (arxiv_id or "").strip()
+    clean = re.sub(r"(?i)^(arxiv:|https?://arxiv\.org/(abs|pdf)/)", "", clean)
+    if clean.lower().endswith(".pdf"):
+        clean = clean[:-4]
+    return clean.lower()
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL, optional disk tier and
+    single-flight loading."""
+
+    def __init__(self, name, max_entries=256, ttl=3600, disk_dir=None, max_disk_bytes=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._flight = SingleFlight(name)
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # measured on the first write under a budget
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_hits = 0
+        self.disk_evictions = 0
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _get_memory(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_memory(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(f"{self.name}:{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{self.name}-{digest}.json")
+
+    def _get_disk(self, key):
+        if not self.disk_dir:
+            return _MISSING, None
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING, None
+        expires_at = record.get("expires_at")
+        if record.get("key") != key or (expires_at is not None and expires_at < time.time()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return _MISSING, None
+        if self.max_disk_bytes:
+            try:
+                os.utime(path)  # mtime is the recency the budget evicts by
+            except OSError:
+                pass
+        return record.get("value"), expires_at
+
+    def _set_disk(self, key, value, expires_at):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "expires_at": expires_at, "value": value}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            # The disk tier is best-effort; the memory tier still holds the value.
+            return
+        if self.max_disk_bytes:
+            self._charge_disk(size)
+
+    def _disk_files(self):
+        """Return ``(mtime, size, path)`` for each of this cache's disk files."""
+        files = []
+        prefix = f"{self.name}-"
+        try:
+            names = os.listdir(self.disk_dir)
+        except OSError:
+            return files
+        for name in names:
+            if not (name.startswith(prefix) and name.endswith(".json")):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _charge_disk(self, size):
+        """Account for a write of *size* bytes, evicting old files past the budget.
+
+        The running total is an estimate (overwrites are counted twice), so
+        it is re-measured from the directory whenever it crosses the budget.
+        """
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(f[1] for f in self._disk_files())
+            else:
+                self._disk_bytes += size
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            files = sorted(self._disk_files())
+            total = sum(f[1] for f in files)
+            # Evict down to 90% so a full cache doesn't rescan on every write
+            target = self.max_disk_bytes * 0.9
+            evicted = 0
+            for _, file_size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= file_size
+                evicted += 1
+            self._disk_bytes = total
+        if evicted:
+            with self._lock:
+                self.disk_evictions += evicted
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key, default=None, count=False):
+        """Return the cached value for *key*, or *default* if absent/expired.
+
+        Pass ``count=True`` to record the lookup in the hit/miss counters.
+        """
+        with self._lock:
+            value = self._get_memory(key)
+            if value is not _MISSING:
+                if count:
+                    self.hits += 1
+                return value
+        value, expires_at = self._get_disk(key)
+        with self._lock:
+            if value is _MISSING:
+                if count:
+                    self.misses += 1
+                return default
+            self._set_memory(key, value, expires_at)
+            if count:
+                self.hits += 1
+                self.disk_hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store *value* under *key* for *ttl* seconds (cache default if None)."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._set_memory(key, value, expires_at)
+        self._set_disk(key, value, expires_at)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return ``(value, status)`` for *key*, calling *loader* on a miss.
+
+        *status* is ``"hit"`` when served from cache, ``"miss"`` when this
+        caller ran the loader, and ``"coalesced"`` when it waited on another
+        caller's in-flight load for the same key.  Loader exceptions are
+        propagated to every waiter and nothing is cached.
+        """
+        with self._lock:
+            value = self._get_memory(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value, "hit"
+
+        (value, status), shared = self._flight.do_shared(key, self._load, key, loader, ttl)
+        if shared:
+            with self._lock:
+                self.coalesced += 1
+            return value, "coalesced"
+        return value, status
+
+    def _load(self, key, loader, ttl):
+        with self._lock:
+            # A flight that finished just before this one started has filled memory
+            value = self._get_memory(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value, "hit"
+        value, expires_at = self._get_disk(key)
+        if value is not _MISSING:
+            with self._lock:
+                self._set_memory(key, value, expires_at)
+                self.hits += 1
+                self.disk_hits += 1
+            return value, "hit"
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        self.set(key, value, ttl)
+        return value, "miss"
+
+    def invalidate(self, key):
+        """Drop *key* from both tiers."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Drop all in-memory entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = self.disk_hits = self.disk_evictions = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current hit rate."""
+        with self._lock:
+            served = self.hits + self.coalesced
+            total = served + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "disk_evictions": self.disk_evictions,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_rate": round(served / total, 3) if total else 0.0,
+            }
+
+
+class DocumentCache:
+    """Per-document memo for structures derived from a document's ``pdf_data``.
+
+    Entries are keyed by the identity of the ``pdf_data`` dict, so they are
+    rebuilt only when a session's document is replaced.  A strong reference
+    to each document is kept alongside its entry so identities can't be
+    recycled while cached; the number of documents is LRU-bounded.
+    Concurrent misses for one document share a single build.
+    """
+
+    def __init__(self, max_documents=64, name="document"):
+        self.max_documents = max_documents
+        self._entries = OrderedDict()  # id(pdf_data) -> (pdf_data, value)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight(name)
+
+    def get(self, pdf_data, default=None):
+        """Return the cached value for *pdf_data*, or *default*."""
+        with self._lock:
+            entry = self._entries.get(id(pdf_data))
+            if entry is None or entry[0] is not pdf_data:
+                return default
+            self._entries.move_to_end(id(pdf_data))
+            return entry[1]
+
+    def set(self, pdf_data, value):
+        with self._lock:
+            self._entries[id(pdf_data)] = (pdf_data, value)
+            self._entries.move_to_end(id(pdf_data))
+            while len(self._entries) > self.max_documents:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, pdf_data, build):
+        """Return the cached value for *pdf_data*, calling ``build(pdf_data)`` once."""
+        value = self.get(pdf_data, _MISSING)
+        if value is _MISSING:
+            # The waiters hold pdf_data too, so its id is stable for the flight
+            value = self._flight.do(id(pdf_data), self._build, pdf_data, build)
+        return value
+
+    def building(self, pdf_data):
+        """Return True if a build for *pdf_data* is currently running."""
+        return self._flight.in_flight(id(pdf_data))
+
+    def _build(self, pdf_data, build):
+        value = self.get(pdf_data, _MISSING)
+        if value is _MISSING:
+            value = build(pdf_data)
+            self.set(pdf_data, value)
+        return value
+
+    def invalidate(self, pdf_data):
+        with self._lock:
+            entry = self._entries.get(id(pdf_data))
+            if entry is not None and entry[0] is pdf_data:
+                del self._entries[id(pdf_data)]
+
+    def __len__(self):
+        return len(self._entries)
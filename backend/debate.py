@@ -0,0 +1,226 @@
+"""
+Server-side turn broker for debate mode.
+
+The author and reviewer voice agents each sit in their own Vocal Bridge
+room that only the student's browser has joined, so the final hop to an
+agent still goes through that connection.  Everything else lives here:
+whose turn it is, the queue of turns with their timestamps, the
+``[AUTHOR'S CLAIMS]`` / ``[REVIEWER CRITIQUE]`` relay messages built from
+the other side's history, and the turn budget.  When a speaker finishes,
+the next relay is composed and emitted to the debate's Socket.IO room
+straight away, so the handoff no longer waits on client-side timers.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from metrics import DEBATE_HANDOFF
+
+AUTHOR = "author"
+REVIEWER = "reviewer"
+ROLES = (AUTHOR, REVIEWER)
+
+OPENING_MESSAGE = (
+    "You are the author of this paper. Present your key findings and arguments in support of the paper. "
+    "Keep your response under 40 seconds. Be strong and confident in defending your work."
+)
+AUTHOR_MESSAGE = (
+    "[REVIEWER CRITIQUE] {history}\n\n"
+    "Answer the reviewer's questions and respond to their critique. Address their concerns directly "
+    "with evidence from your paper. Keep your response under 40 seconds."
+)
+REVIEWER_MESSAGE = (
+    "[AUTHOR'S CLAIMS] {history}\n\n"
+    "Now ask critical questions about the paper and the author's arguments. Point out weaknesses, "
+    "questionable claims, and areas that need improvement by framing them as questions. Keep your "
+    "response under 40 seconds. If you need a moment to think, say \"Let me analyze this\" or "
+    "\"Interesting, let me think\" so the listener knows you're preparing."
+)
+
+
+class DebateError(ValueError):
+    """Unknown debate, finished debate, or a turn event that doesn't match the current turn."""
+
+
+def _other(role):
+    return REVIEWER if role == AUTHOR else AUTHOR
+
+
+class Debate:
+    """One debate: its turns so far and the roles queued to speak next."""
+
+    def __init__(self, session_id, max_turns, max_turn_seconds):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.max_turn_seconds = max_turn_seconds
+        self.turns = []  # {turn, role, message, relayed_at, started_at, ended_at, text, expired}
+        self.queue = deque()  # roles requested ahead of the normal alternation
+        self.created_at = time.time()
+        self.finished = False
+
+    @property
+    def room(self):
+        return f"debate:{self.id}"
+
+    @property
+    def current(self):
+        return self.turns[-1] if self.turns else None
+
+    def history(self, role, limit):
+        """The last *limit* things *role* said, formatted like the client used to."""
+        said = [t for t in self.turns if t["role"] == role and t["text"]]
+        return "\n".join(f"[{role.upper()}] {t['text']}" for t in said[-limit:])
+
+    def summary(self):
+        return {
+            "debate_id": self.id,
+            "session_id": self.session_id,
+            "max_turns": self.max_turns,
+            "finished": self.finished,
+            "turns": [dict(t) for t in self.turns],
+        }
+
+
+class DebateBroker:
+    """Turn queue, relay composition and turn budgets for every live debate."""
+
+    def __init__(self, max_turns=8, max_turn_seconds=45.0, history_size=10, max_debates=256):
+        self.max_turns = max_turns
+        self.max_turn_seconds = max_turn_seconds
+        self.history_size = history_size
+        self.max_debates = max_debates
+        self._debates = OrderedDict()  # debate id -> Debate
+        self._lock = threading.Lock()
+
+    def _get(self, debate_id):
+        debate = self._debates.get(debate_id)
+        if debate is None:
+            raise DebateError("Debate not found")
+        return debate
+
+    def get(self, debate_id):
+        with self._lock:
+            return self._get(debate_id).summary()
+
+    def start(self, session_id, max_turns=None):
+        """Open a debate and return ``(debate, relay)`` for the author's opening turn."""
+        max_turns = self.max_turns if max_turns is None else int(max_turns)
+        if not 1 <= max_turns <= 50:
+            raise DebateError("max_turns must be between 1 and 50")
+        debate = Debate(session_id, max_turns, self.max_turn_seconds)
+        with self._lock:
+            self._debates[debate.id] = debate
+            while len(self._debates) > self.max_debates:
+                self._debates.popitem(last=False)
+            return debate, self._relay(debate, AUTHOR, time.time())
+
+    def _relay(self, debate, role, now):
+        if not debate.turns:
+            message = OPENING_MESSAGE
+        elif role == AUTHOR:
+            message = AUTHOR_MESSAGE.format(history=debate.history(REVIEWER, self.history_size))
+        else:
+            message = REVIEWER_MESSAGE.format(history=debate.history(AUTHOR, self.history_size))
+        turn = {
+            "turn": len(debate.turns) + 1,
+            "role": role,
+            "message": message,
+            "relayed_at": now,
+            "started_at": None,
+            "ended_at": None,
+            "text": "",
+            "expired": False,
+        }
+        debate.turns.append(turn)
+        return {"debate_id": debate.id, "room": debate.room, **turn}
+
+    def turn_started(self, debate_id, turn):
+        """Record that the client has handed turn *turn* to its agent.
+
+        Returns False for a stale or repeated acknowledgement.
+        """
+        now = time.time()
+        with self._lock:
+            debate = self._get(debate_id)
+            current = debate.current
+            if current is None or current["turn"] != turn or current["started_at"] is not None:
+                return False
+            current["started_at"] = now
+            previous = debate.turns[-2]["ended_at"] if turn > 1 else None
+        DEBATE_HANDOFF.observe(now - current["relayed_at"], stage="delivery")
+        if previous is not None:
+            DEBATE_HANDOFF.observe(now - previous, stage="handoff")
+        return True
+
+    def request_turn(self, debate_id, role):
+        """Let *role* speak next, ahead of the normal alternation (the student asked for it)."""
+        if role not in ROLES:
+            raise DebateError("role must be 'author' or 'reviewer'")
+        with self._lock:
+            debate = self._get(debate_id)
+            if role not in debate.queue:
+                debate.queue.append(role)
+
+    def report_text(self, debate_id, turn, text):
+        """Keep what the speaker of the running turn *turn* has said so far.
+
+        Returns False when *turn* is not the running turn.
+        """
+        with self._lock:
+            debate = self._get(debate_id)
+            current = debate.current
+            if debate.finished or current["turn"] != turn or current["ended_at"] is not None:
+                return False
+            current["text"] = (text or "").strip()
+            return True
+
+    def end_turn(self, debate_id, role, text, turn=None):
+        """Close the current turn and return the next relay, or None once the budget is spent."""
+        now = time.time()
+        with self._lock:
+            debate = self._get(debate_id)
+            current = debate.current
+            if debate.finished:
+                raise DebateError("Debate has finished")
+            if current["role"] != role or (turn is not None and current["turn"] != turn):
+                raise DebateError(f"It is turn {current['turn']} ({current['role']}), not {role}")
+            return self._advance(debate, text, now)
+
+    def expire_turn(self, debate_id, turn):
+        """Force a handoff if turn *turn* is still running after its time budget.
+
+        The turn keeps whatever text was reported for it so far and is marked
+        ``expired``.  Returns the next relay, None if the debate finished, or
+        False when the turn had already ended.
+        """
+        now = time.time()
+        with self._lock:
+            debate = self._debates.get(debate_id)
+            if debate is None or debate.finished or debate.current["turn"] != turn:
+                return False
+            debate.current["expired"] = True
+            return self._advance(debate, None, now)
+
+    def _advance(self, debate, text, now):
+        """End the current turn (*text* None keeps the reported text) and relay the next one."""
+        current = debate.current
+        current["ended_at"] = now
+        if text is not None:
+            current["text"] = text.strip()
+        if len(debate.turns) >= debate.max_turns:
+            debate.finished = True
+            return None
+        role = debate.queue.popleft() if debate.queue else _other(current["role"])
+        relay = self._relay(debate, role, now)
+        DEBATE_HANDOFF.observe(time.time() - now, stage="broker")
+        return relay
+
+    def end(self, debate_id):
+        """Finish a debate early and return its summary."""
+        with self._lock:
+            debate = self._get(debate_id)
+            debate.finished = True
+            return debate.summary()
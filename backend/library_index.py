@@ -0,0 +1,250 @@
+"""
+Full-text index over every document ingested by any session.
+
+Uploads and ArXiv downloads are extracted once per session, but their
+text is otherwise only reachable inside that session.  LibraryIndex keeps
+a persistent SQLite index of passages (runs of text blocks on one page,
+with their combined bbox) so "which of my papers discusses X" is a single
+query.  Documents are keyed by the SHA-256 of the PDF bytes: ingesting a
+paper that is already indexed only links the new session to it.  Each
+page's content hash is kept as well, so two versions of a paper can be
+compared page by page.
+
+SQLite's FTS5 extension gives BM25-ranked search with snippets; builds of
+SQLite without it fall back to a plain table matched with LIKE.
+"""
+
+import difflib
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_available():
+    """Return True if this SQLite build has the FTS5 extension."""
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def content_hash(filepath):
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def passages(pdf_data, max_chars=400):
+    """Group each page's text blocks into passages of up to *max_chars*.
+
+    Yields ``(page_num, text, bbox)`` with the bbox covering every block
+    in the passage.
+    """
+    for page in pdf_data.get("pages", []):
+        parts, bbox = [], None
+        for block in page["blocks"]:
+            x0, y0, x1, y1 = block["bbox"]
+            bbox = [x0, y0, x1, y1] if bbox is None else [
+                min(bbox[0], x0), min(bbox[1], y0), max(bbox[2], x1), max(bbox[3], y1),
+            ]
+            parts.append(block["text"])
+            if sum(len(p) + 1 for p in parts) >= max_chars:
+                yield page["page_num"], " ".join(parts), bbox
+                parts, bbox = [], None
+        if parts:
+            yield page["page_num"], " ".join(parts), bbox
+
+
+def page_diff(old_hashes, new_hashes):
+    """Match the pages of two versions of a document by content hash.
+
+    Inserted or deleted pages shift the numbering, so pages are aligned
+    rather than compared by position.  Returns ``unchanged`` and
+    ``changed`` as ``{"from", "to"}`` page pairs, ``added`` pages of the
+    new version and ``removed`` pages of the old one (all 1-based).
+    """
+    result = {"unchanged": [], "changed": [], "added": [], "removed": []}
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        paired = min(i2 - i1, j2 - j1) if op in ("equal", "replace") else 0
+        key = "unchanged" if op == "equal" else "changed"
+        result[key].extend({"from": i1 + k + 1, "to": j1 + k + 1} for k in range(paired))
+        result["removed"].extend(range(i1 + paired + 1, i2 + 1))
+        result["added"].extend(range(j1 + paired + 1, j2 + 1))
+    return result
+
+
+class LibraryIndex:
+    """Persistent, deduplicated passage index with ranked search."""
+
+    def __init__(self, db_path, use_fts=None):
+        self.db_path = db_path
+        self.use_fts = fts5_available() if use_fts is None else use_fts
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (doc_id TEXT PRIMARY KEY, filename TEXT, "
+                "source TEXT, arxiv_id TEXT, total_pages INTEGER, added_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS document_sessions (doc_id TEXT, session_id TEXT, "
+                "added_at REAL, PRIMARY KEY (doc_id, session_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS document_pages (doc_id TEXT, page INTEGER, content_hash TEXT, "
+                "PRIMARY KEY (doc_id, page))"
+            )
+            if self.use_fts:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5("
+                    "text, doc_id UNINDEXED, page UNINDEXED, bbox UNINDEXED, tokenize='porter unicode61')"
+                )
+            else:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS passages (text TEXT, doc_id TEXT, page INTEGER, bbox TEXT)"
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add_document(self, filepath, pdf_data, filename, session_id=None, source="upload", arxiv_id=None):
+        """Index a document unless its content is already indexed.
+
+        Returns ``(doc_id, added)``; *added* is False when the content hash
+        was already present, in which case only the session link is stored.
+        """
+        doc_id = content_hash(filepath)
+        now = time.time()
+        with self._lock, self._conn:
+            exists = self._conn.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if not exists:
+                self._conn.execute(
+                    "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                    (doc_id, filename, source, arxiv_id, pdf_data.get("total_pages", 0), now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO passages (text, doc_id, page, bbox) VALUES (?, ?, ?, ?)",
+                    ((text, doc_id, page, ",".join(f"{v:.1f}" for v in bbox))
+                     for page, text, bbox in passages(pdf_data)),
+                )
+            # Also fills in page hashes for documents indexed before they were kept
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO document_pages VALUES (?, ?, ?)",
+                ((doc_id, page["page_num"], page["content_hash"])
+                 for page in pdf_data.get("pages", []) if page.get("content_hash")),
+            )
+            if session_id:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO document_sessions VALUES (?, ?, ?)", (doc_id, session_id, now),
+                )
+        return doc_id, not exists
+
+    def page_hashes(self, doc_id):
+        """Return *doc_id*'s page hashes in page order, or None if it is not indexed."""
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if not exists:
+                return None
+            rows = self._conn.execute(
+                "SELECT content_hash FROM document_pages WHERE doc_id = ? ORDER BY page", (doc_id,),
+            ).fetchall()
+        return [row["content_hash"] for row in rows]
+
+    def diff(self, from_id, to_id):
+        """Report which pages changed between two indexed versions of a paper.
+
+        Raises KeyError for an unknown document and ValueError when one has
+        no page hashes stored.
+        """
+        versions = {}
+        for doc_id in (from_id, to_id):
+            hashes = self.page_hashes(doc_id)
+            if hashes is None:
+                raise KeyError(doc_id)
+            if not hashes:
+                raise ValueError(f"Document {doc_id} has no page hashes; ingest it again")
+            versions[doc_id] = hashes
+        return {
+            "from": from_id,
+            "to": to_id,
+            "from_pages": len(versions[from_id]),
+            "to_pages": len(versions[to_id]),
+            **page_diff(versions[from_id], versions[to_id]),
+        }
+
+    def search(self, query, limit=10):
+        """Return up to *limit* passages matching *query*, best first.
+
+        Every word must appear in a passage; if none has them all, passages
+        with any of the words are returned instead.
+        """
+        words = _WORD.findall(query.lower())
+        if not words:
+            return []
+        with self._lock:
+            rows = self._match(words, limit, all_words=True) or self._match(words, limit, all_words=False)
+            sessions = self._sessions({row["doc_id"] for row in rows})
+        return [{
+            "doc_id": row["doc_id"],
+            "filename": row["filename"],
+            "arxiv_id": row["arxiv_id"],
+            "page": row["page"],
+            "bbox": [float(v) for v in row["bbox"].split(",")],
+            "snippet": row["snippet"],
+            "score": round(row["score"], 4),
+            "session_ids": sessions.get(row["doc_id"], []),
+        } for row in rows]
+
+    def _match(self, words, limit, all_words):
+        if self.use_fts:
+            terms = (" AND " if all_words else " OR ").join(f'"{w}"' for w in words)
+            # bm25() is lower-is-better; negate it so higher scores rank first
+            return self._conn.execute(
+                "SELECT p.doc_id, p.page, p.bbox, snippet(passages, 0, '[', ']', '...', 16) AS snippet, "
+                "-bm25(passages) AS score, d.filename, d.arxiv_id "
+                "FROM passages p JOIN documents d ON d.doc_id = p.doc_id "
+                "WHERE passages MATCH ? ORDER BY bm25(passages) LIMIT ?",
+                (terms, limit),
+            ).fetchall()
+
+        hits = " + ".join("(instr(lower(p.text), ?) > 0)" for _ in words)
+        where = (" AND " if all_words else " OR ").join("instr(lower(p.text), ?) > 0" for _ in words)
+        return self._conn.execute(
+            f"SELECT p.doc_id, p.page, p.bbox, substr(p.text, 1, 200) AS snippet, ({hits}) * 1.0 AS score, "
+            f"d.filename, d.arxiv_id FROM passages p JOIN documents d ON d.doc_id = p.doc_id "
+            f"WHERE {where} ORDER BY score DESC, d.added_at DESC LIMIT ?",
+            (*words, *words, limit),
+        ).fetchall()
+
+    def _sessions(self, doc_ids):
+        if not doc_ids:
+            return {}
+        marks = ", ".join("?" for _ in doc_ids)
+        found = {}
+        for row in self._conn.execute(
+            f"SELECT doc_id, session_id FROM document_sessions WHERE doc_id IN ({marks}) ORDER BY added_at",
+            tuple(doc_ids),
+        ):
+            found.setdefault(row["doc_id"], []).append(row["session_id"])
+        return found
+
+    def documents(self):
+        """Return every indexed document with its linked session IDs."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents ORDER BY added_at").fetchall()
+            sessions = self._sessions({row["doc_id"] for row in rows})
+        return [{**dict(row), "session_ids": sessions.get(row["doc_id"], [])} for row in rows]
@@ -0,0 +1 @@
+"""Load-test harness (local upstream stubs, virtual-user driver) and startup benchmark."""
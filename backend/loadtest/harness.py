@@ -0,0 +1,303 @@
+"""
+End-to-end load test for the LearnAloud backend.
+
+Each virtual user runs the real session lifecycle against the server:
+voice token, upload, paper context, a burst of text searches, state
+updates, quiz start/end, citation lookups and a Socket.IO join.  Per-step
+latencies are collected and reported as throughput and p50/p95/p99.
+
+By default the harness starts local stubs for ArXiv, MCP and Vocal Bridge
+and spawns the eventlet server pointed at them:
+
+    cd backend && python -m loadtest.harness --users 20 --iterations 3
+
+To compare worker configurations, start the server yourself (with the
+stub URLs from ``--stubs-only``) and pass ``--target http://host:port``.
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import socketio
+
+from .stubs import ArxivStub, MCPStub, VocalBridgeStub, sample_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEARCH_PHRASES = [
+    "neural network", "self-attention", "positional encodings", "residual connections",
+    "label smoothing", "warmup learning rate", "multi-head attention", "layer normalization",
+]
+CITATION_QUERIES = ["reference one", "Vaswani et al twenty seventeen", "He et al 2016", "layer normalization"]
+
+try:
+    import websocket  # noqa: F401 -- websocket-client enables the websocket transport
+    SOCKETIO_TRANSPORTS = ["websocket"]
+except ImportError:
+    SOCKETIO_TRANSPORTS = ["polling"]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+class Recorder:
+    """Thread-safe per-step latency and error collection."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def timed(self, step, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, requests.Response) and result.status_code >= 400:
+                raise RuntimeError(f"{step}: HTTP {result.status_code}")
+            return result
+        except Exception:
+            with self._lock:
+                self.errors[step] += 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies[step].append(time.perf_counter() - start)
+
+    def report(self, elapsed):
+        rows = []
+        total = 0
+        for step, values in self.latencies.items():
+            values = sorted(values)
+            total += len(values)
+            rows.append({
+                "step": step,
+                "count": len(values),
+                "errors": self.errors.get(step, 0),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+            })
+        return {"elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 1), "steps": rows}
+
+
+class VirtualUser:
+    """One simulated student working through a paper."""
+
+    def __init__(self, target, pdf_pages, recorder, searches=10, voice=True):
+        self.target = target.rstrip("/")
+        self.pdf_pages = pdf_pages
+        self.recorder = recorder
+        self.searches = searches
+        self.voice = voice
+        self.http = requests.Session()
+
+    def _post(self, step, path, **kwargs):
+        return self.recorder.timed(step, self.http.post, f"{self.target}{path}", timeout=60, **kwargs)
+
+    def _get(self, step, path, **kwargs):
+        return self.recorder.timed(step, self.http.get, f"{self.target}{path}", timeout=60, **kwargs)
+
+    def run_session(self, n):
+        if self.voice:
+            self._post("voice_token", "/api/voice-token", json={"participant": "student"})
+
+        # A distinct paper per session, so uploads exercise extraction rather
+        # than only the page cache
+        pdf_bytes = sample_pdf(self.pdf_pages, variant=n)
+        resp = self._post("upload", "/api/upload-pdf",
+                          files={"file": (f"loadtest-{n}.pdf", pdf_bytes, "application/pdf")})
+        session_id = resp.json()["session_id"]
+
+        self._get("paper_context", f"/api/paper-context/{session_id}")
+
+        for i in range(self.searches):
+            self._post("search_text", "/api/search-text", json={
+                "session_id": session_id, "text": SEARCH_PHRASES[i % len(SEARCH_PHRASES)], "page": 1 + i % 2,
+            })
+
+        for page in (1, 2, 3):
+            self._post("state", f"/api/session/{session_id}/state", json={
+                "current_page": page,
+                "transcript_summary": f"Discussed page {page}",
+                "concepts_discussed": SEARCH_PHRASES[:page],
+            })
+
+        self._post("quiz_start", "/api/quiz/start", json={"session_id": session_id})
+        self._post("quiz_end", "/api/quiz/end", json={"session_id": session_id})
+
+        for query in CITATION_QUERIES:
+            self._post("find_citation", "/api/agents/navigator/find-citation",
+                       json={"session_id": session_id, "reference": query})
+
+        self.recorder.timed("socketio_join", self._join, session_id)
+
+    def _join(self, session_id):
+        client = socketio.Client(reconnection=False)
+        joined = threading.Event()
+        client.on("joined", lambda data: joined.set())
+        try:
+            client.connect(self.target, transports=SOCKETIO_TRANSPORTS, wait_timeout=30)
+            client.emit("join_session", {"session_id": session_id})
+            if not joined.wait(30):
+                raise TimeoutError("no joined event")
+        finally:
+            client.disconnect()
+
+
+def start_stubs(latency=0.0):
+    return {
+        "arxiv": ArxivStub(latency=latency).start(),
+        "mcp": MCPStub(latency=latency).start(),
+        "vocal_bridge": VocalBridgeStub(latency=latency).start(),
+    }
+
+
+def stub_env(stubs):
+    """Environment variables pointing the backend at the stubs."""
+    return {
+        "ARXIV_API_URL": stubs["arxiv"].api_url,
+        "ARXIV_PDF_URL": stubs["arxiv"].pdf_url,
+        "ARXIV_MCP_URL": stubs["mcp"].sse_url,
+        "VOCAL_BRIDGE_URL": stubs["vocal_bridge"].api_url,
+        "VOCAL_BRIDGE_API_KEY": "loadtest",
+        "VOCAL_BRIDGE_AUTHOR_API_KEY": "loadtest",
+        "VOCAL_BRIDGE_REVIEWER_API_KEY": "loadtest",
+    }
+
+
+def spawn_server(env, port, workdir):
+    """Start the eventlet server in a subprocess and wait until it answers."""
+    os.makedirs(workdir, exist_ok=True)
+    env = {
+        **os.environ,
+        **env,
+        "LEARNALOUD_CACHE_DIR": os.path.join(workdir, "cache"),
+        "LEARNALOUD_DATA_DIR": os.path.join(workdir, "data"),
+    }
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-c",
+         f"from app import app, socketio; socketio.run(app, host='127.0.0.1', port={port}, log_output=False)"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    target = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}; see {log.name}")
+        try:
+            requests.get(f"{target}/metrics", timeout=1)
+            return proc, target
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start within 60s")
+
+
+def run_load(target, users, iterations, searches=10, voice=True, pdf_pages=6):
+    recorder = Recorder()
+    failures = []
+
+    def user_loop(u):
+        vu = VirtualUser(target, pdf_pages, recorder, searches=searches, voice=voice)
+        for i in range(iterations):
+            try:
+                vu.run_session(u * iterations + i)
+            except Exception as e:
+                failures.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user_loop, range(users)))
+    report = recorder.report(time.perf_counter() - start)
+    report["users"] = users
+    report["sessions"] = users * iterations
+    report["failed_sessions"] = len(failures)
+    report["first_failures"] = failures[:5]
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{report['users']} users, {report['sessions']} sessions "
+        f"({report['failed_sessions']} failed) in {report['elapsed_s']}s; "
+        f"{report['requests']} requests, {report['rps']} req/s",
+        "",
+        f"{'step':<16}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}",
+    ]
+    for row in report["steps"]:
+        lines.append(f"{row['step']:<16}{row['count']:>8}{row['errors']:>8}{row['rps']:>9}"
+                     f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    if report.get("upstream_requests"):
+        upstream = ", ".join(f"{name}={n}" for name, n in report["upstream_requests"].items())
+        lines.append(f"\nupstream requests: {upstream}")
+    for failure in report["first_failures"]:
+        lines.append(f"  failure: {failure}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=2, help="sessions per user")
+    parser.add_argument("--searches", type=int, default=10, help="search-text calls per session")
+    parser.add_argument("--pages", type=int, default=6, help="approximate pages in the uploaded PDF")
+    parser.add_argument("--target", help="URL of an already running server (skips spawning one)")
+    parser.add_argument("--port", type=int, default=8765, help="port for the spawned server")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="seconds added to every stub response")
+    parser.add_argument("--no-voice", action="store_true", help="skip the voice-token step")
+    parser.add_argument("--stubs-only", action="store_true", help="start the stubs, print their env and wait")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    stubs = start_stubs(args.upstream_latency)
+    proc = None
+    try:
+        if args.stubs_only:
+            for key, value in stub_env(stubs).items():
+                print(f"export {key}={value}")
+            threading.Event().wait()
+
+        target = args.target
+        workdir = tempfile.mkdtemp(prefix="learnaloud-load-")
+        if not target:
+            proc, target = spawn_server(stub_env(stubs), args.port, workdir)
+            print(f"[Load] Server running at {target} (log: {workdir}/server.log)")
+
+        report = run_load(target, args.users, args.iterations, searches=args.searches,
+                          voice=not args.no_voice, pdf_pages=args.pages)
+        # Background jobs (reference resolution) may still be talking to the stubs
+        time.sleep(1)
+        report["upstream_requests"] = {name: stub.requests for name, stub in stubs.items()}
+        print(format_report(report))
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(10)
+        for stub in stubs.values():
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
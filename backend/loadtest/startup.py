@@ -0,0 +1,88 @@
+"""
+Cold-start benchmark.
+
+Imports the app and creates it in fresh interpreters, then serves one
+request, and reports median timings plus which heavy modules ended up
+loaded.  Pass ``--compare PATH`` (another checkout's backend directory)
+to benchmark an older revision side by side:
+
+    cd backend
+    git worktree add /tmp/learnaloud-old HEAD~1
+    python -m loadtest.startup --compare /tmp/learnaloud-old/backend
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("fitz", "pymupdf", "mcp", "agents")
+
+_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+flask_app = module.create_app() if "create_app" in vars(module) else module.app
+created = time.perf_counter()
+flask_app.test_client().get("/api/session/startup-probe/state")
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "total_ms": (served - start) * 1000,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def measure(backend_dir, runs):
+    """Run the probe *runs* times in fresh interpreters; returns the samples."""
+    workdir = tempfile.mkdtemp(prefix="learnaloud-startup-")
+    env = {
+        **os.environ,
+        "LEARNALOUD_CACHE_DIR": os.path.join(workdir, "cache"),
+        "LEARNALOUD_DATA_DIR": os.path.join(workdir, "data"),
+        "PYTHONWARNINGS": "ignore",
+    }
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD % (HEAVY_MODULES,)],
+            cwd=backend_dir, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return samples
+
+
+def summarize(samples):
+    summary = {key: round(statistics.median(s[key] for s in samples), 1)
+               for key in ("import_ms", "create_ms", "first_request_ms", "total_ms")}
+    summary["loaded"] = samples[-1]["loaded"]
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the backend.")
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters per measurement")
+    parser.add_argument("--compare", help="backend directory of another revision to measure too")
+    args = parser.parse_args(argv)
+
+    targets = [("current", BACKEND_DIR)]
+    if args.compare:
+        targets.insert(0, ("compare", os.path.abspath(args.compare)))
+
+    print(f"{'':<9}{'import ms':>11}{'create ms':>11}{'1st req ms':>12}{'total ms':>10}  loaded")
+    for label, backend_dir in targets:
+        s = summarize(measure(backend_dir, args.runs))
+        print(f"{label:<9}{s['import_ms']:>11}{s['create_ms']:>11}{s['first_request_ms']:>12}"
+              f"{s['total_ms']:>10}  {', '.join(s['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
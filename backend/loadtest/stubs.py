@@ -0,0 +1,331 @@
+"""
+Local stand-ins for the upstream services, for load tests.
+
+- ArxivStub serves the Atom query API (search and id_list) and PDFs.
+- MCPStub speaks the MCP SSE transport (JSON-RPC over an event stream)
+  with a few ArXiv tools.
+- VocalBridgeStub mints fake LiveKit tokens.
+
+Each stub runs a ThreadingHTTPServer on a free local port, with an
+optional fixed latency so slow upstreams can be simulated.
+"""
+
+import base64
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+import fitz  # PyMuPDF
+
+SECTIONS = [
+    ("Introduction", "Deep neural network models have changed how we approach sequence transduction. "
+                     "Recurrent models process tokens one at a time, which limits parallelism [1]."),
+    ("Related Work", "Convolutional approaches reduce sequential computation [2]. Residual learning "
+                     "made very deep networks trainable (He et al., 2016) and attention mechanisms [3] "
+                     "let models relate distant positions."),
+    ("Method", "Our model stacks self-attention and feed-forward layers. Each layer uses multi-head "
+               "attention with scaled dot products, layer normalization and residual connections. "
+               "Positional encodings inject order information into the embeddings."),
+    ("Training Setup", "We train with the Adam optimizer, a warmup learning rate schedule, dropout and "
+                       "label smoothing on eight GPUs for three days over the WMT benchmark."),
+    ("Results", "The model improves BLEU by two points over the best ensembles while training in a "
+                "fraction of the time. Ablations show that the number of attention heads matters."),
+    ("Conclusion", "Attention-only architectures are fast to train and transfer to other tasks."),
+]
+
+REFERENCES = [
+    "[1] A. Vaswani, N. Shazeer, et al. Attention is all you need. arXiv:1706.03762, 2017.",
+    "[2] J. Gehring, M. Auli, et al. Convolutional sequence to sequence learning. arXiv:1705.03122, 2017.",
+    "[3] D. Bahdanau, K. Cho, Y. Bengio. Neural machine translation by jointly learning to align and "
+    "translate. In ICLR, 2015.",
+    "[4] K. He, X. Zhang, S. Ren, J. Sun. Deep residual learning for image recognition. In CVPR, 2016.",
+    "[5] J. L. Ba, J. R. Kiros, G. E. Hinton. Layer normalization. arXiv:1607.06450, 2016.",
+]
+
+
+def sample_pdf(pages=6, variant=None):
+    """Build a small paper-shaped PDF: abstract, sections and a bibliography.
+
+    A *variant* is stamped in the footer of every page, so each variant
+    extracts as a distinct document with no pages in common.
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    page.insert_text((72, y), "A Study of Attention for Sequence Models", fontsize=18)
+    y += 36
+    page.insert_text((72, y), "Abstract", fontsize=13)
+    y += 20
+    page.insert_textbox(fitz.Rect(72, y, 540, y + 80),
+                        "We study attention-based neural network architectures for translation.",
+                        fontsize=10)
+    y += 90
+
+    sections = SECTIONS * max(1, (pages - 1) // 3)
+    for i, (heading, body) in enumerate(sections, 1):
+        if y > 620:
+            page = doc.new_page()
+            y = 72
+        page.insert_text((72, y), f"{i} {heading}", fontsize=13)
+        y += 20
+        page.insert_textbox(fitz.Rect(72, y, 540, y + 110), (body + " ") * 2, fontsize=10)
+        y += 120
+
+    page = doc.new_page()
+    page.insert_text((72, 72), "References", fontsize=13)
+    y = 96
+    for ref in REFERENCES:
+        page.insert_textbox(fitz.Rect(72, y, 540, y + 40), ref, fontsize=9)
+        y += 44
+    if variant is not None:
+        for page in doc:
+            page.insert_text((72, 760), f"Draft {variant}", fontsize=8)
+    return doc.tobytes()
+
+
+def fake_token(lifetime=3600):
+    """Return an unsigned JWT-shaped token carrying an ``exp`` claim."""
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": time.time() + lifetime}).encode())
+    return f"stub.{payload.decode().rstrip('=')}.stub"
+
+
+class _Stub:
+    """Runs a handler class on a local ThreadingHTTPServer."""
+
+    def __init__(self, handler, latency=0.0):
+        handler.stub = self
+        self.latency = latency
+        self.requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    stub = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _begin(self):
+        self.stub.requests += 1
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# ---------------------------------------------------------------------------
+# ArXiv
+# ---------------------------------------------------------------------------
+
+def _atom_entry(arxiv_id, title):
+    return f"""<entry>
+  <id>http://arxiv.org/abs/{arxiv_id}v1</id>
+  <title>{escape(title)}</title>
+  <summary>Stub abstract for {escape(title)}.</summary>
+  <published>2017-06-12T00:00:00Z</published>
+  <author><name>Stub Author</name></author>
+  <link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v1" rel="related" type="application/pdf"/>
+  <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="cs.CL"/>
+</entry>"""
+
+
+def _atom_feed(entries):
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">\n' + "\n".join(entries) + "\n</feed>")
+
+
+class _ArxivHandler(_Handler):
+    def do_GET(self):
+        self._begin()
+        url = urlparse(self.path)
+        if url.path.startswith("/pdf/"):
+            return self._send(200, self.stub.pdf_bytes, "application/pdf")
+        if url.path != "/api/query":
+            return self._send(404, {"error": "not found"})
+
+        params = parse_qs(url.query)
+        if params.get("id_list"):
+            ids = params["id_list"][0].split(",")
+            entries = [_atom_entry(re.sub(r"v\d+$", "", i), f"Paper {i}") for i in ids]
+        else:
+            query = params.get("search_query", ["all:"])[0].split(":", 1)[-1]
+            count = int(params.get("max_results", ["5"])[0])
+            # Echo the query as the first title so title lookups resolve
+            entries = [_atom_entry(f"2001.{10000 + n}", query if n == 0 else f"{query} follow-up {n}")
+                       for n in range(count)]
+        self._send(200, _atom_feed(entries), "application/atom+xml")
+
+
+class ArxivStub(_Stub):
+    """ArXiv query API and PDF host."""
+
+    def __init__(self, latency=0.0, pdf_pages=6):
+        self.pdf_bytes = sample_pdf(pdf_pages)
+        super().__init__(_ArxivHandler, latency)
+
+    @property
+    def api_url(self):
+        return f"{self.url}/api/query"
+
+    @property
+    def pdf_url(self):
+        return f"{self.url}/pdf"
+
+
+# ---------------------------------------------------------------------------
+# MCP (SSE transport)
+# ---------------------------------------------------------------------------
+
+MCP_TOOLS = [
+    {"name": "search_papers", "description": "Search ArXiv papers",
+     "inputSchema": {"type": "object", "properties": {"query": {"type": "string"}}}},
+    {"name": "download_paper", "description": "Download a paper by ArXiv ID",
+     "inputSchema": {"type": "object", "properties": {"paper_id": {"type": "string"}}}},
+    {"name": "read_paper", "description": "Read a downloaded paper",
+     "inputSchema": {"type": "object", "properties": {"paper_id": {"type": "string"}}}},
+]
+
+
+class _MCPHandler(_Handler):
+    def do_GET(self):
+        if urlparse(self.path).path != "/sse":
+            return self._send(404, {"error": "not found"})
+        session_id = uuid.uuid4().hex
+        outbox = self.stub.sessions[session_id] = queue.Queue()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            self._event("endpoint", f"/messages/?session_id={session_id}")
+            while True:
+                try:
+                    message = outbox.get(timeout=15)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if message is None:
+                    break
+                self._event("message", json.dumps(message))
+        except OSError:
+            pass
+        finally:
+            self.stub.sessions.pop(session_id, None)
+            self.close_connection = True
+
+    def _event(self, event, data):
+        self.wfile.write(f"event: {event}\ndata: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def do_POST(self):
+        self._begin()
+        session_id = parse_qs(urlparse(self.path).query).get("session_id", [""])[0]
+        outbox = self.stub.sessions.get(session_id)
+        if outbox is None:
+            return self._send(404, {"error": "unknown session"})
+        message = json.loads(self._body() or b"{}")
+        self._send(202, "Accepted", "text/plain")
+        if "id" in message:
+            outbox.put({"jsonrpc": "2.0", "id": message["id"], "result": self._result(message)})
+
+    def _result(self, message):
+        method = message.get("method")
+        params = message.get("params") or {}
+        if method == "initialize":
+            return {
+                "protocolVersion": params.get("protocolVersion", "2024-11-05"),
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": "arxiv-stub", "version": "0.1"},
+            }
+        if method == "tools/list":
+            return {"tools": MCP_TOOLS}
+        if method == "tools/call":
+            payload = {"tool": params.get("name"), "arguments": params.get("arguments", {}), "papers": []}
+            return {"content": [{"type": "text", "text": json.dumps(payload)}], "isError": False}
+        return {}
+
+
+class MCPStub(_Stub):
+    """ArXiv MCP server over the SSE transport."""
+
+    def __init__(self, latency=0.0):
+        self.sessions = {}  # session id -> queue of outgoing JSON-RPC messages
+        super().__init__(_MCPHandler, latency)
+
+    @property
+    def sse_url(self):
+        return f"{self.url}/sse"
+
+    def stop(self):
+        for outbox in list(self.sessions.values()):
+            outbox.put(None)
+        super().stop()
+
+
+# ---------------------------------------------------------------------------
+# Vocal Bridge
+# ---------------------------------------------------------------------------
+
+class _VocalBridgeHandler(_Handler):
+    def do_POST(self):
+        self._begin()
+        if urlparse(self.path).path != "/api/v1/token":
+            return self._send(404, {"error": "not found"})
+        body = json.loads(self._body() or b"{}")
+        self._send(200, {
+            "token": fake_token(),
+            "livekit_url": "wss://livekit.stub.invalid",
+            "room_name": f"room-{uuid.uuid4().hex[:8]}",
+            "participant_name": body.get("participant_name"),
+        })
+
+    def do_GET(self):
+        self._begin()
+        if urlparse(self.path).path != "/api/v1/agent":
+            return self._send(404, {"error": "not found"})
+        self._send(200, {"name": "stub-agent", "status": "active"})
+
+
+class VocalBridgeStub(_Stub):
+    """Vocal Bridge token API."""
+
+    def __init__(self, latency=0.0):
+        super().__init__(_VocalBridgeHandler, latency)
+
+    @property
+    def api_url(self):
+        return f"{self.url}/api/v1"
@@ -0,0 +1,163 @@
+"""
+Memory accounting for the in-process session store.
+
+``deep_sizeof`` walks an object graph and sums ``sys.getsizeof`` over
+every reachable object, counting shared objects once per walk.  It is an
+estimate of retained bytes (allocator overhead and interpreter caches are
+not included) but it is consistent, so it is good for comparing sessions
+and structure types.  MemoryTracker adds optional tracemalloc snapshot
+diffs between calls.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import deque
+
+# Shared by everything; never part of a session's footprint
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType, types.FrameType)
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, bool, complex, type(None))
+
+# Yield to other greenlets every this many objects on large walks
+_YIELD_EVERY = 20000
+
+
+def deep_sizeof(obj, seen=None):
+    """Return the estimated bytes retained by *obj* and everything it references.
+
+    Objects whose ids are already in *seen* are skipped, so passing the same
+    set to several calls counts shared objects only once.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    visited = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        visited += 1
+        if visited % _YIELD_EVERY == 0:
+            time.sleep(0)
+
+        if isinstance(current, _ATOMIC_TYPES):
+            continue
+        if isinstance(current, dict):
+            for key, value in list(current.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(list(current))
+        else:
+            if hasattr(current, "__dict__"):
+                stack.append(current.__dict__)
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+def process_rss():
+    """Return the current resident set size in bytes, or None if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def session_report(sessions, derived=None, top=10):
+    """Estimate retained bytes per session and per structure type.
+
+    *derived* is an optional ``derived(session_id, session)`` callable that
+    returns extra cached structures (reference indexes, quiz material...)
+    to charge to the session.  Each session is measured on its own, so a
+    structure shared by two sessions counts fully towards both; the
+    deduplicated ``total_bytes`` and ``shared_bytes`` show the overlap.
+    """
+    global_seen = set()
+    deduplicated = 0
+    by_structure = {}
+    rows = []
+    for session_id, session in list(sessions.items()):
+        structures = dict(session)
+        if derived:
+            structures.update(derived(session_id, session))
+
+        # pdf_data first: the outline and contexts mostly point into it
+        order = sorted(structures, key=lambda name: name != "pdf_data")
+        seen = set()
+        breakdown = {}
+        for name in order:
+            size = deep_sizeof(structures[name], seen)
+            deduplicated += deep_sizeof(structures[name], global_seen)
+            breakdown[name] = size
+            by_structure[name] = by_structure.get(name, 0) + size
+
+        rows.append({
+            "session_id": session_id,
+            "filename": session.get("filename", ""),
+            "bytes": sum(breakdown.values()),
+            "by_structure": dict(sorted(breakdown.items(), key=lambda kv: -kv[1])),
+        })
+
+    rows.sort(key=lambda r: -r["bytes"])
+    charged = sum(r["bytes"] for r in rows)
+    return {
+        "sessions": len(rows),
+        "total_bytes": deduplicated,
+        "shared_bytes": charged - deduplicated,
+        "by_structure": dict(sorted(by_structure.items(), key=lambda kv: -kv[1])),
+        "top_sessions": rows[:top],
+        "rss_bytes": process_rss(),
+    }
+
+
+class MemoryTracker:
+    """tracemalloc snapshots, diffed against the previous call."""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._snapshot = None
+
+    def diff(self, top=10):
+        """Return the top allocation changes since the previous call.
+
+        The first call starts tracing and records a baseline; tracing slows
+        allocation down, so call ``stop`` when done.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._snapshot = None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, self._snapshot = self._snapshot, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        result = {"tracing": True, "traced_bytes": current, "peak_bytes": peak}
+        if previous is None:
+            result["baseline"] = True
+            return result
+        result["top_diffs"] = [
+            {
+                "location": str(stat.traceback[0]) if stat.traceback else "?",
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+            }
+            for stat in snapshot.compare_to(previous, "lineno")[:top]
+        ]
+        return result
+
+    def stop(self):
+        self._snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return {"tracing": False}
@@ -0,0 +1,221 @@
+"""
+Minimal Prometheus-style metrics.
+
+Counters, gauges and histograms are kept in process memory and rendered
+in the Prometheus text exposition format by ``render()``.  Recording is a
+dict lookup and a bisect under a per-metric lock, so the instrumentation
+is cheap enough to leave on in production.
+
+The application's metrics are defined at module level below so any
+module can record into them without threading a registry around.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> value
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}  # label values tuple -> callable
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Read the gauge's value from ``fn()`` whenever metrics are scraped."""
+        self._functions[self._key(labels)] = fn
+
+    def _samples(self):
+        samples = super()._samples()
+        for key, fn in list(self._functions.items()):
+            try:
+                samples.append((self.name, key, None, fn()))
+            except Exception as e:
+                print(f"[Metrics] {self.name} callback failed: {e}")
+        return samples
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Each decorated call needs its own start time
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (+Inf last), sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, **labels):
+        """Time a block or function: ``with hist.time(stage="x"):`` or ``@hist.time(stage="x")``."""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            entries = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in entries:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+            samples.append((f"{self.name}_sum", key, None, total))
+            samples.append((f"{self.name}_count", key, None, cumulative))
+        return samples
+
+
+def render():
+    """Render every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_DURATION = Histogram(
+    "learnaloud_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"),
+)
+HTTP_REQUESTS = Counter(
+    "learnaloud_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "learnaloud_http_requests_in_flight", "HTTP requests currently being served.", ("route",),
+)
+STAGE_DURATION = Histogram(
+    "learnaloud_stage_duration_seconds", "Time spent in hot processing stages.", ("stage",),
+)
+UPSTREAM_DURATION = Histogram(
+    "learnaloud_upstream_request_duration_seconds", "Upstream HTTP call latency.", ("upstream", "outcome"),
+)
+PDF_POOL_WAIT = Histogram(
+    "learnaloud_pdf_pool_wait_seconds", "Time PDF jobs spent queued for a worker.",
+)
+PDF_POOL_JOBS = Gauge("learnaloud_pdf_pool_jobs", "PDF jobs queued or running.", ("state",))
+PDF_POOL_REJECTED = Counter(
+    "learnaloud_pdf_pool_rejected_total", "PDF jobs turned away by the worker pool.", ("reason",),
+)
+PDF_PAGES = Counter(
+    "learnaloud_pdf_pages_total", "Pages extracted, or reused from the page cache.", ("result",),
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "learnaloud_singleflight_calls_total", "Coalesced computations by role (leader ran it, shared waited).",
+    ("flight", "role"),
+)
+DEBATE_HANDOFF = Histogram(
+    "learnaloud_debate_handoff_seconds",
+    "Debate turn handoff latency: broker (turn end to relay), delivery (relay to client start), "
+    "handoff (turn end to next turn start).",
+    ("stage",),
+)
+SESSIONS = Gauge("learnaloud_sessions", "Documents currently held in the session store.")
+CACHED_BYTES = Gauge("learnaloud_cached_bytes", "Bytes held by on-disk caches.", ("cache",))
+SOCKETIO_CONNECTIONS = Gauge("learnaloud_socketio_connections", "Connected Socket.IO clients.")
@@ -0,0 +1,108 @@
+"""
+Bounded worker pool for CPU-bound PDF work.
+
+PyMuPDF runs in C and never yields to the eventlet hub, so extracting a
+200-page upload inline stalls every other client's highlights and
+websockets.  Jobs submitted here run on eventlet's native thread pool
+(``tpool``) when the process is monkey-patched, so the hub keeps serving
+while they run.  At most ``max_workers`` jobs run at once and at most
+``max_queue`` more wait for a slot; anything beyond that is rejected
+immediately with PoolBusy so the route can answer 503 instead of letting
+work pile up.
+"""
+
+import threading
+import time
+
+from eventlet import patcher, tpool
+
+from metrics import PDF_POOL_JOBS, PDF_POOL_REJECTED, PDF_POOL_WAIT, STAGE_DURATION
+
+
+class PoolBusy(Exception):
+    """The pool is saturated, or the job did not finish in time."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PDFWorkPool:
+    """Runs PDF jobs off the event loop with a bounded queue and a timeout."""
+
+    def __init__(self, max_workers=2, max_queue=8, timeout=120.0, retry_after=5):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.Semaphore(max_workers)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        PDF_POOL_JOBS.set_function(lambda: self.queued, state="queued")
+        PDF_POOL_JOBS.set_function(lambda: self.running, state="running")
+
+    def run(self, stage, fn, *args):
+        """Run ``fn(*args)`` on a worker and return its result.
+
+        Raises PoolBusy straight away when the queue is full, or once
+        ``timeout`` seconds have passed since the job was submitted.  A job
+        that times out while running keeps its slot until it finishes, so
+        the worker bound holds even for abandoned jobs.
+        """
+        with self._lock:
+            if self.queued + self.running >= self.max_workers + self.max_queue:
+                PDF_POOL_REJECTED.inc(reason="saturated")
+                raise PoolBusy("PDF processing is at capacity, try again shortly", self.retry_after)
+            self.queued += 1
+
+        submitted = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - submitted
+        with self._lock:
+            self.queued -= 1
+            if acquired:
+                self.running += 1
+        PDF_POOL_WAIT.observe(waited)
+        if not acquired:
+            PDF_POOL_REJECTED.inc(reason="timeout")
+            raise PoolBusy("Timed out waiting for a PDF worker", self.retry_after)
+
+        done = threading.Event()
+        outcome = {}
+
+        def work():
+            try:
+                with STAGE_DURATION.time(stage=stage):
+                    outcome["value"] = self._execute(fn, *args)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                with self._lock:
+                    self.running -= 1
+                self._slots.release()
+                done.set()
+
+        threading.Thread(target=work, daemon=True).start()
+        if not done.wait(max(self.timeout - waited, 0)):
+            PDF_POOL_REJECTED.inc(reason="timeout")
+            raise PoolBusy("PDF processing timed out", self.retry_after)
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["value"]
+
+    def status(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "running": self.running,
+            }
+
+    @staticmethod
+    def _execute(fn, *args):
+        if patcher.is_monkey_patched("thread"):
+            # The calling greenlet parks while a native thread does the work
+            return tpool.execute(fn, *args)
+        return fn(*args)
@@ -1,23 +1,98 @@
+import hashlib
+import os
 import re
 from collections import Counter
 
-import fitz  # PyMuPDF
+from metrics import PDF_PAGES, STAGE_DURATION
+from singleflight import SingleFlight
+
+# Bump when _extract_page's output changes, so cached pages are re-extracted
+PAGE_FORMAT = 1
+
+
+def page_hash(page):
+    """SHA-256 of what a page's extraction depends on.
+
+    Covers the content stream, the page geometry and the fonts and images
+    it references.  Resource xrefs are left out: they are renumbered when
+    a paper is re-typeset, even for pages whose content did not change.
+    """
+    digest = hashlib.sha256(f"v{PAGE_FORMAT}|{tuple(page.cropbox)}|{page.rotation}|".encode())
+    digest.update(page.read_contents())
+    for font in sorted(repr(f[1:6]) for f in page.get_fonts()):
+        digest.update(font.encode())
+    for image in sorted(repr(i[2:9]) for i in page.get_images()):
+        digest.update(image.encode())
+    return digest.hexdigest()
 
 
 class PDFProcessor:
-    """Extracts text structure and bounding boxes from PDF files using PyMuPDF."""
+    """Extracts text structure and bounding boxes from PDF files using PyMuPDF.
+
+    With a PDFWorkPool, extraction and outlining run on the pool's workers
+    instead of the calling greenlet.  With a page cache (a TTLCache keyed
+    by page_hash), only pages whose content changed since any earlier
+    upload are extracted; the rest are reused, so a revised version of a
+    paper costs about as much as the pages that were edited.
+    """
+
+    def __init__(self, pool=None, page_cache=None):
+        self.pool = pool
+        self.page_cache = page_cache
+        self._extractions = SingleFlight("extract_structure")
+
+    def _run(self, stage, fn, *args):
+        if self.pool is None:
+            with STAGE_DURATION.time(stage=stage):
+                return fn(*args)
+        return self.pool.run(stage, fn, *args)
 
     def extract_structure(self, pdf_path):
         """Extract text and bounding boxes from every page of the PDF.
 
         Returns a dict with a list of pages, each containing blocks of text
-        with their bounding box coordinates.
+        with their bounding box coordinates and the page's content_hash.
         """
+        return self._extractions.do(os.path.realpath(pdf_path), self._extract_cached, pdf_path)
+
+    def _extract_cached(self, pdf_path):
+        if self.page_cache is None:
+            return self._run("extract_structure", self._extract_structure, pdf_path)
+
+        # Cache lookups stay on this side of the pool: the cache's locks are
+        # green, and the pool's workers are native threads.
+        hashes = self._run("page_hashes", self._page_hashes, pdf_path)
+        pages = [self.page_cache.get(h) for h in hashes]
+        missing = [i for i, page in enumerate(pages) if page is None]
+        if missing:
+            fresh = self._run("extract_structure", self._extract_structure, pdf_path, missing)
+            for i, page in zip(missing, fresh["pages"]):
+                self.page_cache.set(hashes[i], page)
+                pages[i] = page
+        PDF_PAGES.inc(len(pages) - len(missing), result="reused")
+        PDF_PAGES.inc(len(missing), result="extracted")
+
+        # Cached pages are shared between documents and treated as read-only
+        pages = [dict(page, page_num=i + 1) for i, page in enumerate(pages)]
+        return {"pages": pages, "total_pages": len(pages)}
+
+    def _page_hashes(self, pdf_path):
+        import fitz
+
+        try:
+            with fitz.open(pdf_path) as doc:
+                return [page_hash(page) for page in doc]
+        except Exception as e:
+            raise RuntimeError(f"Failed to extract PDF structure: {e}")
+
+    def _extract_structure(self, pdf_path, page_indexes=None):
+        import fitz  # PyMuPDF; imported on first use to keep startup fast
+
         try:
             doc = fitz.open(pdf_path)
             pages = []
 
-            for page_num in range(len(doc)):
+            for page_num in range(len(doc)) if page_indexes is None else page_indexes:
                 page = doc[page_num]
                 page_dict = page.get_text("dict")
                 width = page_dict["width"]
@@ -82,6 +157,7 @@ class PDFProcessor:
                     "height": height,
                     "blocks": blocks,
                     "figures": figures,
+                    "content_hash": page_hash(page),
                 })
 
             doc.close()
@@ -90,6 +166,7 @@ class PDFProcessor:
         except Exception as e:
             raise RuntimeError(f"Failed to extract PDF structure: {e}")
 
+    @STAGE_DURATION.time(stage="find_text_position")
     def find_text_position(self, pdf_data, search_text, page_num):
         """Find the bounding box position of *search_text* on *page_num*.
 
@@ -123,6 +200,9 @@ class PDFProcessor:
           - key_terms: list of frequently bolded / capitalized terms
           - abstract: first ~500 chars of body text
         """
+        return self._run("build_outline", self._build_outline, pdf_data)
+
+    def _build_outline(self, pdf_data):
         sections = []
         figures_list = []
         bold_terms = Counter()
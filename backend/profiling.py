@@ -0,0 +1,198 @@
+"""
+Opt-in request profiling.
+
+A request is profiled when an admin asks for it (``X-Profile: 1`` header or
+``?profile=1``, plus the ``X-Admin-Token`` header) or when it is picked by
+1-in-N sampling.  Profiling uses a stack sampler rather than cProfile: a
+real OS thread periodically captures the stacks running under the
+request's WSGI frame, which works for both threads and eventlet greenlets
+(cProfile's timings are skewed by greenlet switches).  Samples are written
+as collapsed stacks (one ``frame;frame;frame count`` line per stack),
+ready for flamegraph.pl or speedscope, and indexed so slow requests can be
+listed.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from itertools import count
+
+try:
+    # Under eventlet, the sampler must be a real OS thread: a green thread
+    # would only run when the request it is sampling yields.
+    from eventlet.patcher import original
+    _threading = original("threading")
+except ImportError:
+    import threading as _threading
+
+from werkzeug.exceptions import HTTPException
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """Samples the stacks of code running beneath *root_frame*."""
+
+    def __init__(self, root_frame, interval=0.005):
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = _threading.Event()
+        self._thread = _threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _stack_under_root(self, frame):
+        names = []
+        while frame is not None:
+            if frame is self.root_frame:
+                return ";".join(reversed(names))
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        return None
+
+    def _run(self):
+        own = _threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self._stack_under_root(frame)
+                if stack:
+                    self.stacks[stack] += 1
+                    self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles flagged or sampled requests."""
+
+    INDEX_FILE = "index.jsonl"
+    # Socket.IO polls and websockets last as long as the connection, not a request
+    SKIP_PREFIXES = ("/socket.io/",)
+
+    def __init__(self, flask_app, profile_dir, admin_token=None, sample_every=0, interval=0.005):
+        self.flask_app = flask_app
+        self.wsgi_app = flask_app.wsgi_app
+        self.profile_dir = profile_dir
+        self.admin_token = admin_token
+        self.sample_every = sample_every
+        self.interval = interval
+        self._counter = count(1)
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def is_admin(self, token):
+        return bool(self.admin_token) and token == self.admin_token
+
+    def _trigger(self, environ):
+        if environ.get("PATH_INFO", "").startswith(self.SKIP_PREFIXES):
+            return None
+        flagged = environ.get("HTTP_X_PROFILE") == "1" or re.search(
+            r"(^|&)profile=1(&|$)", environ.get("QUERY_STRING", "")
+        )
+        if flagged and self.is_admin(environ.get("HTTP_X_ADMIN_TOKEN")):
+            return "flag"
+        if self.sample_every and next(self._counter) % self.sample_every == 0:
+            return "sampled"
+        return None
+
+    def _route_and_session(self, environ):
+        try:
+            rule, args = self.flask_app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return "unmatched", None
+        session_id = args.get("session_id")
+        if not session_id:
+            m = re.search(r"(?:^|&)session_id=([\w-]+)", environ.get("QUERY_STRING", ""))
+            session_id = m.group(1) if m else None
+        return rule.rule, session_id
+
+    def __call__(self, environ, start_response):
+        trigger = self._trigger(environ)
+        if trigger is None:
+            return self.wsgi_app(environ, start_response)
+
+        status = {}
+
+        def capture_status(code, headers, exc_info=None):
+            status["code"] = int(code.split()[0])
+            return start_response(code, headers, exc_info)
+
+        sampler = StackSampler(sys._getframe(), self.interval).start()
+        start = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, capture_status)
+        finally:
+            duration = time.perf_counter() - start
+            stacks = sampler.stop()
+            try:
+                self._write(environ, trigger, status.get("code"), duration, sampler.samples, stacks)
+            except OSError as e:
+                print(f"[Profiling] Could not write profile: {e}")
+
+    def _write(self, environ, trigger, status, duration, samples, stacks):
+        route, session_id = self._route_and_session(environ)
+        slug = re.sub(r"[^a-z0-9]+", "-", route.lower()).strip("-") or "root"
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}"
+        with open(os.path.join(self.profile_dir, f"{profile_id}.folded"), "w") as f:
+            for stack, n in stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+        record = {
+            "id": profile_id,
+            "route": route,
+            "path": environ.get("PATH_INFO", ""),
+            "method": environ.get("REQUEST_METHOD", ""),
+            "session_id": session_id,
+            "status": status,
+            "trigger": trigger,
+            "duration_ms": round(duration * 1000, 1),
+            "samples": samples,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self.profile_dir, self.INDEX_FILE), "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"[Profiling] {record['method']} {route} took {record['duration_ms']}ms -> {profile_id}.folded")
+
+    def list_profiles(self, route=None, session_id=None, min_ms=0, limit=50):
+        """Return recorded profiles, slowest first."""
+        records = []
+        try:
+            with open(os.path.join(self.profile_dir, self.INDEX_FILE)) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if route and record["route"] != route:
+                        continue
+                    if session_id and record["session_id"] != session_id:
+                        continue
+                    if record["duration_ms"] < min_ms:
+                        continue
+                    records.append(record)
+        except OSError:
+            return []
+        records.sort(key=lambda r: r["duration_ms"], reverse=True)
+        return records[:limit]
+
+    def profile_path(self, profile_id):
+        """Return the collapsed-stack file for *profile_id*, or None."""
+        if not re.fullmatch(r"[\w-]+", profile_id or ""):
+            return None
+        path = os.path.join(self.profile_dir, f"{profile_id}.folded")
+        return path if os.path.exists(path) else None
@@ -0,0 +1,112 @@
+"""
+Runtime registry for versioned agent prompts.
+
+Prompts live in ``prompts/prompt_history.json`` and are managed with
+``prompts/manage_prompts.py``.  The registry serves the current version
+of each one, compiled once into literal and slot parts, so rendering is
+just a join.  Slots are written ``${name}``; any other ``$`` or brace is
+literal text, so JSON examples in a prompt need no escaping.  When the
+history file's mtime changes, the registry reloads it on the next lookup,
+so a prompt edit or rollback takes effect without a restart.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts", "prompt_history.json")
+
+_SLOT = re.compile(r"\$\{(\w+)\}")
+
+
+class CompiledPrompt:
+    """One prompt version, split into literals and named slots."""
+
+    def __init__(self, agent, version, text):
+        self.agent = agent
+        self.version = version
+        # Even indexes are literal text, odd indexes are slot names
+        self.parts = _SLOT.split(text)
+        self.slots = frozenset(self.parts[1::2])
+
+    def render(self, **values):
+        """Fill the slots from *values*; extra values are ignored."""
+        missing = self.slots - values.keys()
+        if missing:
+            raise KeyError(f"{self.agent} {self.version} needs {', '.join(sorted(missing))}")
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = str(values[parts[i]])
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """Current prompt versions from the history file, reloaded when it changes."""
+
+    def __init__(self, path=DEFAULT_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._prompts = {}  # agent -> CompiledPrompt
+        self._stamp = None  # (mtime_ns, size) of the loaded file
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self._refresh(force=True)
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if force:
+                raise
+            print(f"[Prompts] Keeping loaded prompts, cannot stat {self.path}: {e}")
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.path) as f:
+                agents = json.load(f)["agents"]
+            prompts = {
+                agent: CompiledPrompt(agent, info["current_version"],
+                                      info["versions"][info["current_version"]]["prompt"])
+                for agent, info in agents.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if force:
+                raise
+            # A half-written or broken file must not take the live prompts down
+            print(f"[Prompts] Ignoring unreadable {self.path}: {e}")
+            return
+        self._prompts = prompts
+        if self._stamp is not None:
+            self.reloads += 1
+            print(f"[Prompts] Reloaded {self.path}")
+        self._stamp = stamp
+
+    def get(self, agent):
+        """Return the CompiledPrompt for *agent*'s current version."""
+        with self._lock:
+            self._refresh()
+            prompts = self._prompts
+        try:
+            return prompts[agent]
+        except KeyError:
+            raise KeyError(f"No prompt for agent {agent!r}") from None
+
+    def render(self, agent, **values):
+        """Return ``(text, version)`` for *agent*'s current prompt."""
+        prompt = self.get(agent)
+        return prompt.render(**values), prompt.version
+
+    def versions(self):
+        """Return ``{agent: current version}``."""
+        with self._lock:
+            self._refresh()
+            return {agent: p.version for agent, p in self._prompts.items()}
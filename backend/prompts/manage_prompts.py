@@ -24,8 +24,12 @@ def load():
 
 
 def save(data):
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    # Write-then-rename: the running backend reloads this file when it changes
+    tmp_path = f"{HISTORY_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, HISTORY_FILE)
     print(f"Saved to {HISTORY_FILE}")
 
 
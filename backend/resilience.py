@@ -0,0 +1,260 @@
+"""
+Resilience layer for upstream HTTP calls (ArXiv, Vocal Bridge).
+
+Each Upstream tracks the error rate and latency of recent calls.  When
+too many of them fail (or are too slow), its circuit opens and calls fail
+fast with CircuitOpenError instead of tying up a greenlet for the full
+request timeout; after a cool-down a single probe call decides whether to
+close it again.  Idempotent calls can be retried with jittered backoff and
+optionally hedged: if the first attempt hasn't answered within the
+upstream's recent p95 latency, a duplicate is sent and whichever answers
+first wins.  An upstream with a minimum interval spaces its calls out, for
+hosts that publish a request-rate limit.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from metrics import UPSTREAM_DURATION
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+def is_upstream_failure(error):
+    """Return True if *error* says the upstream itself is unhealthy.
+
+    Client errors (4xx other than 429) are the caller's fault and neither
+    trip the breaker nor get retried.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, requests.RequestException)
+
+
+class Upstream:
+    """Circuit breaker, retry and hedging policy for one upstream service."""
+
+    def __init__(self, name, window=20, min_calls=5, failure_threshold=0.5,
+                 slow_call_threshold=10.0, reset_timeout=30.0, max_retries=2,
+                 base_delay=0.2, max_delay=2.0, hedge=False, hedge_min_delay=0.05,
+                 hedge_min_samples=20, min_interval=0.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.min_interval = min_interval
+
+        self._outcomes = deque(maxlen=window)  # True = healthy call
+        self._latencies = deque(maxlen=200)  # seconds, successful calls only
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix=f"hedge-{name}") if hedge else None
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._next_slot = 0.0  # earliest start time for the next paced call
+
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.opened = 0
+
+    # ------------------------------------------------------------------
+    # Breaker state
+    # ------------------------------------------------------------------
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+            if self.state == HALF_OPEN:
+                self._probing = True
+            self.calls += 1
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.time()
+        self._probing = False
+        self.opened += 1
+        print(f"[Resilience] Circuit for {self.name} opened")
+
+    def _record(self, healthy, latency=None):
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            if not healthy:
+                self.failures += 1
+            if self.state == HALF_OPEN:
+                if healthy:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    print(f"[Resilience] Circuit for {self.name} closed")
+                else:
+                    self._open()
+                return
+            self._outcomes.append(healthy)
+            if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failed = self._outcomes.count(False)
+                if failed / len(self._outcomes) >= self.failure_threshold:
+                    self._open()
+
+    def _abandon(self):
+        """Release a half-open probe that was interrupted before it had an outcome."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def p95(self):
+        """Return the p95 latency of recent successful calls, or None."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+
+    def _pace(self):
+        """Wait for this call's slot when calls must be *min_interval* apart."""
+        if not self.min_interval:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        # Green sleeps can wake a little early, so check the clock again
+        remaining = slot - time.time()
+        while remaining > 0:
+            time.sleep(remaining)
+            remaining = slot - time.time()
+
+    def _attempt(self, fn):
+        """Run one attempt through the breaker and record its outcome."""
+        self._pace()
+        self._before_call()
+        start = time.time()
+        try:
+            result = fn()
+        except Exception as e:
+            UPSTREAM_DURATION.observe(time.time() - start, upstream=self.name, outcome="error")
+            self._record(not is_upstream_failure(e))
+            raise
+        except BaseException:
+            # eventlet.Timeout, GreenletExit: says nothing about the upstream,
+            # but a stuck probe would reject every call from now on
+            self._abandon()
+            raise
+        latency = time.time() - start
+        UPSTREAM_DURATION.observe(latency, upstream=self.name, outcome="ok")
+        self._record(latency < self.slow_call_threshold, latency)
+        return result
+
+    def _hedged_attempt(self, fn):
+        p95 = self.p95()
+        with self._lock:
+            samples = len(self._latencies)
+        if samples < self.hedge_min_samples or p95 is None:
+            return self._attempt(fn)
+
+        primary = self._executor.submit(self._attempt, fn)
+        done, _ = wait([primary], timeout=max(self.hedge_min_delay, p95))
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        try:
+            hedge = self._executor.submit(self._attempt, fn)
+        except RuntimeError:
+            return primary.result()
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def call(self, fn, idempotent=False):
+        """Call ``fn()`` through the breaker.
+
+        Idempotent calls are retried on upstream failures with jittered
+        exponential backoff, and hedged when the upstream has hedging on.
+        Raises CircuitOpenError without calling *fn* while the circuit is open.
+        """
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        for attempt in range(attempts):
+            try:
+                if idempotent and self.hedge:
+                    return self._hedged_attempt(fn)
+                return self._attempt(fn)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if attempt == attempts - 1 or not is_upstream_failure(e):
+                    raise
+            with self._lock:
+                self.retries += 1
+            time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def get(self, url, **kwargs):
+        """Idempotent ``requests.get`` through the breaker; raises on HTTP errors."""
+        def fetch():
+            resp = requests.get(url, **kwargs)
+            resp.raise_for_status()
+            return resp
+        return self.call(fetch, idempotent=True)
+
+    def status(self):
+        """Return the breaker state and recent error rate/latency."""
+        p95 = self.p95()
+        with self._lock:
+            recent = len(self._outcomes)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "error_rate": round(self._outcomes.count(False) / recent, 3) if recent else 0.0,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "opened": self.opened,
+                "retry_in": max(0, round(self._opened_at + self.reset_timeout - time.time(), 1))
+                if self.state == OPEN else 0,
+            }
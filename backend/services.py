@@ -0,0 +1,221 @@
+"""
+Agents and upstream clients, built on first use.
+
+Constructing the agents pulls in PyMuPDF, opens caches and loads the
+review schedule; none of that should delay startup when a dyno scales
+from zero.  Services builds each component (and imports its module) the
+first time a request needs it.
+"""
+
+import os
+import threading
+
+_MISSING = object()
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def config_from_env():
+    """Return the default configuration, read from the environment."""
+    return {
+        "SECRET_KEY": os.getenv("LEARNALOUD_SECRET_KEY", "learnaloud-secret"),
+        "UPLOAD_DIR": os.path.join(BACKEND_DIR, "uploads"),
+        "CACHE_DIR": os.getenv("LEARNALOUD_CACHE_DIR", os.path.join(BACKEND_DIR, "cache")),
+        "DATA_DIR": os.getenv("LEARNALOUD_DATA_DIR", os.path.join(BACKEND_DIR, "data")),
+        "ADMIN_TOKEN": os.getenv("LEARNALOUD_ADMIN_TOKEN"),
+        "PROFILE_SAMPLE_EVERY": int(os.getenv("LEARNALOUD_PROFILE_SAMPLE_EVERY", "0")),
+        "ARXIV_API_URL": os.getenv("ARXIV_API_URL"),
+        "ARXIV_PDF_URL": os.getenv("ARXIV_PDF_URL"),
+        "ARXIV_MCP_URL": os.getenv("ARXIV_MCP_URL", "http://localhost:8050/sse"),
+        "VOCAL_BRIDGE_URL": os.getenv("VOCAL_BRIDGE_URL"),
+        "VOCAL_BRIDGE_API_KEY": os.getenv("VOCAL_BRIDGE_API_KEY", ""),
+        "VOCAL_BRIDGE_AUTHOR_API_KEY": os.getenv("VOCAL_BRIDGE_AUTHOR_API_KEY", ""),
+        "VOCAL_BRIDGE_REVIEWER_API_KEY": os.getenv("VOCAL_BRIDGE_REVIEWER_API_KEY", ""),
+        "WARM_TOKEN_POOLS": True,
+        "PROMPT_HISTORY": os.getenv(
+            "LEARNALOUD_PROMPT_HISTORY", os.path.join(BACKEND_DIR, "prompts", "prompt_history.json"),
+        ),
+        "DEBATE_MAX_TURNS": int(os.getenv("LEARNALOUD_DEBATE_MAX_TURNS", "8")),
+        "DEBATE_TURN_SECONDS": float(os.getenv("LEARNALOUD_DEBATE_TURN_SECONDS", "45")),
+        "PDF_WORKERS": int(os.getenv("LEARNALOUD_PDF_WORKERS", "2")),
+        "PDF_QUEUE_DEPTH": int(os.getenv("LEARNALOUD_PDF_QUEUE_DEPTH", "8")),
+        "PDF_JOB_TIMEOUT": float(os.getenv("LEARNALOUD_PDF_JOB_TIMEOUT", "120")),
+        "PAGE_CACHE_MAX_BYTES": int(os.getenv("LEARNALOUD_PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        # redis://..., or local://host:port for the bundled broker (socketio_queue.py)
+        "SOCKETIO_MESSAGE_QUEUE": os.getenv("SOCKETIO_MESSAGE_QUEUE"),
+    }
+
+
+class lazy:
+    """Attribute built by the decorated method on first access, then cached.
+
+    Assigning the attribute directly (e.g. in tests) takes precedence.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.name = build.__name__
+        self.__doc__ = build.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        with obj._lock:
+            value = obj.__dict__.get(self.name, _MISSING)
+            if value is _MISSING:
+                value = obj.__dict__[self.name] = self.build(obj)
+        return value
+
+
+class Services:
+    """Lazily constructed agents and clients shared by the request handlers."""
+
+    # Token pools kept warm for the default participant of each agent key
+    WARM_PARTICIPANTS = {"tutor": "student", "author": "student-author", "reviewer": "student-reviewer"}
+    _POOL_KEYS = {
+        "tutor": "VOCAL_BRIDGE_API_KEY",
+        "author": "VOCAL_BRIDGE_AUTHOR_API_KEY",
+        "reviewer": "VOCAL_BRIDGE_REVIEWER_API_KEY",
+    }
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.RLock()
+
+    def is_built(self, name):
+        """Return True if the named component has been constructed."""
+        return name in self.__dict__
+
+    @property
+    def library_dir(self):
+        return os.path.join(self.config["UPLOAD_DIR"], "library")
+
+    @property
+    def page_cache_dir(self):
+        return os.path.join(self.config["CACHE_DIR"], "pages")
+
+    # ------------------------------------------------------------------
+    # Upstream clients
+    # ------------------------------------------------------------------
+
+    @lazy
+    def vocal_bridge_upstream(self):
+        from resilience import Upstream
+
+        # The three agent keys share one host, so they share one circuit breaker
+        return Upstream("vocal_bridge", slow_call_threshold=10.0)
+
+    @lazy
+    def token_pools(self):
+        from vocal_bridge import TokenPool, VocalBridgeClient
+
+        pools = {}
+        for name, key in self._POOL_KEYS.items():
+            client = VocalBridgeClient(
+                self.config[key], self.config["VOCAL_BRIDGE_URL"], self.vocal_bridge_upstream,
+            )
+            pools[name] = TokenPool(name, client)
+        return pools
+
+    @lazy
+    def token_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Mints the author and reviewer tokens of a debate side by side;
+        # shared so a request doesn't pay for spawning its own workers
+        return ThreadPoolExecutor(max_workers=4, thread_name_prefix="debate-tokens")
+
+    def warm_token_pools(self):
+        """Start pre-minting tokens for every agent key that is configured."""
+        for name, key in self._POOL_KEYS.items():
+            if self.config[key]:
+                self.token_pools[name].start([self.WARM_PARTICIPANTS[name]])
+
+    # ------------------------------------------------------------------
+    # Agents
+    # ------------------------------------------------------------------
+
+    @lazy
+    def pdf_pool(self):
+        from pdf_pool import PDFWorkPool
+
+        return PDFWorkPool(
+            self.config["PDF_WORKERS"], self.config["PDF_QUEUE_DEPTH"], self.config["PDF_JOB_TIMEOUT"],
+        )
+
+    @lazy
+    def page_cache(self):
+        from cache import TTLCache
+
+        # Keyed by page content hash, so entries never go stale; the disk
+        # tier is held to a byte budget instead, least recently used first
+        return TTLCache(
+            "pdf_pages", max_entries=2048, ttl=0, disk_dir=self.page_cache_dir,
+            max_disk_bytes=self.config["PAGE_CACHE_MAX_BYTES"],
+        )
+
+    @lazy
+    def pdf_processor(self):
+        from pdf_processor import PDFProcessor
+
+        return PDFProcessor(self.pdf_pool, self.page_cache)
+
+    @lazy
+    def librarian(self):
+        from agents import Librarian
+
+        return Librarian(
+            self.config["UPLOAD_DIR"],
+            self.pdf_processor,
+            mcp_url=self.config["ARXIV_MCP_URL"],
+            cache_dir=self.config["CACHE_DIR"],
+            api_url=self.config["ARXIV_API_URL"],
+            pdf_url=self.config["ARXIV_PDF_URL"],
+        )
+
+    @lazy
+    def navigator(self):
+        from agents import Navigator
+
+        return Navigator()
+
+    @lazy
+    def prompts(self):
+        from prompt_registry import PromptRegistry
+
+        return PromptRegistry(self.config["PROMPT_HISTORY"])
+
+    @lazy
+    def quiz_master(self):
+        from agents import QuizMaster
+
+        return QuizMaster(self.prompts)
+
+    @lazy
+    def reference_resolver(self):
+        from agents import ReferenceResolver
+
+        return ReferenceResolver(self.librarian, self.navigator)
+
+    @lazy
+    def review_scheduler(self):
+        from spaced_repetition import ReviewScheduler
+
+        return ReviewScheduler(os.path.join(self.config["DATA_DIR"], "review_schedule.jsonl"))
+
+    @lazy
+    def library_index(self):
+        from library_index import LibraryIndex
+
+        return LibraryIndex(os.path.join(self.config["DATA_DIR"], "library_index.sqlite3"))
+
+    @lazy
+    def debate_broker(self):
+        from debate import DebateBroker
+
+        return DebateBroker(self.config["DEBATE_MAX_TURNS"], self.config["DEBATE_TURN_SECONDS"])
+
+    @lazy
+    def memory_tracker(self):
+        from memory import MemoryTracker
+
+        return MemoryTracker()
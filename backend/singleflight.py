@@ -0,0 +1,84 @@
+"""
+Keyed single-flight execution.
+
+When several tabs or devices join a session at once they ask for the same
+context, references and quiz material at the same moment.  SingleFlight
+lets the first caller for a key run the computation while the others wait
+for it and share its result (or its exception).  Nothing is cached once
+the call completes; callers that want memoization put a cache in front.
+
+The primitives come from ``threading``, which ``eventlet.monkey_patch()``
+turns green, so waiting parks the greenlet rather than the hub.  A
+greenlet that re-enters a key it is already computing gets a
+RuntimeError instead of deadlocking on itself.  If the leader is killed
+rather than failing (eventlet.Timeout, GreenletExit), its waiters get a
+FlightAborted error instead of a result.
+"""
+
+import threading
+
+from metrics import SINGLEFLIGHT_CALLS
+
+
+class FlightAborted(RuntimeError):
+    """The call a waiter was sharing was interrupted before it finished."""
+
+
+class _Call:
+    def __init__(self, owner):
+        self.owner = owner
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return ``fn(*args, **kwargs)``, sharing one run among concurrent callers of *key*."""
+        return self.do_shared(key, fn, *args, **kwargs)[0]
+
+    def do_shared(self, key, fn, *args, **kwargs):
+        """Like ``do``, but return ``(value, shared)``; *shared* is True for waiters."""
+        me = threading.get_ident()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call(me)
+            elif call.owner == me:
+                raise RuntimeError(f"{self.name}: recursive call for key {key!r}")
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(flight=self.name, role="shared")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        SINGLEFLIGHT_CALLS.inc(flight=self.name, role="leader")
+        try:
+            call.value = fn(*args, **kwargs)
+            return call.value, False
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            # Don't hand the leader's Timeout or GreenletExit to other greenlets
+            call.error = FlightAborted(f"{self.name}: call for key {key!r} was interrupted")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self, key):
+        """Return True if a call for *key* is currently running."""
+        with self._lock:
+            return key in self._calls
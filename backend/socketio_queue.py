@@ -0,0 +1,232 @@
+"""
+Socket.IO message queue with a bundled local broker.
+
+Several server processes share Socket.IO clients and rooms by relaying
+emits through a pub/sub message queue.  Production can point
+``SOCKETIO_MESSAGE_QUEUE`` at Redis or any backend python-socketio
+supports; ``local://host:port`` selects the broker in this module, which
+needs no outside service:
+
+    python socketio_queue.py --port 5555
+    SOCKETIO_MESSAGE_QUEUE=local://127.0.0.1:5555 gunicorn ... app:app
+
+The broker relays length-prefixed frames between the connections
+subscribed to a channel.  Like python-socketio's Redis and Kombu
+managers, messages are pickled, so the broker binds to localhost by
+default and must not be exposed to untrusted networks.
+"""
+
+import argparse
+import json
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+DEFAULT_PORT = 5555
+_HEADER = struct.Struct("!I")
+MAX_FRAME = 16 * 1024 * 1024
+
+
+def write_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _read_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def read_frame(sock):
+    """Return the next frame's payload, or None when the peer disconnects."""
+    header = _read_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes exceeds the limit")
+    return _read_exact(sock, length)
+
+
+# ---------------------------------------------------------------------------
+# Broker
+# ---------------------------------------------------------------------------
+
+class _Subscriber:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, payload):
+        with self.lock:
+            write_frame(self.sock, payload)
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        broker = self.server.broker
+        try:
+            hello = json.loads(read_frame(self.request) or b"{}")
+        except ValueError:
+            return
+        channel = hello.get("channel", "socketio")
+        subscriber = _Subscriber(self.request) if hello.get("subscribe") else None
+        if subscriber:
+            broker.subscribe(channel, subscriber)
+        try:
+            while True:
+                try:
+                    payload = read_frame(self.request)
+                except (OSError, ValueError):
+                    break
+                if payload is None:
+                    break
+                broker.publish(channel, payload)
+        finally:
+            if subscriber:
+                broker.unsubscribe(channel, subscriber)
+
+
+class _BrokerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class LocalBroker:
+    """Minimal in-process pub/sub broker over TCP."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.server = _BrokerServer((host, port), _BrokerHandler)
+        self.server.broker = self
+        self.address = self.server.server_address
+        self._channels = {}  # channel -> set of _Subscriber
+        self._lock = threading.Lock()
+        self.published = 0
+
+    @property
+    def url(self):
+        return f"local://{self.address[0]}:{self.address[1]}"
+
+    def subscribe(self, channel, subscriber):
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscriber)
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            self._channels.get(channel, set()).discard(subscriber)
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.send(payload)
+            except OSError:
+                self.unsubscribe(channel, subscriber)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="socketio-broker", daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# Client manager
+# ---------------------------------------------------------------------------
+
+class LocalBrokerManager(socketio.PubSubManager):
+    """python-socketio client manager backed by a LocalBroker."""
+
+    name = "localbroker"
+
+    def __init__(self, url=f"local://127.0.0.1:{DEFAULT_PORT}", channel="flask-socketio",
+                 write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or "127.0.0.1", parsed.port or DEFAULT_PORT)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self, subscribe):
+        sock = socket.create_connection(self.address, timeout=5)
+        sock.settimeout(None)
+        write_frame(sock, json.dumps({"channel": self.channel, "subscribe": subscribe}).encode())
+        return sock
+
+    def _publish(self, data):
+        payload = pickle.dumps(data)
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect(subscribe=False)
+                    write_frame(self._publisher, payload)
+                    return
+                except OSError as e:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                        self._publisher = None
+                    if attempt:
+                        self._get_logger().error(f"Cannot publish to local broker: {e}")
+
+    def _listen(self):
+        backoff = 0.5
+        while True:
+            try:
+                sock = self._connect(subscribe=True)
+                backoff = 0.5
+                try:
+                    while True:
+                        payload = read_frame(sock)
+                        if payload is None:
+                            break
+                        yield payload
+                finally:
+                    sock.close()
+            except (OSError, ValueError) as e:
+                self._get_logger().error(f"Local broker connection failed: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 10)
+
+
+def socketio_options(message_queue, channel="flask-socketio"):
+    """Return SocketIO keyword arguments for a message-queue URL (or None)."""
+    if not message_queue:
+        return {}
+    if message_queue.startswith("local://"):
+        return {"client_manager": LocalBrokerManager(message_queue, channel=channel)}
+    return {"message_queue": message_queue, "channel": channel}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local Socket.IO message broker.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    broker = LocalBroker(args.host, args.port)
+    print(f"[Broker] Listening on {broker.url}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
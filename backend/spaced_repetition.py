@@ -0,0 +1,243 @@
+"""
+Server-side spaced-repetition scheduler.
+
+Implements the same SM-2 variant as the frontend's knowledge service, but
+keeps the schedule on the server so quiz outcomes can update it directly.
+Each user has a min-heap of (due day, concept) so "what should this user
+review next" is O(log n).  State is persisted as an append-only JSON-lines
+log that is compacted when it grows well past the live entry count.
+"""
+
+import heapq
+import json
+import math
+import os
+import threading
+from datetime import date, timedelta
+
+
+def concept_key(name):
+    """Normalize a concept name for use as a schedule key."""
+    return " ".join((name or "").lower().split())
+
+
+def mastery_to_quality(mastery):
+    """Map a 0-100 mastery score to an SM-2 recall quality (0-5)."""
+    if mastery >= 80:
+        return 5
+    if mastery >= 60:
+        return 4
+    if mastery >= 40:
+        return 3
+    if mastery >= 20:
+        return 2
+    return 1
+
+
+def schedule_entry(key, name, data):
+    """Build a schedule entry from imported or persisted SM-2 fields.
+
+    Raises KeyError, TypeError or ValueError when a date or number is
+    malformed, so bad input never reaches the heap or the log.
+    """
+    next_review = date.fromisoformat(data["nextReviewDate"][:10]).isoformat()
+    last_review = data.get("lastReviewDate") or ""
+    if last_review:
+        date.fromisoformat(last_review[:10])
+    numbers = [float(data.get(field, default)) for field, default in
+               (("easeFactor", 2.5), ("interval", 1), ("repetitions", 0), ("quality", 0))]
+    if not all(math.isfinite(n) for n in numbers):
+        raise ValueError("SM-2 fields must be finite numbers")
+    ease, interval, repetitions, quality = numbers
+    return {
+        "key": key,
+        "name": name,
+        "easeFactor": max(1.3, ease),
+        "interval": max(1, int(interval)),
+        "repetitions": max(0, int(repetitions)),
+        "quality": max(0, min(5, int(quality))),
+        "lastReviewDate": last_review,
+        "nextReviewDate": next_review,
+    }
+
+
+class ReviewScheduler:
+    """SM-2 scheduler with a per-user heap-backed due queue."""
+
+    def __init__(self, store_path=None):
+        self.store_path = store_path
+        self._entries = {}  # user_id -> {concept key -> entry}
+        self._queues = {}  # user_id -> heap of (due ordinal, seq, concept key)
+        self._seq = 0
+        self._log_lines = 0
+        self._lock = threading.Lock()
+        if store_path:
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not os.path.exists(self.store_path):
+            return
+        with open(self.store_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                # Counted even when skipped, so compaction drops bad lines
+                self._log_lines += 1
+                try:
+                    record = json.loads(line)
+                    entry = schedule_entry(record["key"], record["name"], record)
+                    self._put(record["user_id"], entry)
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    print(f"[Reviews] Skipping bad record in {self.store_path}: {e!r}")
+
+    def _append(self, user_id, entry):
+        if not self.store_path:
+            return
+        with open(self.store_path, "a") as f:
+            f.write(json.dumps({"user_id": user_id, **entry}) + "\n")
+        self._log_lines += 1
+        live = sum(len(e) for e in self._entries.values())
+        if self._log_lines > 2 * live + 100:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.store_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for user_id, entries in self._entries.items():
+                for entry in entries.values():
+                    f.write(json.dumps({"user_id": user_id, **entry}) + "\n")
+        os.replace(tmp_path, self.store_path)
+        self._log_lines = sum(len(e) for e in self._entries.values())
+
+    # ------------------------------------------------------------------
+    # Queue maintenance
+    # ------------------------------------------------------------------
+
+    def _put(self, user_id, entry):
+        """Store *entry* and push its due day onto the user's heap."""
+        due = date.fromisoformat(entry["nextReviewDate"]).toordinal()
+        self._seq += 1
+        entry["seq"] = self._seq
+        self._entries.setdefault(user_id, {})[entry["key"]] = entry
+        heap = self._queues.setdefault(user_id, [])
+        heapq.heappush(heap, (due, self._seq, entry["key"]))
+
+        # Superseded heap items are skipped lazily; rebuild once they dominate
+        if len(heap) > 2 * len(self._entries[user_id]) + 16:
+            self._queues[user_id] = [
+                (date.fromisoformat(e["nextReviewDate"]).toordinal(), e["seq"], k)
+                for k, e in self._entries[user_id].items()
+            ]
+            heapq.heapify(self._queues[user_id])
+
+    def _is_current(self, user_id, item):
+        entry = self._entries.get(user_id, {}).get(item[2])
+        return entry is not None and entry["seq"] == item[1]
+
+    # ------------------------------------------------------------------
+    # SM-2
+    # ------------------------------------------------------------------
+
+    def _apply_sm2(self, entry, quality, today):
+        # int(x + 0.5) rounds halves up, like Math.round in the frontend
+        quality = max(0, min(5, int(quality + 0.5)))
+        entry["quality"] = quality
+        entry["lastReviewDate"] = today.isoformat()
+
+        if quality >= 3:
+            if entry["repetitions"] == 0:
+                entry["interval"] = 1
+            elif entry["repetitions"] == 1:
+                entry["interval"] = 6
+            else:
+                entry["interval"] = int(entry["interval"] * entry["easeFactor"] + 0.5)
+            entry["repetitions"] += 1
+        else:
+            entry["repetitions"] = 0
+            entry["interval"] = 1
+
+        ease = entry["easeFactor"] + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        entry["easeFactor"] = max(1.3, round(ease, 4))
+        entry["nextReviewDate"] = (today + timedelta(days=entry["interval"])).isoformat()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def record(self, user_id, concept, quality, today=None):
+        """Record one recall outcome (quality 0-5) and reschedule the concept."""
+        today = today or date.today()
+        key = concept_key(concept)
+        if not key:
+            raise ValueError("concept is required")
+        with self._lock:
+            current = self._entries.get(user_id, {}).get(key)
+            entry = dict(current) if current else {
+                "key": key,
+                "name": concept.strip(),
+                "easeFactor": 2.5,
+                "interval": 1,
+                "repetitions": 0,
+            }
+            self._apply_sm2(entry, quality, today)
+            self._put(user_id, entry)
+            self._append(user_id, entry)
+            return dict(entry)
+
+    def next_due(self, user_id, limit=1, today=None):
+        """Return up to *limit* entries due on or before *today*, most overdue first."""
+        today = (today or date.today()).toordinal()
+        with self._lock:
+            heap = self._queues.get(user_id, [])
+            taken = []
+            while heap and len(taken) < limit:
+                item = heap[0]
+                if not self._is_current(user_id, item):
+                    heapq.heappop(heap)
+                    continue
+                if item[0] > today:
+                    break
+                taken.append(heapq.heappop(heap))
+            for item in taken:
+                heapq.heappush(heap, item)
+            return [dict(self._entries[user_id][item[2]]) for item in taken]
+
+    def entries(self, user_id):
+        """Return every scheduled entry for *user_id*."""
+        with self._lock:
+            return [dict(e) for e in self._entries.get(user_id, {}).values()]
+
+    def import_local_storage(self, user_id, concepts, sr_data):
+        """Bulk-import the frontend's localStorage concepts and SM-2 data.
+
+        Imported entries replace server entries only when they were reviewed
+        more recently.  Records with malformed dates or numbers are skipped.
+        Returns the number of entries imported.
+        """
+        names = {c.get("id"): c.get("name") for c in concepts or [] if isinstance(c, dict)}
+        imported = skipped = 0
+        with self._lock:
+            for sr in sr_data or []:
+                name = names.get(sr.get("conceptId")) if isinstance(sr, dict) else None
+                key = concept_key(name) if isinstance(name, str) else ""
+                if not key or not sr.get("nextReviewDate"):
+                    continue
+                try:
+                    entry = schedule_entry(key, name.strip(), sr)
+                except (KeyError, TypeError, ValueError):
+                    skipped += 1
+                    continue
+                current = self._entries.get(user_id, {}).get(key)
+                if current and current.get("lastReviewDate", "") >= entry["lastReviewDate"]:
+                    continue
+                self._put(user_id, entry)
+                self._append(user_id, entry)
+                imported += 1
+        if skipped:
+            print(f"[Reviews] Skipped {skipped} malformed records importing for {user_id}")
+        return imported
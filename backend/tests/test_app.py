@@ -46,3 +46,240 @@ def test_upload_pdf_success(client, mocker):
     assert 'session_id' in json_data
     assert json_data['filename'] == 'test.pdf'
     assert json_data['total_pages'] == 5
+
+def test_metrics_endpoint(client):
+    """Test that /metrics exposes per-route latency histograms in Prometheus format."""
+    client.post('/api/upload-pdf')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'learnaloud_http_request_duration_seconds_count{method="POST",route="/api/upload-pdf"}' in body
+    assert 'learnaloud_http_requests_total{method="POST",route="/api/upload-pdf",status="400"}' in body
+    assert 'learnaloud_sessions ' in body
+
+def test_admin_memory_requires_token(client):
+    """Test that /api/admin/memory is refused without the admin token."""
+    response = client.get('/api/admin/memory')
+    assert response.status_code == 403
+
+def _admin_client(tmp_path):
+    import app as app_module
+    new_app = app_module.create_app({
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "DATA_DIR": str(tmp_path / "data"),
+        "WARM_TOKEN_POOLS": False,
+        "ADMIN_TOKEN": "secret",
+    })
+    client = new_app.test_client()
+    client.environ_base["HTTP_X_ADMIN_TOKEN"] = "secret"
+    return client
+
+def test_admin_memory_rejects_bad_top(tmp_path):
+    """Test that a non-integer ?top= on /api/admin/memory is a 400, not a 500."""
+    client = _admin_client(tmp_path)
+    assert client.get('/api/admin/memory?top=abc').status_code == 400
+    assert client.get('/api/admin/memory?top=5').status_code == 200
+
+def test_admin_profiles_rejects_bad_filters(tmp_path):
+    """Test that non-numeric ?min_ms= or ?limit= on /api/admin/profiles is a 400."""
+    client = _admin_client(tmp_path)
+    assert client.get('/api/admin/profiles?min_ms=slow').status_code == 400
+    assert client.get('/api/admin/profiles?limit=all').status_code == 400
+    assert client.get('/api/admin/profiles?min_ms=2.5&limit=10').get_json() == {"profiles": []}
+
+def test_create_app_builds_services_lazily(tmp_path):
+    """Test that create_app() defers building agents until a request needs them."""
+    import app as app_module
+    new_app = app_module.create_app({
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "DATA_DIR": str(tmp_path / "data"),
+        "WARM_TOKEN_POOLS": False,
+    })
+    services = new_app.extensions["learnaloud"]
+    assert not services.is_built("librarian")
+    assert not services.is_built("pdf_processor")
+
+    response = new_app.test_client().get('/api/agents/mcp/tools')
+    assert response.status_code == 200
+    assert services.is_built("librarian")
+    # The default app keeps its own services and configuration
+    default = app_module.app.extensions["learnaloud"]
+    assert default is not services
+    assert default.config["UPLOAD_DIR"] != services.config["UPLOAD_DIR"]
+    assert app_module.librarian is default.librarian
+
+def test_upload_rejected_when_pdf_pool_is_busy(client, mocker):
+    """A saturated PDF worker pool answers 503 with Retry-After."""
+    from pdf_pool import PoolBusy
+    mocker.patch('app.pdf_processor.extract_structure', side_effect=PoolBusy("busy", 5))
+    data = {'file': (io.BytesIO(b"%PDF-1.4"), 'test.pdf')}
+    response = client.post('/api/upload-pdf', data=data, content_type='multipart/form-data')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+def test_debate_broker_over_socketio(mocker):
+    """A debate started over Socket.IO relays the next turn to its room when a speaker finishes."""
+    import app as app_module
+    mocker.patch.dict(app_module.sessions, {"s1": {"pdf_data": {}}})
+    mocker.patch("app.emit")
+    mocker.patch("app.join_room")
+    room_emit = mocker.patch.object(app_module.socketio, "emit")
+    # Flask-SocketIO runs handlers inside the app context
+    with app_module.app.app_context():
+        app_module.handle_debate_start({"session_id": "s1", "max_turns": 2})
+        name, relay = room_emit.call_args.args
+        assert name == "debate_relay" and relay["role"] == "author"
+        app_module.join_room.assert_called_once_with(relay["room"])
+
+        app_module.handle_debate_turn_end({"debate_id": relay["debate_id"], "role": "author", "text": "claims"})
+        name, relay = room_emit.call_args.args
+        assert relay["role"] == "reviewer" and "claims" in relay["message"]
+
+        app_module.handle_debate_turn_end({"debate_id": relay["debate_id"], "role": "reviewer", "text": "why?"})
+        assert room_emit.call_args.args[0] == "debate_finished"
+        assert room_emit.call_args.kwargs["to"] == relay["room"]
+
+def test_paper_context_reports_prompt_version(client, mocker):
+    """Contexts are rendered from the prompt registry and record the version used."""
+    import app as app_module
+    pdf_data = {"total_pages": 1, "pages": [{"page_num": 1, "width": 1, "height": 1, "blocks": [{"text": "Hello"}]}]}
+    session = {"pdf_data": pdf_data, "filename": "a.pdf", "outline": {}}
+    mocker.patch.dict(app_module.sessions, {"s1": session})
+    response = client.get('/api/paper-context/s1')
+    data = response.get_json()
+    assert "--- Page 1 ---\nHello\n" in data["context"]
+    assert data["prompt_versions"]["tutor_context"] == session["prompt_versions"]["tutor_context"]
+
+def test_quiz_context_is_pending_until_material_is_built(client, mocker):
+    """Quiz contexts are never built inline: missing material is queued and reported as pending."""
+    import app as app_module
+    pdf_data = {"total_pages": 1, "pages": [{"page_num": 1, "width": 1, "height": 1, "blocks": [{"text": "Hello"}]}]}
+    session = {"pdf_data": pdf_data, "filename": "a.pdf", "outline": {}, "quiz_active": True}
+    mocker.patch.dict(app_module.sessions, {"s1": session})
+    start = mocker.patch.object(app_module, "_start_background_task")
+
+    data = client.get('/api/paper-context/s1').get_json()
+    assert data["context_status"] == "pending" and data["context"] is None
+    assert data["filename"] == "a.pdf"
+    start.assert_called_once_with(app_module._prepare_quiz_material, "s1")
+    assert client.get('/api/quiz-context/s1').get_json()["context_status"] == "pending"
+
+    with app_module.app.app_context():
+        app_module._prepare_quiz_material("s1")
+    data = client.get('/api/quiz-context/s1').get_json()
+    assert data["context_status"] == "ready"
+    assert "a.pdf" in data["context"]
+    assert start.call_count == 2
+
+
+def test_quiz_start_is_pending_until_material_is_built(client, mocker):
+    """Quiz start queues missing material instead of building answer keys inline."""
+    import app as app_module
+    pdf_data = {"total_pages": 1, "pages": [{"page_num": 1, "width": 1, "height": 1, "blocks": [{"text": "Hello"}]}]}
+    session = {"pdf_data": pdf_data, "filename": "a.pdf", "outline": {}}
+    mocker.patch.dict(app_module.sessions, {"s1": session})
+    start = mocker.patch.object(app_module, "_start_background_task")
+
+    data = client.post('/api/quiz/start', json={"session_id": "s1"}).get_json()
+    assert data["status"] == "quiz_pending" and data["context_status"] == "pending"
+    start.assert_called_once_with(app_module._prepare_quiz_material, "s1")
+    assert not session.get("quiz_active")
+
+    with app_module.app.app_context():
+        app_module._prepare_quiz_material("s1")
+    data = client.post('/api/quiz/start', json={"session_id": "s1"}).get_json()
+    assert data["status"] == "quiz_started"
+    assert session["quiz_active"] and session["quiz_context"]
+    assert start.call_count == 1
+
+
+def test_library_search_endpoint(client, monkeypatch, tmp_path):
+    """/api/library/search returns ranked passages across ingested documents."""
+    import app as app_module
+    from library_index import LibraryIndex
+    index = LibraryIndex(str(tmp_path / "library.sqlite3"))
+    monkeypatch.setitem(app_module.app.extensions["learnaloud"].__dict__, "library_index", index)
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF")
+    index.add_document(str(pdf), {"total_pages": 1, "pages": [
+        {"page_num": 1, "blocks": [{"text": "Multi-head attention", "bbox": [1, 2, 3, 4]}]}]}, "a.pdf", "s1")
+
+    assert client.get('/api/library/search').status_code == 400
+    data = client.get('/api/library/search?q=attention').get_json()
+    assert data["count"] == 1
+    assert data["results"][0]["session_ids"] == ["s1"]
+
+
+def test_library_diff_endpoint(client, monkeypatch, tmp_path):
+    """/api/library/diff reports changed pages, and 400/404 for missing or unknown IDs."""
+    import app as app_module
+    from library_index import LibraryIndex
+    index = LibraryIndex(str(tmp_path / "library.sqlite3"))
+    monkeypatch.setitem(app_module.app.extensions["learnaloud"].__dict__, "library_index", index)
+    ids = []
+    for name, hashes in (("v1.pdf", ["a", "b"]), ("v2.pdf", ["a", "c"])):
+        pdf = tmp_path / name
+        pdf.write_bytes(name.encode())
+        pages = [{"page_num": i + 1, "blocks": [], "content_hash": h} for i, h in enumerate(hashes)]
+        ids.append(index.add_document(str(pdf), {"total_pages": 2, "pages": pages}, name)[0])
+
+    assert client.get(f'/api/library/diff?from={ids[0]}').status_code == 400
+    assert client.get(f'/api/library/diff?from={ids[0]}&to=nope').status_code == 404
+    data = client.get(f'/api/library/diff?from={ids[0]}&to={ids[1]}').get_json()
+    assert data["changed"] == [{"from": 2, "to": 2}]
+    assert data["unchanged"] == [{"from": 1, "to": 1}]
+
+
+def test_review_record_rejects_bad_scores(client, monkeypatch):
+    """Non-numeric or out-of-range quality and mastery values are a 400, not a 500."""
+    import app as app_module
+    from spaced_repetition import ReviewScheduler
+    monkeypatch.setitem(app_module.app.extensions["learnaloud"].__dict__, "review_scheduler", ReviewScheduler())
+    body = {"user_id": "u", "concept": "Attention"}
+
+    for score in ({"mastery": "abc"}, {"mastery": 250}, {"quality": "high"}, {"quality": -1}):
+        assert client.post('/api/review/record', json={**body, **score}).status_code == 400
+    assert client.post('/api/review/record', json={**body, "mastery": 85}).get_json()["quality"] == 5
+
+
+def test_librarian_details_rejects_bad_ids(client, monkeypatch):
+    """Non-string or blank ids are a 400 and never reach the librarian."""
+    import app as app_module
+
+    class Librarian:
+        def get_papers_details(self, ids):
+            raise AssertionError("librarian should not be called")
+
+    monkeypatch.setitem(app_module.app.extensions["learnaloud"].__dict__, "librarian", Librarian())
+    for ids in ([1706.03762], ["2301.00001", ""], [None], [" "]):
+        assert client.post('/api/agents/librarian/details', json={"ids": ids}).status_code == 400
+
+
+def test_debate_tokens_share_one_executor(client, monkeypatch, mocker):
+    """Both debate tokens are minted on the services' executor, not a per-request pool."""
+    from concurrent.futures import ThreadPoolExecutor
+    import app as app_module
+    services = app_module.app.extensions["learnaloud"]
+
+    class Pool:
+        def __init__(self, name):
+            self.name = name
+
+        def acquire(self, participant):
+            return {"token": f"{self.name}:{participant}"}, "hit"
+
+    monkeypatch.setitem(services.config, "VOCAL_BRIDGE_AUTHOR_API_KEY", "a")
+    monkeypatch.setitem(services.config, "VOCAL_BRIDGE_REVIEWER_API_KEY", "r")
+    monkeypatch.setitem(services.__dict__, "token_pools", {"author": Pool("author"), "reviewer": Pool("reviewer")})
+    executor = ThreadPoolExecutor(max_workers=2)
+    submit = mocker.spy(executor, "submit")
+    monkeypatch.setitem(services.__dict__, "token_executor", executor)
+
+    for _ in range(2):
+        data = client.post('/api/debate-tokens', json={"participant": "s"}).get_json()
+        assert data == {"author": {"token": "author:s-author"}, "reviewer": {"token": "reviewer:s-reviewer"}}
+    assert submit.call_count == 4
+    executor.shutdown()
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+
+import pytest
+
+from cache import TTLCache, normalize_arxiv_id, normalize_query
+from agents import Librarian
+
+ATOM_ONE_PAPER = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/1706.03762v5</id>
+    <published>2017-06-12T17:57:34Z</published>
+    <title>Attention Is All You Need</title>
+    <summary>The dominant sequence transduction models...</summary>
+    <author><name>Ashish Vaswani</name></author>
+    <link title="pdf" href="http://arxiv.org/pdf/1706.03762v5"/>
+  </entry>
+</feed>"""
+
+
+def test_normalize_keys():
+    """Queries and IDs that differ only cosmetically share a cache key."""
+    assert normalize_query("  Attention   IS all you need ") == "attention is all you need"
+    assert normalize_arxiv_id("arXiv:1706.03762v5") == "1706.03762v5"
+    assert normalize_arxiv_id("https://arxiv.org/pdf/1706.03762.pdf") == "1706.03762"
+
+
+def test_lru_eviction_and_ttl():
+    """Entries are evicted least-recently-used first and expire after their TTL."""
+    cache = TTLCache("test", max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("short", "x", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Values written to the disk tier are visible to a fresh cache."""
+    TTLCache("test", disk_dir=str(tmp_path)).set("k", {"v": 1})
+    cache = TTLCache("test", disk_dir=str(tmp_path))
+    value, status = cache.get_or_load("k", lambda: pytest.fail("loader should not run"))
+    assert value == {"v": 1}
+    assert status == "hit"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used_past_budget(tmp_path):
+    """Writes past max_disk_bytes evict the files read or written longest ago."""
+    cache = TTLCache("test", ttl=0, disk_dir=str(tmp_path), max_disk_bytes=2000)
+    for i in range(8):
+        cache.set(f"k{i}", "x" * 100)
+        os.utime(cache._disk_path(f"k{i}"), (1000 + i, 1000 + i))
+    cache.clear()
+    assert cache.get("k0") == "x" * 100  # a disk read makes k0 the most recent
+
+    for i in range(8, 16):
+        cache.set(f"k{i}", "x" * 100)
+
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 2000
+    assert os.path.exists(cache._disk_path("k0"))
+    assert not os.path.exists(cache._disk_path("k1"))
+    assert cache.stats()["disk_evictions"] > 0
+
+
+def test_single_flight_coalesces_concurrent_loads():
+    """Concurrent loads of one key call the loader once and share the result."""
+    cache = TTLCache("test")
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(value == "value" for value, _ in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+
+
+def test_librarian_search_is_cached(mocker, tmp_path):
+    """A repeated search is answered from cache and reports its hit rate."""
+    response = mocker.Mock(text=ATOM_ONE_PAPER)
+    get = mocker.patch("resilience.requests.get", return_value=response)
+    librarian = Librarian(str(tmp_path), pdf_processor=None)
+
+    papers, info = librarian.search("Attention is all you need")
+    assert info["cache"]["status"] == "miss"
+    papers_again, info = librarian.search("  attention IS all you need")
+
+    assert get.call_count == 1
+    assert papers_again == papers
+    assert info["cache"]["status"] == "hit"
+    assert info["cache"]["hit_rate"] == 0.5
+
+
+def test_download_paper_reuses_library_entry(mocker, tmp_path):
+    """Repeat downloads of one arXiv ID reuse the stored PDF and extraction."""
+    processor = mocker.Mock()
+    processor.extract_structure.return_value = {"pages": [], "total_pages": 3}
+    processor.build_outline.return_value = {"sections": []}
+    get = mocker.patch(
+        "resilience.requests.get", return_value=mocker.Mock(content=b"%PDF-1.5")
+    )
+    librarian = Librarian(str(tmp_path), processor)
+
+    first = librarian.download_paper("1706.03762v5")
+    second = librarian.download_paper("arXiv:1706.03762v5")
+
+    assert get.call_count == 1
+    assert processor.extract_structure.call_count == 1
+    assert first["session_id"] != second["session_id"]
+    assert first["filepath"] == second["filepath"]
+    assert second["pdf_data"] is first["pdf_data"]
+    assert (first["cached"], second["cached"]) == (False, True)
+
+
+def test_refreshed_unversioned_paper_keeps_the_old_file(mocker, tmp_path):
+    """A refetch that returns a new version is stored beside the old file, not over it."""
+    processor = mocker.Mock()
+    processor.extract_structure.return_value = {"pages": [], "total_pages": 3}
+    processor.build_outline.return_value = {"sections": []}
+    mocker.patch("resilience.requests.get", side_effect=[
+        mocker.Mock(content=b"%PDF-1.5 version 1"), mocker.Mock(content=b"%PDF-1.5 version 2"),
+    ])
+    librarian = Librarian(str(tmp_path), processor)
+
+    first = librarian.download_paper("1706.03762")
+    librarian.paper_library.invalidate("1706.03762")  # as if its refresh TTL had passed
+    second = librarian.download_paper("1706.03762")
+
+    assert first["filepath"] != second["filepath"]
+    with open(first["filepath"], "rb") as f:
+        assert f.read() == b"%PDF-1.5 version 1"
+
+
+def _atom_feed(ids):
+    entries = "".join(
+        f"<entry><id>http://arxiv.org/abs/{i}v1</id><title>Paper {i}</title></entry>" for i in ids
+    )
+    return f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'
+
+
+def test_get_papers_details_batches_ids(mocker, tmp_path):
+    """Many IDs are fetched in a few id_list batches and then served from cache."""
+    def fake_get(url, params, timeout):
+        ids = params["id_list"].split(",")
+        return mocker.Mock(text=_atom_feed(i for i in ids if i != "9999.99999"))
+
+    get = mocker.patch("resilience.requests.get", side_effect=fake_get)
+    librarian = Librarian(str(tmp_path), pdf_processor=None)
+    ids = [f"2101.{n:05d}" for n in range(59)] + ["9999.99999"]
+
+    papers, info = librarian.get_papers_details(ids)
+
+    assert get.call_count == 3
+    assert info["requests"] == 3
+    assert len(papers) == 59
+    assert papers["2101.00007"]["arxiv_id"] == "2101.00007v1"
+    assert info["missing"] == ["9999.99999"]
+
+    _, info = librarian.get_papers_details(ids[:10] + ["9999.99999"])
+    assert get.call_count == 3
+    assert info["requests"] == 0
+
+
+def test_get_or_load_recovers_from_an_interrupted_load():
+    """A load killed by a BaseException caches nothing and leaves no stuck flight behind."""
+    class Interrupted(BaseException):
+        pass
+
+    def interrupted():
+        raise Interrupted()
+
+    cache = TTLCache("test")
+    with pytest.raises(Interrupted):
+        cache.get_or_load("k", interrupted)
+    assert cache.get_or_load("k", lambda: "value") == ("value", "miss")
+    assert cache.get_or_load("k", lambda: "unused") == ("value", "hit")
@@ -0,0 +1,74 @@
+import pytest
+
+from debate import AUTHOR, REVIEWER, DebateBroker, DebateError
+
+
+def test_turns_alternate_and_relay_the_other_sides_history():
+    """Each finished turn produces the next relay, built from the other speaker's history."""
+    broker = DebateBroker(max_turns=4)
+    debate, relay = broker.start("s1")
+    assert (relay["turn"], relay["role"]) == (1, AUTHOR)
+    assert relay["room"] == f"debate:{debate.id}"
+
+    relay = broker.end_turn(debate.id, AUTHOR, "Our model beats the baseline.")
+    assert (relay["turn"], relay["role"]) == (2, REVIEWER)
+    assert relay["message"].startswith("[AUTHOR'S CLAIMS] [AUTHOR] Our model beats the baseline.")
+
+    relay = broker.end_turn(debate.id, REVIEWER, "How was the baseline tuned?")
+    assert relay["role"] == AUTHOR
+    assert "[REVIEWER CRITIQUE] [REVIEWER] How was the baseline tuned?" in relay["message"]
+
+
+def test_turn_budget_finishes_the_debate():
+    """Once max_turns turns have been spoken, no further relay is produced."""
+    broker = DebateBroker()
+    debate, _ = broker.start("s1", max_turns=2)
+    assert broker.end_turn(debate.id, AUTHOR, "claims") is not None
+    assert broker.end_turn(debate.id, REVIEWER, "questions") is None
+    assert broker.get(debate.id)["finished"]
+    with pytest.raises(DebateError):
+        broker.end_turn(debate.id, AUTHOR, "more")
+
+
+def test_out_of_turn_and_requested_turns():
+    """Turn ends from the wrong speaker are rejected; a requested role jumps the alternation."""
+    broker = DebateBroker()
+    debate, _ = broker.start("s1")
+    with pytest.raises(DebateError):
+        broker.end_turn(debate.id, REVIEWER, "not my turn")
+
+    broker.request_turn(debate.id, AUTHOR)
+    relay = broker.end_turn(debate.id, AUTHOR, "first")
+    assert relay["role"] == AUTHOR
+
+
+def test_timestamps_and_expiry():
+    """Turns record relay/start/end times; an expired turn hands over exactly once."""
+    broker = DebateBroker()
+    debate, relay = broker.start("s1")
+    assert broker.turn_started(debate.id, 1)
+    assert not broker.turn_started(debate.id, 1)
+
+    nxt = broker.expire_turn(debate.id, 1)
+    assert nxt["role"] == REVIEWER
+    assert broker.expire_turn(debate.id, 1) is False
+
+    first = broker.get(debate.id)["turns"][0]
+    assert first["relayed_at"] <= first["started_at"] <= first["ended_at"]
+
+
+def test_expired_turn_keeps_reported_text():
+    """A turn cut off by its time budget keeps the partial text and is marked expired."""
+    broker = DebateBroker()
+    debate, _ = broker.start("s1")
+    assert broker.report_text(debate.id, 1, "Our model beats")
+    assert not broker.report_text(debate.id, 2, "wrong turn")
+
+    relay = broker.expire_turn(debate.id, 1)
+    assert "[AUTHOR] Our model beats" in relay["message"]
+    first = broker.get(debate.id)["turns"][0]
+    assert (first["text"], first["expired"]) == ("Our model beats", True)
+    assert not broker.report_text(debate.id, 1, "too late")
+
+    broker.end_turn(debate.id, REVIEWER, "Beats what?")
+    assert broker.get(debate.id)["turns"][1]["expired"] is False
@@ -0,0 +1,54 @@
+import random
+import time
+
+from agents import Navigator
+from agents.fuzzy_match import TrigramIndex, normalize_spoken
+
+from test_navigator import REFERENCES, _pdf
+
+
+def test_normalize_spoken_queries():
+    """Spelled-out years, reference numbers and "et al" variants are normalized."""
+    assert normalize_spoken("Vaswani et all twenty seventeen") == "vaswani et al 2017"
+    assert normalize_spoken("He and al. two thousand and sixteen") == "he et al 2016"
+    assert normalize_spoken("nineteen ninety eight") == "1998"
+    assert normalize_spoken("reference six") == "reference 6"
+    assert normalize_spoken("one shot learning") == "one shot learning"
+
+
+def test_find_citation_fuzzy_match():
+    """Transcribed queries with misspellings resolve to the right entry."""
+    navigator = Navigator()
+    pdf_data = _pdf(REFERENCES)
+
+    result = navigator.find_citation(pdf_data, "Vaswany et al twenty seventeen")
+    assert result["found"] is True
+    assert result["number"] == 1
+    assert result["match"] == "fuzzy"
+    assert 0.5 <= result["confidence"] < 1
+    assert result["candidates"][0]["number"] == 1
+
+    assert navigator.find_citation(pdf_data, "reference three")["number"] == 3
+    result = navigator.find_citation(pdf_data, "paper two")
+    assert (result["number"], result["match"]) == (2, "number")
+    assert navigator.find_citation(pdf_data, "quantum chromodynamics")["found"] is False
+
+
+def test_trigram_search_is_fast_on_large_bibliographies():
+    """Queries over 200 entries stay well under a millisecond on average."""
+    rng = random.Random(0)
+    words = ["neural", "learning", "attention", "graph", "transformer", "vision",
+             "language", "model", "residual", "deep", "network", "training"]
+    texts = [
+        f"A. Author{n}, B. Writer{n}. {' '.join(rng.sample(words, 5))}. In Conf, {2000 + n % 24}."
+        for n in range(200)
+    ]
+    index = TrigramIndex(texts)
+
+    start = time.perf_counter()
+    for _ in range(200):
+        index.search("author42 writer42 attention graph 2018", k=5)
+    per_query = (time.perf_counter() - start) / 200
+
+    assert index.search("author42 writer42", k=1)[0][0] == 42
+    assert per_query < 0.001
@@ -0,0 +1,97 @@
+import pytest
+
+from library_index import LibraryIndex, fts5_available, passages
+
+
+def _pdf(*pages):
+    return {"total_pages": len(pages), "pages": [
+        {"page_num": i + 1, "blocks": [{"text": t, "bbox": [10, 10 + 20 * j, 200, 25 + 20 * j]} for j, t in enumerate(texts)]}
+        for i, texts in enumerate(pages)
+    ]}
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "fallback"])
+def index(request, tmp_path):
+    if request.param and not fts5_available():
+        pytest.skip("SQLite built without FTS5")
+    idx = LibraryIndex(str(tmp_path / "library.sqlite3"), use_fts=request.param)
+    yield idx
+    idx.close()
+
+
+def test_search_returns_ranked_passages_with_location(index, tmp_path):
+    """Matches carry the document, page, bbox and the sessions that ingested it."""
+    attention = _write(tmp_path, "a.pdf", b"%PDF attention")
+    resnet = _write(tmp_path, "b.pdf", b"%PDF resnet")
+    index.add_document(attention, _pdf(["Intro"], ["Scaled dot-product attention", "uses softmax"]), "attention.pdf", "s1")
+    index.add_document(resnet, _pdf(["Residual connections ease training"]), "resnet.pdf", "s2", source="arxiv",
+                       arxiv_id="1512.03385")
+
+    results = index.search("attention softmax")
+    assert results[0]["filename"] == "attention.pdf"
+    assert results[0]["page"] == 2
+    assert results[0]["bbox"] == [10.0, 10.0, 200.0, 45.0]
+    assert results[0]["session_ids"] == ["s1"]
+
+    # No passage has both words, so passages with either are returned
+    either = {r["filename"] for r in index.search("residual attention")}
+    assert either == {"attention.pdf", "resnet.pdf"}
+    assert index.search("   ") == []
+
+
+def test_documents_are_deduplicated_by_content_hash(index, tmp_path):
+    """Re-ingesting identical bytes links the new session instead of re-indexing."""
+    first = _write(tmp_path, "one.pdf", b"%PDF same bytes")
+    second = _write(tmp_path, "two.pdf", b"%PDF same bytes")
+    doc_id, added = index.add_document(first, _pdf(["transformer"]), "one.pdf", "s1")
+    again, added_again = index.add_document(second, _pdf(["transformer"]), "two.pdf", "s2")
+
+    assert added and not added_again and again == doc_id
+    assert len(index.search("transformer")) == 1
+    assert index.documents()[0]["session_ids"] == ["s1", "s2"]
+
+
+def test_index_persists_across_reopen(tmp_path):
+    """The index lives on disk and survives a restart."""
+    db = str(tmp_path / "library.sqlite3")
+    idx = LibraryIndex(db)
+    idx.add_document(_write(tmp_path, "a.pdf", b"x"), _pdf(["gradient descent"]), "a.pdf", "s1")
+    idx.close()
+    assert LibraryIndex(db).search("gradient")[0]["filename"] == "a.pdf"
+
+
+def test_passages_group_blocks_per_page():
+    """Blocks are merged into passages that never cross a page boundary."""
+    found = list(passages(_pdf(["a" * 300, "b" * 300, "c"], ["d"]), max_chars=400))
+    assert [(page, len(text)) for page, text, _ in found] == [(1, 601), (1, 1), (2, 1)]
+
+
+def test_diff_aligns_pages_by_content_hash(index, tmp_path):
+    """An inserted page shifts the numbering without marking later pages as changed."""
+    def versioned(name, hashes):
+        data = _pdf(*[[h] for h in hashes])
+        for page, h in zip(data["pages"], hashes):
+            page["content_hash"] = h
+        return index.add_document(_write(tmp_path, name, name.encode()), data, "paper.pdf")[0]
+
+    old = versioned("v1.pdf", ["a", "b", "c", "d"])
+    new = versioned("v2.pdf", ["a", "b2", "new", "c"])
+
+    diff = index.diff(old, new)
+    assert diff["unchanged"] == [{"from": 1, "to": 1}, {"from": 3, "to": 4}]
+    assert diff["changed"] == [{"from": 2, "to": 2}]
+    assert diff["added"] == [3]
+    assert diff["removed"] == [4]
+    assert (diff["from_pages"], diff["to_pages"]) == (4, 4)
+
+    with pytest.raises(KeyError):
+        index.diff(old, "missing")
+    unhashed = index.add_document(_write(tmp_path, "v0.pdf", b"v0"), _pdf(["a"]), "paper.pdf")[0]
+    with pytest.raises(ValueError):
+        index.diff(unhashed, new)
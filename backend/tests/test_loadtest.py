@@ -0,0 +1,52 @@
+import pytest
+
+from agents import Librarian
+from loadtest.harness import Recorder, percentile
+from loadtest.stubs import ArxivStub, VocalBridgeStub
+from pdf_processor import PDFProcessor
+from vocal_bridge import VocalBridgeClient
+
+
+@pytest.fixture
+def arxiv_stub():
+    stub = ArxivStub().start()
+    yield stub
+    stub.stop()
+
+
+def test_stubs_serve_real_clients(arxiv_stub, tmp_path):
+    """The ArXiv and Vocal Bridge stubs speak the protocols the real clients expect."""
+    librarian = Librarian(str(tmp_path), PDFProcessor(), api_url=arxiv_stub.api_url, pdf_url=arxiv_stub.pdf_url)
+    librarian.mcp = None
+
+    papers, _ = librarian.search("deep residual learning", max_results=3)
+    details, _ = librarian.get_papers_details(["1706.03762"])
+    download = librarian.download_paper("1706.03762")
+
+    assert papers[0]["title"] == "deep residual learning"
+    assert details["1706.03762"]["arxiv_id"].startswith("1706.03762")
+    assert download["total_pages"] >= 2
+    assert any("References" in b["text"] for p in download["pdf_data"]["pages"] for b in p["blocks"])
+
+    vocal_stub = VocalBridgeStub().start()
+    try:
+        token = VocalBridgeClient("key", base_url=vocal_stub.api_url).get_token("student")
+    finally:
+        vocal_stub.stop()
+    assert token["participant_name"] == "student"
+    assert token["token"].count(".") == 2
+
+
+def test_recorder_reports_percentiles_and_errors():
+    """Per-step reports include counts, errors and nearest-rank percentiles."""
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 99) == 99
+
+    recorder = Recorder()
+    recorder.timed("ok", lambda: None)
+    with pytest.raises(ZeroDivisionError):
+        recorder.timed("boom", lambda: 1 / 0)
+
+    steps = {row["step"]: row for row in recorder.report(elapsed=1.0)["steps"]}
+    assert steps["ok"]["count"] == 1 and steps["ok"]["errors"] == 0
+    assert steps["boom"]["errors"] == 1
@@ -0,0 +1,95 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from agents.mcp_client import MCPClient
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+        self.dropped = None  # exception raised once the transport is gone
+
+    async def call_tool(self, name, arguments):
+        if self.dropped:
+            raise self.dropped
+        self.calls.append((name, arguments))
+        return {"tool": name, "arguments": arguments}
+
+    async def list_tools(self):
+        if self.dropped:
+            raise self.dropped
+        self.calls.append(("list_tools", None))
+        return SimpleNamespace(tools=[SimpleNamespace(name="search_papers", description="")])
+
+
+class FakeMCPClient(MCPClient):
+    def __init__(self, fail=False, **kwargs):
+        super().__init__("http://mcp.invalid/sse", **kwargs)
+        self.fail = fail
+        self.opened = 0
+        self.session = FakeSession()
+
+    @asynccontextmanager
+    async def _open_session(self):
+        self.opened += 1
+        if self.fail:
+            raise ConnectionError("refused")
+        if self.session.dropped:
+            self.session = FakeSession()
+        yield self.session
+
+
+def test_session_is_reused_across_calls():
+    """Tool calls share one connection and list_tools is cached."""
+    client = FakeMCPClient()
+    try:
+        assert client.call_tool("search_papers", {"query": "a"})["tool"] == "search_papers"
+        client.call_tool("search_papers", {"query": "b"})
+        client.list_tools()
+        client.list_tools()
+    finally:
+        client.close()
+
+    assert client.opened == 1
+    assert [c[0] for c in client.session.calls] == ["search_papers", "search_papers", "list_tools"]
+
+
+def test_failed_connect_backs_off():
+    """After a failed connect, calls fail fast until the backoff expires."""
+    client = FakeMCPClient(fail=True, min_backoff=60)
+    try:
+        with pytest.raises(ConnectionError, match="refused"):
+            client.call_tool("search_papers", {})
+        with pytest.raises(ConnectionError, match="retrying"):
+            client.call_tool("search_papers", {})
+    finally:
+        client.close()
+
+    assert client.opened == 1
+    assert client.status()["failures"] == 1
+
+
+def _closed_resource():
+    return pytest.importorskip("anyio").ClosedResourceError()
+
+
+@pytest.mark.parametrize("dropped", [lambda: EOFError(), _closed_resource], ids=["eof", "anyio_closed"])
+def test_dropped_transport_reconnects(dropped):
+    """A transport closed mid-session is replaced, and the cached tool list is refreshed."""
+    client = FakeMCPClient()
+    try:
+        client.list_tools()
+        first = client.session
+        first.dropped = dropped()
+
+        assert client.call_tool("search_papers", {"query": "a"})["tool"] == "search_papers"
+        assert client._tools is None
+        client.list_tools()
+    finally:
+        client.close()
+
+    assert client.opened == 2
+    assert client.session is not first
+    assert [c[0] for c in client.session.calls] == ["search_papers", "list_tools"]
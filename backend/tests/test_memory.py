@@ -0,0 +1,54 @@
+import sys
+
+from memory import MemoryTracker, deep_sizeof, session_report
+
+
+def _pdf(words):
+    return {"pages": [{"page_num": 1, "blocks": [{"text": " ".join(words), "bbox": [0, 0, 1, 1]}]}]}
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    """Everything reachable is counted, and a shared *seen* set deduplicates across calls."""
+    text = "x" * 10000
+    data = {"a": [text, text], "b": (text,)}
+
+    size = deep_sizeof(data)
+    assert size >= sys.getsizeof(text) + sys.getsizeof(data)
+    assert size < 2 * sys.getsizeof(text)
+
+    seen = set()
+    deep_sizeof(data, seen)
+    assert deep_sizeof([text], seen) == sys.getsizeof([text])
+
+
+def test_session_report_ranks_sessions_and_structures():
+    """Sessions are ranked by size, structures totalled, and shared documents reported."""
+    big = _pdf(["word"] * 5000)
+    small = _pdf(["word"] * 10)
+    sessions = {
+        "big": {"pdf_data": big, "filename": "big.pdf", "outline": {"sections": []}},
+        "copy": {"pdf_data": big, "filename": "big.pdf"},
+        "small": {"pdf_data": small, "filename": "small.pdf"},
+    }
+
+    report = session_report(sessions, lambda sid, s: {"quiz_state": {"asked": 1}}, top=2)
+
+    assert report["sessions"] == 3
+    assert [r["session_id"] for r in report["top_sessions"]] == ["big", "copy"]
+    assert set(report["by_structure"]) == {"pdf_data", "filename", "outline", "quiz_state"}
+    assert report["shared_bytes"] >= deep_sizeof(big) - 1000
+    assert report["total_bytes"] < sum(deep_sizeof(s) for s in sessions.values())
+
+
+def test_tracemalloc_diff_between_calls():
+    """The first call records a baseline; later calls report allocation growth."""
+    tracker = MemoryTracker()
+    try:
+        assert tracker.diff()["baseline"] is True
+        retained = [bytearray(1024) for _ in range(200)]
+        result = tracker.diff(top=5)
+        assert result["top_diffs"]
+        assert sum(d["size_diff"] for d in result["top_diffs"]) > 100000
+    finally:
+        tracker.stop()
+    assert retained
@@ -0,0 +1,47 @@
+import pytest
+
+from metrics import Counter, Gauge, Histogram, _registry
+
+
+@pytest.fixture
+def metric_names():
+    before = len(_registry)
+    yield
+    del _registry[before:]
+
+
+def test_histogram_renders_cumulative_buckets(metric_names):
+    """Histogram buckets are cumulative and labelled, ending with +Inf, _sum and _count."""
+    hist = Histogram("test_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, route="/a")
+    hist.observe(0.5, route="/a")
+    hist.observe(5, route="/a")
+
+    lines = hist.render()
+
+    assert lines[:2] == ["# HELP test_seconds Test latency.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+    assert 'test_seconds_sum{route="/a"} 5.55' in lines
+
+
+def test_timer_decorator_and_gauge_callbacks(metric_names):
+    """Decorated functions are timed per call; gauges can be read at scrape time."""
+    hist = Histogram("test_stage_seconds", "Stage latency.", ("stage",))
+
+    @hist.time(stage="work")
+    def work(x):
+        return x * 2
+
+    assert work(2) == 4 and work(3) == 6
+    assert 'test_stage_seconds_count{stage="work"} 2' in hist.render()
+
+    gauge = Gauge("test_sessions", "Sessions.")
+    gauge.set_function(lambda: 7)
+    counter = Counter("test_total", "Things.", ("kind",))
+    counter.inc(kind='a"b')
+
+    assert "test_sessions 7" in gauge.render()
+    assert 'test_total{kind="a\\"b"} 1' in counter.render()
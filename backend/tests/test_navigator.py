@@ -0,0 +1,71 @@
+from agents import Navigator
+
+
+def _pdf(entries, body=()):
+    body_page = {"page_num": 1, "blocks": [{"text": t, "bbox": [0, 0, 10, 10]} for t in body]}
+    blocks = [{"text": "References", "bbox": [0, 0, 10, 10]}]
+    blocks += [{"text": e, "bbox": [0, 10 * i, 10, 10 * i + 5]} for i, e in enumerate(entries, 1)]
+    return {"pages": [body_page, {"page_num": 2, "blocks": blocks}], "total_pages": 2}
+
+
+REFERENCES = [
+    "[1] A. Vaswani, N. Shazeer. Attention is all you need. In NeurIPS, 2017.",
+    "[2] K. He, X. Zhang. Deep residual learning for image recognition. In CVPR, 2016.",
+    "[3] J. Devlin, M. Chang. BERT: Pre-training of deep bidirectional transformers. 2019.",
+]
+
+
+def test_find_citation_by_number_and_text():
+    """Citations are found by number and by words from the entry."""
+    navigator = Navigator()
+    pdf_data = _pdf(REFERENCES)
+
+    assert navigator.find_citation(pdf_data, "[2]")["page"] == 2
+    assert navigator.find_citation(pdf_data, "He 2016")["number"] == 2
+    assert navigator.find_citation(pdf_data, "bert devlin")["number"] == 3
+    assert navigator.find_citation(pdf_data, "7")["found"] is False
+    assert navigator.find_citation(pdf_data, "Smith 2020")["found"] is False
+
+
+def test_find_citation_matches_substrings_before_words():
+    """A verbatim fragment, even of a partial word, is an exact match as before the token index."""
+    navigator = Navigator()
+    pdf_data = _pdf(REFERENCES)
+
+    result = navigator.find_citation(pdf_data, "Vasw")
+    assert (result["number"], result["match"]) == (1, "exact")
+    assert navigator.find_citation(pdf_data, "residual learn")["match"] == "exact"
+    assert navigator.find_citation(pdf_data, "Devlin 2019")["number"] == 3
+
+
+def test_reference_index_is_built_once_per_document(mocker):
+    """The bibliography is parsed once per document and rebuilt when it changes."""
+    navigator = Navigator()
+    parse = mocker.spy(navigator, "_parse_references")
+    pdf_data = _pdf(REFERENCES)
+
+    navigator.list_references(pdf_data)
+    navigator.find_citation(pdf_data, "1")
+    navigator.find_citation(pdf_data, "residual")
+    assert parse.call_count == 1
+
+    navigator.find_citation(_pdf(REFERENCES[:1]), "1")
+    assert parse.call_count == 2
+
+
+def test_citation_graph_links_markers_both_ways():
+    """Numeric and author-year markers link to entries, and back."""
+    navigator = Navigator()
+    body = [
+        "Transformers [1, 2-3] replaced recurrence.",
+        "As Devlin et al. (2019) showed, pre-training helps [3].",
+        "Table (2019) and Figure (2021) are not citations.",
+    ]
+    graph = navigator.citation_graph(_pdf(REFERENCES, body))
+
+    assert [o["page"] for o in graph.occurrences_of(3)] == [1, 1, 1]
+    assert [o["marker"] for o in graph.occurrences_of(1)] == ["[1, 2-3]"]
+    occ = graph.occurrences_of(2)[0]
+    assert graph.occurrence(occ["id"])["references"] == [1, 2, 3]
+    author_year = [o for o in graph.occurrences if o["kind"] == "author_year"]
+    assert [o["references"] for o in author_year] == [[3]]
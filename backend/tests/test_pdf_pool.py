@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from eventlet import patcher
+
+from pdf_pool import PDFWorkPool, PoolBusy
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Jobs run on native threads once another test has imported app (and so
+# monkey-patched threading); they must block on an unpatched Event.
+native_threading = patcher.original("threading")
+
+
+def test_run_returns_result_and_propagates_errors():
+    """Jobs return their value; exceptions raised by a job reach the caller."""
+    pool = PDFWorkPool(max_workers=1, max_queue=1, timeout=5)
+    assert pool.run("test", lambda a, b: a + b, 2, 3) == 5
+    with pytest.raises(ValueError):
+        pool.run("test", lambda: int("x"))
+    assert pool.status()["running"] == 0
+
+
+def test_saturated_pool_rejects_immediately():
+    """With every worker busy and the queue full, new jobs fail fast with PoolBusy."""
+    pool = PDFWorkPool(max_workers=1, max_queue=1, timeout=5, retry_after=7)
+    release = native_threading.Event()
+    threads = [threading.Thread(target=pool.run, args=("test", release.wait)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    while pool.status()["queued"] + pool.status()["running"] < 2:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    with pytest.raises(PoolBusy) as exc:
+        pool.run("test", lambda: None)
+    assert time.perf_counter() - start < 0.5
+    assert exc.value.retry_after == 7
+
+    release.set()
+    for t in threads:
+        t.join()
+    assert pool.run("test", lambda: "ok") == "ok"
+
+
+def test_slow_job_times_out_but_keeps_its_slot():
+    """A job past the timeout raises PoolBusy; its worker slot is freed only when it ends."""
+    pool = PDFWorkPool(max_workers=1, max_queue=0, timeout=0.1)
+    release = native_threading.Event()
+    with pytest.raises(PoolBusy):
+        pool.run("test", release.wait)
+    assert pool.status()["running"] == 1
+    release.set()
+    while pool.status()["running"]:
+        time.sleep(0.01)
+
+
+def test_hub_stays_responsive_during_cpu_bound_job():
+    """Under eventlet, greenlets keep running while a pool job burns CPU."""
+    script = """
+import eventlet
+eventlet.monkey_patch()
+import time
+from pdf_pool import PDFWorkPool
+
+ticks = []
+def ticker():
+    while True:
+        ticks.append(time.perf_counter())
+        eventlet.sleep(0.01)
+
+def burn():
+    end = time.perf_counter() + 0.5
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+eventlet.spawn(ticker)
+eventlet.sleep(0)
+PDFWorkPool(max_workers=1).run("test", burn)
+print(len(ticks))
+"""
+    out = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True,
+                         text=True, timeout=60, check=True)
+    assert int(out.stdout.strip().splitlines()[-1]) >= 10
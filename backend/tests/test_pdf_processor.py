@@ -0,0 +1,49 @@
+import fitz
+import pytest
+
+from cache import TTLCache
+from pdf_processor import PDFProcessor
+
+
+def _write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_text((72, 72), text, fontsize=12)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def processor(tmp_path):
+    return PDFProcessor(page_cache=TTLCache("pdf_pages", ttl=0, disk_dir=str(tmp_path / "pages")))
+
+
+def test_new_version_only_extracts_changed_pages(processor, tmp_path, mocker):
+    """Pages whose content hash is cached are reused; only edited or new pages are extracted."""
+    v1 = _write_pdf(tmp_path / "v1.pdf", ["Introduction", "Method", "Results"])
+    v2 = _write_pdf(tmp_path / "v2.pdf", ["Introduction", "Method (revised)", "Results", "Appendix"])
+
+    first = processor.extract_structure(v1)
+    extract = mocker.spy(processor, "_extract_structure")
+    second = processor.extract_structure(v2)
+
+    extract.assert_called_once_with(v2, [1, 3])
+    assert [p["page_num"] for p in second["pages"]] == [1, 2, 3, 4]
+    assert second["pages"][1]["blocks"][0]["text"] == "Method (revised)"
+    assert second["pages"][2]["blocks"] == first["pages"][2]["blocks"]
+    assert second["pages"][0]["content_hash"] == first["pages"][0]["content_hash"]
+    assert second["pages"][1]["content_hash"] != first["pages"][1]["content_hash"]
+
+
+def test_cached_extraction_matches_uncached(processor, tmp_path):
+    """Assembling a document from cached pages gives the same result as a full extraction."""
+    path = _write_pdf(tmp_path / "paper.pdf", ["Abstract", "Body", "Abstract"])
+
+    fresh = processor.extract_structure(path)
+    reused = processor.extract_structure(path)
+
+    assert fresh == PDFProcessor().extract_structure(path)
+    assert reused == fresh
+    assert reused["total_pages"] == 3
@@ -0,0 +1,66 @@
+import os
+
+from flask import Flask
+
+from profiling import ProfilingMiddleware
+
+
+def _busy_work():
+    total = 0
+    for i in range(300000):
+        total += i * i
+    return total
+
+
+def _profiled_app(tmp_path, **kwargs):
+    app = Flask(__name__)
+
+    @app.route("/api/work/<session_id>")
+    def work(session_id):
+        return {"total": _busy_work()}
+
+    profiler = ProfilingMiddleware(app, str(tmp_path), admin_token="secret", interval=0.001, **kwargs)
+    app.wsgi_app = profiler
+    return app.test_client(), profiler
+
+
+def test_flagged_request_writes_collapsed_stacks(tmp_path):
+    """Only admin-flagged requests are profiled; output is tagged and in collapsed-stack form."""
+    client, profiler = _profiled_app(tmp_path)
+    client.get("/api/work/abc", headers={"X-Profile": "1"})
+    assert profiler.list_profiles() == []
+
+    client.get("/api/work/abc?profile=1", headers={"X-Admin-Token": "secret"})
+
+    [record] = profiler.list_profiles()
+    assert record["route"] == "/api/work/<session_id>"
+    assert record["session_id"] == "abc"
+    assert record["status"] == 200
+    assert record["trigger"] == "flag"
+    with open(profiler.profile_path(record["id"])) as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(":_busy_work:" in line for line in lines)
+
+
+def test_sampling_profiles_one_in_n(tmp_path):
+    """With sample_every=N, every Nth request is profiled without any flag."""
+    client, profiler = _profiled_app(tmp_path, sample_every=3)
+    for _ in range(6):
+        client.get("/api/work/s1")
+
+    profiles = profiler.list_profiles(session_id="s1")
+    assert [p["trigger"] for p in profiles] == ["sampled", "sampled"]
+    assert profiles[0]["duration_ms"] >= profiles[1]["duration_ms"]
+    assert profiler.profile_path("../index") is None
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".folded")]) == 2
+
+
+def test_socketio_requests_are_never_profiled(tmp_path):
+    """Socket.IO traffic is neither sampled nor counted toward the sampling interval."""
+    client, profiler = _profiled_app(tmp_path, sample_every=1)
+    client.get("/socket.io/?EIO=4&transport=polling&profile=1", headers={"X-Admin-Token": "secret"})
+    assert profiler.list_profiles() == []
+
+    client.get("/api/work/s1")
+    assert len(profiler.list_profiles()) == 1
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from prompt_registry import CompiledPrompt, PromptRegistry
+
+
+def _write_history(path, prompt, version="v1"):
+    path.write_text(json.dumps({"agents": {"tutor_context": {
+        "current_version": version,
+        "versions": {version: {"date": "2026-01-30", "note": "", "prompt": prompt}},
+    }}}))
+
+
+def test_compiled_prompt_fills_named_slots_only():
+    """${name} slots are filled; other $ signs and JSON braces are literal."""
+    prompt = CompiledPrompt("tutor", "v1", 'Teach "${filename}" ({"page": N}) for $5, ${pages} pages')
+    assert prompt.slots == {"filename", "pages"}
+    assert prompt.render(filename="a.pdf", pages=3, unused=1) == 'Teach "a.pdf" ({"page": N}) for $5, 3 pages'
+    with pytest.raises(KeyError):
+        prompt.render(filename="a.pdf")
+
+
+def test_registry_reloads_when_the_file_changes(tmp_path):
+    """Editing the history file changes the rendered prompt and version without a restart."""
+    path = tmp_path / "prompt_history.json"
+    _write_history(path, "Hello ${filename}")
+    registry = PromptRegistry(str(path), check_interval=0)
+    assert registry.render("tutor_context", filename="a.pdf") == ("Hello a.pdf", "v1")
+
+    _write_history(path, "Welcome to ${filename}, student", version="v2")
+    assert registry.render("tutor_context", filename="a.pdf") == ("Welcome to a.pdf, student", "v2")
+    assert registry.reloads == 1
+
+
+def test_registry_keeps_prompts_when_the_file_is_broken(tmp_path):
+    """A half-written history file is ignored and the last good prompts stay live."""
+    path = tmp_path / "prompt_history.json"
+    _write_history(path, "Hello ${filename}")
+    registry = PromptRegistry(str(path), check_interval=0)
+    path.write_text('{"agents": {')
+    assert registry.render("tutor_context", filename="a.pdf") == ("Hello a.pdf", "v1")
+
+
+def test_shipped_history_has_every_context_prompt():
+    """The bundled history defines the contexts the backend renders."""
+    versions = PromptRegistry().versions()
+    for agent in ("tutor_context", "debate_author_context", "debate_reviewer_context", "quiz_context"):
+        assert agent in versions
@@ -0,0 +1,78 @@
+from agents import QuizMaster
+
+
+def _pdf(pages=4):
+    return {
+        "pages": [
+            {"page_num": n, "blocks": [{"text": f"Page {n} body text about transformers. " * 5}]}
+            for n in range(1, pages + 1)
+        ],
+        "total_pages": pages,
+    }
+
+
+OUTLINE = {
+    "sections": [{"heading": "Introduction", "page": 1, "level": 1}],
+    "key_terms": ["attention", "encoder"],
+    "abstract": "We propose a new architecture.",
+}
+
+
+def test_quiz_context_is_formatted_from_cached_material(mocker):
+    """Quiz material is built once per document; contexts only format it."""
+    quiz_master = QuizMaster()
+    build = mocker.spy(quiz_master, "_build_material")
+    pdf_data = _pdf()
+
+    quiz_master.prepare_material(pdf_data, OUTLINE)
+    first = quiz_master.generate_quiz_context(pdf_data, OUTLINE, "paper.pdf")
+    second = quiz_master.generate_quiz_context(pdf_data, OUTLINE, "other.pdf")
+
+    assert build.call_count == 1
+    assert 'Quiz Mode for "paper.pdf" (4 pages)' in first
+    assert "- Introduction (page 1)" in first
+    assert "Key Terms: attention, encoder" in first
+    assert "Page 3 body text" in first and "Page 4 body text" not in first
+    assert 'Quiz Mode for "other.pdf"' in second
+
+
+def _sectioned_pdf():
+    blocks = [
+        ("Attention Mechanism", "Self-attention relates every token to every other token. "
+         "Queries, keys and values are projected and the attention weights come from a "
+         "scaled dot product followed by a softmax over the keys."),
+        ("Training Setup", "We trained on eight GPUs with the Adam optimizer, a warmup "
+         "learning rate schedule, label smoothing and dropout for regularization over "
+         "one hundred thousand steps on the WMT translation dataset."),
+    ]
+    page_blocks = []
+    sections = []
+    for heading, body in blocks:
+        page_blocks.append({"text": heading})
+        page_blocks.append({"text": body})
+        sections.append({"heading": heading, "page": 1, "level": 1})
+    pdf_data = {"pages": [{"page_num": 1, "blocks": page_blocks}], "total_pages": 1}
+    return pdf_data, {"sections": sections, "key_terms": ["softmax"], "abstract": ""}
+
+
+def test_score_answer_uses_answer_keys_and_updates_counts():
+    """Answers are scored against the right section and update the quiz counts."""
+    quiz_master = QuizMaster()
+    pdf_data, outline = _sectioned_pdf()
+    started = quiz_master.start_quiz("s1", pdf_data, outline, "paper.pdf")
+    assert [q["section"] for q in started["questions"]] == ["Attention Mechanism", "Training Setup"]
+
+    good = quiz_master.score_answer(
+        "s1", pdf_data, outline,
+        "Each query is compared with the keys using a scaled dot product and a softmax "
+        "gives attention weights over the values.",
+        question_id=0,
+    )
+    bad = quiz_master.score_answer("s1", pdf_data, outline, "It uses a big database.", question_id=0)
+    guessed = quiz_master.score_answer("s1", pdf_data, outline, "Adam optimizer with warmup and dropout")
+
+    assert good["correct"] is True
+    assert "softmax" in good["matched_terms"]
+    assert bad["correct"] is False
+    assert guessed["section"] == "Training Setup"
+    assert quiz_master.end_quiz("s1") == {"status": "quiz_ended", "questions_asked": 3, "correct_count": 2}
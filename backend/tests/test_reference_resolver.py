@@ -0,0 +1,51 @@
+from agents import Navigator, ReferenceResolver
+
+
+def _pdf_with_references(entries):
+    blocks = [{"text": "References", "bbox": [0, 0, 10, 10]}]
+    blocks += [{"text": e, "bbox": [0, 10 * i, 10, 10 * i + 5]} for i, e in enumerate(entries, 1)]
+    return {"pages": [{"page_num": 1, "blocks": blocks}], "total_pages": 1}
+
+
+class FakeLibrarian:
+    def __init__(self):
+        self.batches = []
+        self.searches = []
+
+    def get_papers_details(self, ids, background=False):
+        assert background
+        self.batches.append(list(ids))
+        return {i: {"arxiv_id": i, "title": f"Paper {i}"} for i in ids}, {}
+
+    def search(self, query, max_results=5, background=False):
+        assert background
+        self.searches.append(query)
+        return [{"arxiv_id": "1512.03385", "title": query}], {}
+
+
+def test_extract_candidates_finds_ids_and_titles():
+    """arXiv IDs and titles are pulled out of formatted entries."""
+    resolver = ReferenceResolver(FakeLibrarian(), Navigator())
+    candidates = resolver.extract_candidates([
+        {"number": 1, "text": "[1] A. Vaswani et al. Attention is all you need. arXiv:1706.03762v5, 2017."},
+        {"number": 2, "text": "[2] K. He, X. Zhang. Deep residual learning for image recognition. In CVPR, 2016."},
+    ])
+
+    assert candidates[0]["arxiv_id"] == "1706.03762v5"
+    assert candidates[1]["arxiv_id"] is None
+    assert candidates[1]["title"] == "Deep residual learning for image recognition"
+
+
+def test_resolve_batches_ids_and_searches_titles():
+    """IDs are resolved in one batched lookup; remaining entries fall back to title search."""
+    librarian = FakeLibrarian()
+    resolver = ReferenceResolver(librarian, Navigator())
+    entries = [f"[{n}] Author. Some paper title {n}. arXiv:2001.0000{n}" for n in range(1, 6)]
+    entries.append("[6] K. He, X. Zhang. Deep residual learning for image recognition. In CVPR, 2016.")
+
+    resolved = resolver.resolve(_pdf_with_references(entries))
+
+    assert [len(b) for b in librarian.batches] == [5]
+    assert librarian.searches == ["Deep residual learning for image recognition"]
+    assert set(resolved) == {1, 2, 3, 4, 5, 6}
+    assert resolved[1]["arxiv_id"] == "2001.00001"
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from resilience import CLOSED, OPEN, CircuitOpenError, Upstream
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def _failing(error, calls):
+    def fn():
+        calls.append(1)
+        raise error
+    return fn
+
+
+def test_circuit_opens_and_fails_fast_then_recovers():
+    """Repeated upstream failures open the circuit; a successful probe closes it."""
+    upstream = Upstream("test", min_calls=3, reset_timeout=0.05, max_retries=0)
+    calls = []
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            upstream.call(_failing(requests.ConnectionError("down"), calls))
+
+    assert upstream.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        upstream.call(_failing(requests.ConnectionError("down"), calls))
+    assert len(calls) == 3
+
+    time.sleep(0.06)
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.status()["state"] == CLOSED
+
+
+def test_idempotent_calls_retry_server_errors_only():
+    """5xx responses are retried with backoff; 4xx responses are not and don't trip the breaker."""
+    upstream = Upstream("test", max_retries=2, base_delay=0.001, min_calls=100)
+    calls = []
+    with pytest.raises(requests.HTTPError):
+        upstream.call(_failing(_http_error(503), calls), idempotent=True)
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(requests.HTTPError):
+        upstream.call(_failing(_http_error(404), calls), idempotent=True)
+    assert len(calls) == 1
+    assert upstream.status()["failures"] == 3
+
+
+def test_slow_call_is_hedged():
+    """A call slower than the recent p95 gets a duplicate, and the faster answer wins."""
+    upstream = Upstream("test", hedge=True, hedge_min_samples=5, hedge_min_delay=0.01)
+    for _ in range(5):
+        upstream.call(lambda: None, idempotent=True)
+
+    release = threading.Event()
+    started = []
+
+    def fn():
+        started.append(1)
+        if len(started) == 1:
+            release.wait(2)
+            return "slow"
+        return "fast"
+
+    try:
+        assert upstream.call(fn, idempotent=True) == "fast"
+    finally:
+        release.set()
+    status = upstream.status()
+    assert status["hedges"] == 1
+    assert status["hedge_wins"] == 1
+
+
+def test_min_interval_spaces_calls_out():
+    """A paced upstream starts concurrent calls at least min_interval apart."""
+    upstream = Upstream("paced", min_interval=0.05)
+    started = []
+    threads = [threading.Thread(target=upstream.call, args=(lambda: started.append(time.time()),))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    started.sort()
+    assert all(b - a >= 0.045 for a, b in zip(started, started[1:]))
+
+
+def test_interrupted_probe_does_not_wedge_the_circuit():
+    """A half-open probe killed by a BaseException lets the next call probe again."""
+    class Interrupted(BaseException):
+        pass
+
+    def interrupted():
+        raise Interrupted()
+
+    upstream = Upstream("test", min_calls=3, reset_timeout=0.05, max_retries=0)
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            upstream.call(_failing(requests.ConnectionError("down"), []))
+    time.sleep(0.06)
+
+    with pytest.raises(Interrupted):
+        upstream.call(interrupted)
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.status()["state"] == CLOSED
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from cache import DocumentCache
+from singleflight import FlightAborted, SingleFlight
+
+
+def _run_concurrently(n, target):
+    results = [None] * n
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_callers_share_one_computation():
+    """Callers for the same key wait on the leader and receive its result."""
+    flight = SingleFlight("test")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"context": "built"}
+
+    results = _run_concurrently(5, lambda: flight.do("session-1", compute))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert not flight.in_flight("session-1")
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    """An exception is shared by the concurrent callers, and the next call runs again."""
+    flight = SingleFlight("test")
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results = _run_concurrently(3, lambda: flight.do("k", fail))
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.do("k", lambda: 42) == 42
+
+
+def test_interrupted_leader_aborts_waiters():
+    """A leader killed by a BaseException gives its waiters FlightAborted, not None."""
+    class Interrupted(BaseException):
+        pass
+
+    flight = SingleFlight("test")
+    started = threading.Event()
+    results = {}
+
+    def interrupted():
+        started.set()
+        time.sleep(0.1)
+        raise Interrupted()
+
+    def leader():
+        try:
+            flight.do("k", interrupted)
+        except BaseException as e:
+            results["leader"] = e
+
+    def follower():
+        try:
+            results["follower"] = flight.do("k", lambda: "unused")
+        except Exception as e:
+            results["follower"] = e
+
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    started.wait()
+    threads.append(threading.Thread(target=follower))
+    threads[1].start()
+    for t in threads:
+        t.join()
+
+    assert isinstance(results["leader"], Interrupted)
+    assert isinstance(results["follower"], FlightAborted)
+    assert flight.do("k", lambda: 42) == 42
+
+
+def test_recursive_call_for_same_key_raises():
+    """Re-entering a key from inside its own computation fails instead of deadlocking."""
+    flight = SingleFlight("test")
+    with pytest.raises(RuntimeError):
+        flight.do("k", lambda: flight.do("k", lambda: None))
+
+
+def test_document_cache_builds_once_under_concurrency():
+    """Concurrent misses on DocumentCache.get_or_build share a single build."""
+    cache = DocumentCache()
+    pdf_data = {"pages": []}
+    builds = []
+
+    def build(d):
+        builds.append(1)
+        time.sleep(0.1)
+        return object()
+
+    results = _run_concurrently(4, lambda: cache.get_or_build(pdf_data, build))
+    assert len(builds) == 1
+    assert all(r is results[0] for r in results)
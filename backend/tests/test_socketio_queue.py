@@ -0,0 +1,75 @@
+import socket
+import threading
+
+import pytest
+import requests
+import socketio
+
+from loadtest.harness import SOCKETIO_TRANSPORTS, spawn_server
+from loadtest.stubs import sample_pdf
+from socketio_queue import LocalBroker, read_frame, write_frame
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def broker():
+    broker = LocalBroker(port=0).start()
+    yield broker
+    broker.stop()
+
+
+def test_broker_relays_to_channel_subscribers(broker):
+    """Frames published on a channel reach its subscribers only."""
+    def connect(channel, subscribe):
+        sock = socket.create_connection(broker.address)
+        write_frame(sock, f'{{"channel": "{channel}", "subscribe": {str(subscribe).lower()}}}'.encode())
+        return sock
+
+    sub = connect("a", True)
+    other = connect("b", True)
+    pub = connect("a", False)
+    threading.Event().wait(0.1)  # let the broker register the subscribers
+    write_frame(pub, b"hello")
+
+    sub.settimeout(2)
+    other.settimeout(0.2)
+    assert read_frame(sub) == b"hello"
+    with pytest.raises(socket.timeout):
+        read_frame(other)
+    for s in (sub, other, pub):
+        s.close()
+
+
+def test_emit_from_one_worker_reaches_client_on_another(broker, tmp_path):
+    """A state update handled by worker B is pushed to a client connected to worker A."""
+    env = {"SOCKETIO_MESSAGE_QUEUE": broker.url}
+    worker_a, url_a = spawn_server(env, _free_port(), str(tmp_path / "a"))
+    worker_b, url_b = spawn_server(env, _free_port(), str(tmp_path / "b"))
+    client = socketio.Client(reconnection=False)
+    try:
+        upload = requests.post(f"{url_b}/api/upload-pdf", files={"file": ("p.pdf", sample_pdf(), "application/pdf")})
+        session_id = upload.json()["session_id"]
+
+        joined, state = threading.Event(), {}
+        client.on("joined", lambda data: joined.set())
+        client.on("session_state", lambda data: state.update(data))
+        client.connect(url_a, transports=SOCKETIO_TRANSPORTS)
+        client.emit("join_session", {"session_id": session_id})
+        assert joined.wait(10)
+
+        requests.post(f"{url_b}/api/session/{session_id}/state", json={"current_page": 3})
+        for _ in range(100):
+            if state:
+                break
+            threading.Event().wait(0.05)
+        assert state == {"session_id": session_id, "current_page": 3, "concepts_discussed": []}
+    finally:
+        client.disconnect()
+        for worker in (worker_a, worker_b):
+            worker.terminate()
+            worker.wait(10)
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+from spaced_repetition import ReviewScheduler
+
+TODAY = date(2026, 3, 1)
+
+
+def test_sm2_intervals_match_frontend():
+    """Consecutive good recalls grow the interval 1 -> 6 -> 6*EF; a lapse resets it."""
+    scheduler = ReviewScheduler()
+    intervals = [scheduler.record("u", "Attention", 5, TODAY)["interval"] for _ in range(3)]
+    assert intervals == [1, 6, 16]
+
+    entry = scheduler.record("u", "attention", 1, TODAY)
+    assert entry["interval"] == 1
+    assert entry["repetitions"] == 0
+    assert entry["easeFactor"] >= 1.3
+
+
+def test_next_due_orders_by_due_date():
+    """The due queue returns only due concepts, most overdue first."""
+    scheduler = ReviewScheduler()
+    scheduler.record("u", "encoder", 5, TODAY - timedelta(days=3))
+    scheduler.record("u", "decoder", 5, TODAY - timedelta(days=5))
+    scheduler.record("u", "softmax", 5, TODAY)
+    scheduler.record("other", "encoder", 5, TODAY - timedelta(days=9))
+
+    due = scheduler.next_due("u", limit=5, today=TODAY)
+    assert [e["key"] for e in due] == ["decoder", "encoder"]
+
+    # Rescheduling a concept supersedes its old queue position
+    scheduler.record("u", "decoder", 5, TODAY)
+    assert [e["key"] for e in scheduler.next_due("u", limit=5, today=TODAY)] == ["encoder"]
+
+
+def test_import_and_persistence(tmp_path):
+    """localStorage data is imported and the schedule survives a restart."""
+    path = str(tmp_path / "schedule.jsonl")
+    scheduler = ReviewScheduler(path)
+    imported = scheduler.import_local_storage(
+        "u",
+        [{"id": "c1", "name": "Self-Attention"}],
+        [{"conceptId": "c1", "easeFactor": 2.2, "interval": 6, "repetitions": 2,
+          "nextReviewDate": "2026-02-20", "lastReviewDate": "2026-02-14", "quality": 4}],
+    )
+    assert imported == 1
+
+    reloaded = ReviewScheduler(path)
+    due = reloaded.next_due("u", today=TODAY)
+    assert due[0]["name"] == "Self-Attention"
+    assert due[0]["easeFactor"] == 2.2
+
+
+def test_import_skips_malformed_records(tmp_path):
+    """Bad dates or numbers are skipped, and a log with bad lines still loads."""
+    path = tmp_path / "schedule.jsonl"
+    scheduler = ReviewScheduler(str(path))
+    concepts = [{"id": f"c{i}", "name": f"Concept {i}"} for i in range(4)]
+    imported = scheduler.import_local_storage("u", concepts, [
+        {"conceptId": "c0", "nextReviewDate": "soon"},
+        {"conceptId": "c1", "nextReviewDate": "2026-02-20", "easeFactor": "high"},
+        {"conceptId": "c2", "nextReviewDate": "2026-02-20", "interval": float("inf")},
+        {"conceptId": "c3", "nextReviewDate": "2026-02-20T09:00:00Z", "lastReviewDate": "2026-02-14"},
+    ])
+    assert imported == 1
+    assert [e["key"] for e in scheduler.entries("u")] == ["concept 3"]
+
+    with open(path, "a") as f:
+        f.write('{"user_id": "u", "key": "bad", "name": "Bad", "nextReviewDate": "soon"}\n')
+        f.write('["not", "a", "record"]\n')
+    reloaded = ReviewScheduler(str(path))
+    assert [e["key"] for e in reloaded.next_due("u", limit=5, today=TODAY)] == ["concept 3"]
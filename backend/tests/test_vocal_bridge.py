@@ -0,0 +1,111 @@
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vocal_bridge import TokenPool, VocalBridgeClient
+
+
+def _jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+@pytest.fixture
+def stub_server():
+    """Local stand-in for the Vocal Bridge token endpoint."""
+    state = {"requests": [], "lifetime": 3600}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            state["requests"].append(body["participant_name"])
+            payload = json.dumps({
+                "token": _jwt(time.time() + state["lifetime"]),
+                "livekit_url": "wss://livekit.invalid",
+                "n": len(state["requests"]),
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_pool_serves_pre_minted_tokens(stub_server):
+    """Warmed pools hand out tokens without a round trip and refill in the background."""
+    pool = TokenPool("tutor", VocalBridgeClient("key", base_url=stub_server["url"]), size=2)
+    try:
+        pool.start(["student"])
+        assert _wait_for(lambda: pool.stats()["ready"]["student"] == 2)
+        before = len(stub_server["requests"])
+
+        result, status = pool.acquire("student")
+
+        assert status == "hit"
+        assert result["livekit_url"] == "wss://livekit.invalid"
+        assert len(stub_server["requests"]) == before
+        assert _wait_for(lambda: pool.stats()["ready"]["student"] == 2)
+        assert pool.stats()["hits"] == 1
+    finally:
+        pool.close()
+
+
+def test_pool_miss_mints_on_demand(stub_server):
+    """Unknown participants and short-lived tokens fall back to a direct mint."""
+    stub_server["lifetime"] = 30
+    pool = TokenPool("tutor", VocalBridgeClient("key", base_url=stub_server["url"]), refresh_margin=60)
+    pool._warm("student")
+
+    pool._refill()
+    result, status = pool.acquire("student")
+
+    assert status == "miss"
+    assert "token" in result
+    assert pool.stats()["ready"]["student"] == 0
+    assert stub_server["requests"] == ["student", "student"]
+
+
+def test_only_warm_participants_are_pooled(stub_server):
+    """Other names are minted on demand, and idle pools stop being refilled."""
+    pool = TokenPool("tutor", VocalBridgeClient("key", base_url=stub_server["url"]), size=2, idle_after=60)
+    pool._warm("student")
+    pool._refill()
+    assert stub_server["requests"] == ["student", "student"]
+
+    for i in range(8):
+        assert pool.acquire(f"guest-{i}")[1] == "miss"
+    pool._refill()
+    assert list(pool.stats()["ready"]) == ["student"]
+    assert len(stub_server["requests"]) == 10
+
+    pool._last_used["student"] -= 120
+    pool._pools["student"].clear()
+    pool._refill()
+    assert len(stub_server["requests"]) == 10
+
+    # Using the pool again resumes the refills
+    assert pool.acquire("student")[1] == "miss"
+    pool._refill()
+    assert pool.stats()["ready"]["student"] == 2
@@ -1,13 +1,23 @@
+import base64
+import json
+import threading
+import time
+from collections import deque
+
 import requests
 
+from resilience import Upstream
+
 
 class VocalBridgeClient:
     """Client for the Vocal Bridge AI API to obtain LiveKit tokens and agent info."""
 
     BASE_URL = "https://vocalbridgeai.com/api/v1"
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, base_url=None, upstream=None):
         self.api_key = api_key
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.upstream = upstream or Upstream("vocal_bridge")
         self.headers = {
             "X-API-Key": api_key,
             "Content-Type": "application/json",
@@ -27,26 +37,196 @@ class VocalBridgeClient:
             }
             if context:
                 body["context"] = context
-            response = requests.post(
-                f"{self.BASE_URL}/token",
-                headers=self.headers,
-                json=body,
-                timeout=30,
-            )
-            response.raise_for_status()
-            return response.json()
+
+            def post():
+                response = requests.post(
+                    f"{self.base_url}/token",
+                    headers=self.headers,
+                    json=body,
+                    timeout=30,
+                )
+                response.raise_for_status()
+                return response
+
+            # Minting a token isn't idempotent, so it's never retried or hedged
+            return self.upstream.call(post).json()
         except requests.RequestException as e:
             return {"error": str(e)}
 
     def get_agent_info(self):
         """Retrieve agent configuration from the API."""
         try:
-            response = requests.get(
-                f"{self.BASE_URL}/agent",
+            response = self.upstream.get(
+                f"{self.base_url}/agent",
                 headers=self.headers,
                 timeout=10,
             )
-            response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             return {"error": str(e)}
+
+
+def token_expiry(result, default_ttl):
+    """Return the expiry time of a token response.
+
+    LiveKit tokens are JWTs, so the ``exp`` claim is read from the payload;
+    tokens that can't be decoded are assumed to live *default_ttl* seconds.
+    """
+    try:
+        payload = result["token"].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        return time.time() + default_ttl
+
+
+class TokenPool:
+    """Pre-minted LiveKit tokens for one Vocal Bridge agent key.
+
+    A few tokens for each participant name passed to ``start`` are kept
+    ready by a background thread and re-minted before they expire, so
+    starting a voice session doesn't wait on a Vocal Bridge round trip.
+    Tokens are single-use: each ``acquire`` takes one out of the pool and
+    wakes the refill thread.  Other names are minted on demand, and a pool
+    nobody has acquired from for *idle_after* seconds is left to drain
+    until it is used again.
+    """
+
+    def __init__(self, name, client, size=2, ttl=600, refresh_margin=60,
+                 idle_after=1800, retry_delay=5):
+        self.name = name
+        self.client = client
+        self.size = size
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.idle_after = idle_after
+        self.retry_delay = retry_delay
+
+        self._pools = {}  # warm participant -> deque of (expires_at, result)
+        self._last_used = {}  # warm participant -> time of the last acquire (or start)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.minted = 0
+        self.expired = 0
+        self.errors = 0
+
+    # ------------------------------------------------------------------
+    # Background refill
+    # ------------------------------------------------------------------
+
+    def _is_fresh(self, expires_at, now):
+        return expires_at - self.refresh_margin > now
+
+    def _warm(self, participant):
+        """Keep a pool of tokens ready for *participant*."""
+        self._pools.setdefault(participant, deque())
+        self._last_used[participant] = time.time()
+
+    def _refill(self):
+        """Top up every pool in use; returns seconds until the next refresh is due."""
+        now = time.time()
+        with self._lock:
+            wanted = []
+            for participant, pool in self._pools.items():
+                fresh = deque(t for t in pool if self._is_fresh(t[0], now))
+                self.expired += len(pool) - len(fresh)
+                self._pools[participant] = fresh
+                if now - self._last_used[participant] < self.idle_after:
+                    wanted.extend([participant] * (self.size - len(fresh)))
+
+        for participant in wanted:
+            if self._closed:
+                break
+            result = self.client.get_token(participant)
+            if "error" in result:
+                with self._lock:
+                    self.errors += 1
+                print(f"[TokenPool] {self.name}: mint failed: {result['error']}")
+                return self.retry_delay
+            expires_at = token_expiry(result, self.ttl)
+            if not self._is_fresh(expires_at, time.time()):
+                # Tokens too short-lived to pool; callers mint on demand.
+                return self.retry_delay
+            with self._lock:
+                self.minted += 1
+                self._pools[participant].append((expires_at, result))
+
+        with self._lock:
+            expiries = [t[0] for pool in self._pools.values() for t in pool]
+        if not expiries:
+            return self.ttl
+        return max(1.0, min(expiries) - self.refresh_margin - time.time())
+
+    def _run(self):
+        while not self._closed:
+            try:
+                delay = self._refill()
+            except Exception as e:
+                print(f"[TokenPool] {self.name}: refill error: {e}")
+                delay = self.retry_delay
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self, participants=()):
+        """Start the refill thread, pre-warming pools for *participants*."""
+        with self._lock:
+            for participant in participants:
+                self._warm(participant)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"token-pool-{self.name}", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def acquire(self, participant):
+        """Return ``(result, status)``: a pooled token ("hit") or a freshly minted one ("miss")."""
+        now = time.time()
+        with self._lock:
+            warm = participant in self._pools
+            pool = self._pools[participant] if warm else deque()
+            if warm:
+                self._last_used[participant] = now
+            result = None
+            while pool:
+                expires_at, candidate = pool.popleft()
+                if self._is_fresh(expires_at, now):
+                    result = candidate
+                    break
+                self.expired += 1
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if warm:
+            self._wake.set()
+        if result is not None:
+            return result, "hit"
+        return self.client.get_token(participant), "miss"
+
+    def stats(self):
+        """Return pool hit/miss counters and the number of ready tokens."""
+        with self._lock:
+            served = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": self.size,
+                "ready": {p: len(pool) for p, pool in self._pools.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "minted": self.minted,
+                "expired": self.expired,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / served, 3) if served else 0.0,
+            }
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
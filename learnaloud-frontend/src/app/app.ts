@@ -93,6 +93,7 @@ export class App implements OnInit, OnDestroy {
   private debateRelayBuffer: { role: 'author' | 'reviewer'; text: string }[] = [];
   private debateRelayedIds = new Set<string>();
   private currentDebateTurn: 'author' | 'reviewer' = 'author';
+  private debateId: string | null = null;
   private debateTurnTimeout: any = null;
   private debateTurnInterval: any = null;
   private pauseBetweenTurns = 3000; // 3 second pause between turns for smooth, natural transitions and to prevent cutoffs
@@ -164,6 +165,25 @@ export class App implements OnInit, OnDestroy {
       this.cdr.detectChanges();
     });
 
+    this.api.onDebateStarted((debate: any) => {
+      if (this.isDebateActive && !this.debateId) {
+        this.debateId = debate.debate_id;
+      }
+    });
+
+    this.api.onDebateRelay((relay: any) => this.runDebateTurn(relay));
+
+    this.api.onDebateFinished((debate: any) => {
+      if (debate.debate_id === this.debateId) {
+        console.log(`[Debate] Turn budget reached after ${debate.turns.length} turns`);
+        this.endDebate();
+      }
+    });
+
+    this.api.onDebateError((err: any) => {
+      console.error('[Debate] Server error:', err.error);
+    });
+
     this.api.onClientAction((action: any) => {
       console.log('Received action:', action);
       this.handleClientAction(action);
@@ -540,15 +560,6 @@ export class App implements OnInit, OnDestroy {
     return entries.join(' ');
   }
 
-  private getDebateHistory(role?: 'author' | 'reviewer'): string {
-    // Get formatted debate history for context
-    const history = role 
-      ? this.debateHistory.filter(h => h.role === role)
-      : this.debateHistory;
-    
-    return history.slice(-10).map(h => `[${h.role.toUpperCase()}] ${h.text}`).join('\n');
-  }
-
   private addToDebateHistory(role: 'author' | 'reviewer', text: string): void {
     this.debateHistory.push({ role, text });
     // Keep only last 20 turns to manage memory
@@ -586,10 +597,12 @@ export class App implements OnInit, OnDestroy {
     // Wait for context to be processed
     await new Promise(resolve => setTimeout(resolve, 1500));
 
-    console.log('[Debate] Starting author turn...');
-
-    // Start with author speaking first
-    await this.triggerAuthorTurn(true);
+    // The server brokers the turns; its first relay starts the author's opening
+    const activeSessionId = this.getActiveSessionId();
+    if (activeSessionId) {
+      console.log('[Debate] Asking server to start the debate...');
+      this.api.startDebate(activeSessionId);
+    }
 
     // Reset starting flag now that initialization is complete
     this.isStartingDebate = false;
@@ -604,13 +617,10 @@ export class App implements OnInit, OnDestroy {
     this.isStartingDebate = false;
 
     // Clear all timers and intervals
-    if (this.debateTurnTimeout) {
-      clearTimeout(this.debateTurnTimeout);
-      this.debateTurnTimeout = null;
-    }
-    if (this.debateTurnInterval) {
-      clearInterval(this.debateTurnInterval);
-      this.debateTurnInterval = null;
+    this.stopDebateTurnTimers();
+    if (this.debateId) {
+      this.api.endDebateOnServer(this.debateId);
+      this.debateId = null;
     }
 
     // Mute both agents audio
@@ -637,7 +647,37 @@ export class App implements OnInit, OnDestroy {
     console.log('[Debate] Cleanup complete');
   }
 
-  private async triggerAuthorTurn(isFirst: boolean = false): Promise<void> {
+  private runDebateTurn(relay: any): void {
+    // The server decides whose turn it is and composes the relay message
+    if (!this.isDebateActive || relay.debate_id !== this.debateId) return;
+
+    this.stopDebateTurnTimers();
+    this.voice.muteAgentAudio(relay.role === 'author' ? 'reviewer' : 'author');
+
+    const delay = relay.turn === 1 ? 0 : this.pauseBetweenTurns;
+    console.log(`[Debate] Turn ${relay.turn}: ${relay.role} in ${delay / 1000}s`);
+    this.debateTurnTimeout = setTimeout(() => {
+      if (!this.isDebateActive) return;
+      if (relay.role === 'author') {
+        this.triggerAuthorTurn(relay);
+      } else {
+        this.triggerReviewerTurn(relay);
+      }
+    }, delay);
+  }
+
+  private stopDebateTurnTimers(): void {
+    if (this.debateTurnTimeout) {
+      clearTimeout(this.debateTurnTimeout);
+      this.debateTurnTimeout = null;
+    }
+    if (this.debateTurnInterval) {
+      clearInterval(this.debateTurnInterval);
+      this.debateTurnInterval = null;
+    }
+  }
+
+  private async triggerAuthorTurn(relay: any): Promise<void> {
     if (!this.isDebateActive) return;
 
     console.log('[Debate] Triggering author turn...');
@@ -665,26 +705,16 @@ export class App implements OnInit, OnDestroy {
     // Wait before sending message to ensure audio is ready
     await new Promise(resolve => setTimeout(resolve, 300));
 
-    if (isFirst) {
-      // First turn: author speaks about the paper
-      const message = `You are the author of this paper. Present your key findings and arguments in support of the paper. Keep your response under 40 seconds. Be strong and confident in defending your work.`;
-      await this.voice.relayToAgent('author', message);
-      this.statusMessage = 'Author presenting...';
-    } else {
-      // Subsequent turns: respond to reviewer
-      const reviewerHistory = this.getDebateHistory('reviewer');
-      const message = `[REVIEWER CRITIQUE] ${reviewerHistory}\\n\\nAnswer the reviewer's questions and respond to their critique. Address their concerns directly with evidence from your paper. Keep your response under 40 seconds.`;
-      await this.voice.relayToAgent('author', message);
-      this.statusMessage = 'Author responding...';
-    }
-
+    await this.voice.relayToAgent('author', relay.message);
+    this.api.debateTurnStarted(relay.debate_id, relay.turn);
+    this.statusMessage = relay.turn === 1 ? 'Author presenting...' : 'Author responding...';
     this.cdr.detectChanges();
 
-    // Wait for author to finish speaking, then schedule reviewer turn
-    this.scheduleNextTurn('reviewer');
+    // Report back to the server when the author finishes speaking
+    this.monitorDebateTurn(relay);
   }
 
-  private async triggerReviewerTurn(): Promise<void> {
+  private async triggerReviewerTurn(relay: any): Promise<void> {
     if (!this.isDebateActive) return;
 
     console.log('[Debate] Triggering reviewer turn...');
@@ -751,35 +781,26 @@ export class App implements OnInit, OnDestroy {
     // Wait before sending message to ensure audio is ready
     await new Promise(resolve => setTimeout(resolve, 300));
 
-    const authorHistory = this.getDebateHistory('author');
-    const message = `[AUTHOR'S CLAIMS] ${authorHistory}\n\nNow ask critical questions about the paper and the author's arguments. Point out weaknesses, questionable claims, and areas that need improvement by framing them as questions. Keep your response under 40 seconds. If you need a moment to think, say "Let me analyze this" or "Interesting, let me think" so the listener knows you're preparing.`;
-    await this.voice.relayToAgent('reviewer', message);
+    await this.voice.relayToAgent('reviewer', relay.message);
+    this.api.debateTurnStarted(relay.debate_id, relay.turn);
     this.statusMessage = 'Reviewer asking questions...';
     this.cdr.detectChanges();
 
-    // Start monitoring for reviewer's response
-    this.scheduleNextTurn('author');
+    // Report back to the server when the reviewer finishes speaking
+    this.monitorDebateTurn(relay);
   }
 
-  private scheduleNextTurn(nextRole: 'author' | 'reviewer'): void {
-    // Clear any existing timeout and interval
-    if (this.debateTurnTimeout) {
-      clearTimeout(this.debateTurnTimeout);
-      this.debateTurnTimeout = null;
-    }
-    if (this.debateTurnInterval) {
-      clearInterval(this.debateTurnInterval);
-      this.debateTurnInterval = null;
-    }
+  private monitorDebateTurn(relay: any): void {
+    this.stopDebateTurnTimers();
 
-    const currentRole = nextRole === 'author' ? 'reviewer' : 'author';
+    const currentRole: 'author' | 'reviewer' = relay.role;
     const startTime = Date.now();
     let lastSeenText = '';
     let textStableCount = 0;
     const MIN_TURN_DURATION = 30000; // Minimum 30 seconds before allowing switch
-    const MAX_TURN_DURATION = 45000; // Maximum 45 seconds before forcing switch
+    // The server enforces the maximum turn length and sends the next relay itself
 
-    console.log(`[Debate] Monitoring ${currentRole} turn, will switch to ${nextRole} when done`);
+    console.log(`[Debate] Monitoring ${currentRole} turn ${relay.turn}`);
 
     // Monitor for when current speaker finishes - check frequently
     this.debateTurnInterval = setInterval(() => {
@@ -803,71 +824,29 @@ export class App implements OnInit, OnDestroy {
           // Wait for 12 consecutive stable checks (2.4 seconds total) to ensure speaker is truly done
           if (textStableCount >= 12) {
             console.log(`[Debate] ${currentRole} appears finished after ${(elapsed/1000).toFixed(1)}s`);
+            clearInterval(this.debateTurnInterval);
+            this.debateTurnInterval = null;
 
-            // Add to debate history if not already added
             const alreadyInHistory = this.debateHistory.some(h =>
               h.role === currentRole && h.text === latestText
             );
-
             if (!alreadyInHistory) {
               this.addToDebateHistory(currentRole, latestText);
             }
 
-            // Clear interval
-            clearInterval(this.debateTurnInterval);
-
             // Immediately mute current speaker to prevent overlap
             this.voice.muteAgentAudio(currentRole);
-            console.log(`[Debate] Muted ${currentRole} to prevent overlap`);
-
-            // Wait after speech completes before next agent starts
-            console.log(`[Debate] Switching to ${nextRole} in ${this.pauseBetweenTurns/1000}s...`);
-            this.debateTurnTimeout = setTimeout(() => {
-              if (this.isDebateActive) {
-                if (nextRole === 'author') {
-                  this.triggerAuthorTurn(false);
-                } else {
-                  this.triggerReviewerTurn();
-                }
-              }
-            }, this.pauseBetweenTurns);
+            this.api.endDebateTurn(relay.debate_id, currentRole, latestText, relay.turn);
           }
         } else {
+          if (latestText !== lastSeenText) {
+            // Kept by the server if the turn runs out of time before it ends
+            this.api.reportDebateTurnText(relay.debate_id, relay.turn, latestText);
+          }
           lastSeenText = latestText;
           textStableCount = 0;
         }
       }
-
-      // Hard limit: force switch after 45 seconds
-      if (elapsed > MAX_TURN_DURATION) {
-        clearInterval(this.debateTurnInterval);
-        console.log(`[Debate] Force switching to ${nextRole} after ${(elapsed/1000).toFixed(1)}s (max duration reached)`);
-
-        // Add whatever we have to history
-        if (lastSeenText && lastSeenText.length > 10) {
-          const alreadyInHistory = this.debateHistory.some(h =>
-            h.role === currentRole && h.text === lastSeenText
-          );
-          if (!alreadyInHistory) {
-            this.addToDebateHistory(currentRole, lastSeenText);
-          }
-        }
-
-        // Immediately mute current speaker to prevent overlap
-        this.voice.muteAgentAudio(currentRole);
-        console.log(`[Debate] Force muted ${currentRole} to prevent overlap`);
-
-        // Trigger next turn with a brief pause
-        this.debateTurnTimeout = setTimeout(() => {
-          if (this.isDebateActive) {
-            if (nextRole === 'author') {
-              this.triggerAuthorTurn(false);
-            } else {
-              this.triggerReviewerTurn();
-            }
-          }
-        }, this.pauseBetweenTurns);
-      }
     }, 200); // Check every 200ms
   }
 
@@ -1668,6 +1647,7 @@ Completed in ${res.mcp_info.duration_ms}ms`,
           number: res.number,
           text: res.text,
           page: res.page,
+          paper: res.paper,
         });
       },
       error: (err) => {
@@ -42,6 +42,8 @@ export interface CitationResult {
   page?: number;
   bbox?: number[];
   reference?: string;
+  paper?: ArxivPaper;
+  resolution_status?: string;
 }
 
 export interface ReferenceList {
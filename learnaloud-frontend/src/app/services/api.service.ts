@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable, timeout, catchError, throwError } from 'rxjs';
+import { Observable, timeout, catchError, throwError, repeat, first } from 'rxjs';
 import { io, Socket } from 'socket.io-client';
 
 @Injectable({ providedIn: 'root' })
@@ -47,7 +47,12 @@ export class ApiService {
   }
 
   getPaperContext(sessionId: string): Observable<any> {
-    return this.http.get(`${this.baseUrl}/paper-context/${sessionId}`);
+    // While quiz material is still being prepared the server answers with
+    // context_status "pending"; ask again until the context is ready.
+    return this.http.get<any>(`${this.baseUrl}/paper-context/${sessionId}`).pipe(
+      repeat({ count: 30, delay: 1000 }),
+      first((res) => res.context_status !== 'pending'),
+    );
   }
 
   getDebateContext(sessionId: string, role: 'author' | 'reviewer'): Observable<any> {
@@ -67,7 +72,12 @@ export class ApiService {
   }
 
   startQuiz(sessionId: string): Observable<any> {
-    return this.http.post(`${this.baseUrl}/quiz/start`, { session_id: sessionId });
+    // Like getPaperContext: the quiz can't start until its material is built,
+    // so a "pending" answer is retried until the quiz has started.
+    return this.http.post<any>(`${this.baseUrl}/quiz/start`, { session_id: sessionId }).pipe(
+      repeat({ count: 30, delay: 1000 }),
+      first((res) => res.context_status !== 'pending'),
+    );
   }
 
   // ---- WebSocket (Socket.IO) ------------------------------------------------
@@ -100,6 +110,44 @@ export class ApiService {
     this.socket?.emit('start_demo', { session_id: sessionId });
   }
 
+  // Debate turns are brokered by the server (see backend/debate.py)
+
+  startDebate(sessionId: string, maxTurns?: number): void {
+    this.socket?.emit('debate_start', { session_id: sessionId, max_turns: maxTurns });
+  }
+
+  onDebateStarted(callback: (debate: any) => void): void {
+    this.socket?.on('debate_started', callback);
+  }
+
+  onDebateRelay(callback: (relay: any) => void): void {
+    this.socket?.on('debate_relay', callback);
+  }
+
+  onDebateFinished(callback: (debate: any) => void): void {
+    this.socket?.on('debate_finished', callback);
+  }
+
+  onDebateError(callback: (err: any) => void): void {
+    this.socket?.on('debate_error', callback);
+  }
+
+  debateTurnStarted(debateId: string, turn: number): void {
+    this.socket?.emit('debate_turn_started', { debate_id: debateId, turn });
+  }
+
+  reportDebateTurnText(debateId: string, turn: number, text: string): void {
+    this.socket?.emit('debate_turn_text', { debate_id: debateId, turn, text });
+  }
+
+  endDebateTurn(debateId: string, role: 'author' | 'reviewer', text: string, turn: number): void {
+    this.socket?.emit('debate_turn_end', { debate_id: debateId, role, text, turn });
+  }
+
+  endDebateOnServer(debateId: string): void {
+    this.socket?.emit('debate_end', { debate_id: debateId });
+  }
+
   disconnectSocket(): void {
     this.socket?.disconnect();
     this.socket = null;